@@ -1,10 +1,13 @@
 # JWT Authentication Configuration
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Optional, Tuple
 
+import hashlib
 import os
+import threading
+import time
 
 # JWT Settings
 # Lấy Secret Key từ biến môi trường (Bảo mật hơn)
@@ -14,9 +17,65 @@ SECRET_KEY = os.getenv(
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Số token đã verify được nhớ (mỗi token ~ vài trăm byte)
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
 
-# Password hashing
-from app.utils import verify_password, hash_password as get_password_hash
+# Password hashing (bcrypt chạy trong process pool, xem app/password_hasher.py)
+from app.password_hasher import password_hasher
+
+verify_password = password_hasher.verify
+get_password_hash = password_hasher.hash
+
+
+@lru_cache(maxsize=None)
+def _signing_key():
+    """
+    Key HMAC dựng một lần; truyền str mỗi lần thì jose thử json.loads + jwk.construct lại
+    """
+    from jose import jwk
+
+    return jwk.construct(SECRET_KEY, ALGORITHM)
+
+
+class _TokenCache:
+    """
+    LRU token đã verify: sha256(token) -> (payload, exp).
+    Cùng một access token được gửi lại suốt 30 phút nên chỉ verify HMAC lần đầu.
+    Hết exp thì entry không còn dùng được (token hết hạn vẫn bị từ chối).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload
+
+    def set(self, digest: bytes, payload: dict, expires_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (payload, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = _TokenCache(JWT_CACHE_MAX_ENTRIES)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -28,7 +87,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    from jose import jwt
+
+    encoded_jwt = jwt.encode(to_encode, _signing_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -37,14 +98,29 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    from jose import jwt
+
+    encoded_jwt = jwt.encode(to_encode, _signing_key(), algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> Optional[dict]:
     """Decode and validate JWT token"""
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+
+    # jose + backend cryptography ~50ms import: nạp ở request có token đầu tiên
+    from jose import JWTError, jwt
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        payload = jwt.decode(token, _signing_key(), algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+    # Chỉ cache token có exp (token của app luôn có)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache.set(digest, payload, float(exp))
+    return dict(payload)
@@ -0,0 +1,335 @@
+"""
+Index availability trong process cho từng phòng
+
+Mỗi phòng giữ list các khoảng (check_in, check_out, booking_id) đã sort theo
+check_in của booking còn hiệu lực (confirmed/pending), nên câu hỏi "phòng có
+trống trong [check_in, check_out) không" được trả lời bằng bisect, không cần SQL.
+
+- Load một lần khi server khởi động (booking chưa kết thúc)
+- Cập nhật ngay sau mỗi commit có Booking thay đổi (session event)
+- Sync định kỳ theo Booking.updated_at để thấy thay đổi từ worker khác,
+  và reload toàn bộ định kỳ để thấy booking bị xóa ở worker khác
+
+Index chỉ dùng cho các endpoint đọc. create_booking vẫn lock Room và kiểm tra
+trực tiếp trên DB nên DB luôn là nguồn quyết định cuối cùng.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app import models
+from app.database import SessionLocal, session_scope
+
+# Booking ở các trạng thái này chiếm phòng
+ACTIVE_BOOKING_STATUSES = ("confirmed", "pending")
+
+# Trừ hao khi sync theo updated_at (clock skew giữa các worker / transaction dài)
+SYNC_OVERLAP = timedelta(seconds=5)
+
+Interval = Tuple[datetime, datetime, int]
+
+
+def _naive(value: datetime) -> datetime:
+    # Cột DateTime lưu giờ không kèm timezone -> so sánh theo giờ "wall clock"
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class _RoomCalendar:
+    """
+    Các khoảng đã đặt của một phòng, sort theo check_in
+    """
+
+    __slots__ = ("starts", "intervals", "max_end")
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.intervals: List[Interval] = []
+        # max_end[i] = check_out lớn nhất trong intervals[0..i], để dừng quét sớm
+        self.max_end: List[datetime] = []
+
+    def add(self, interval: Interval) -> None:
+        i = bisect.bisect_right(self.starts, interval[0])
+        self.starts.insert(i, interval[0])
+        self.intervals.insert(i, interval)
+        self._rebuild_max_end(i)
+
+    def remove(self, interval: Interval) -> None:
+        i = self.intervals.index(interval)
+        del self.starts[i]
+        del self.intervals[i]
+        self._rebuild_max_end(i)
+
+    def _rebuild_max_end(self, start: int) -> None:
+        del self.max_end[start:]
+        current = self.max_end[-1] if self.max_end else None
+        for _, end, _ in self.intervals[start:]:
+            current = end if current is None or end > current else current
+            self.max_end.append(current)
+
+    def overlaps(
+        self,
+        check_in: datetime,
+        check_out: datetime,
+        exclude_booking_id: Optional[int] = None,
+    ) -> bool:
+        # Chỉ các khoảng bắt đầu trước check_out mới có thể trùng
+        i = bisect.bisect_left(self.starts, check_out) - 1
+        while i >= 0 and self.max_end[i] > check_in:
+            _, end, booking_id = self.intervals[i]
+            if end > check_in and booking_id != exclude_booking_id:
+                return True
+            i -= 1
+        return False
+
+
+class AvailabilityIndex:
+    def __init__(self, sync_interval: float = 5.0, full_reload_interval: float = 300.0):
+        self.sync_interval = sync_interval
+        self.full_reload_interval = full_reload_interval
+
+        self._rooms: Dict[int, _RoomCalendar] = {}
+        self._bookings: Dict[int, Tuple[int, Interval]] = {}
+        self._lock = threading.RLock()
+
+        self.ready = False
+        # Query có check_in trước mốc này (booking cũ không được load) -> fallback SQL
+        self.covers_from: Optional[datetime] = None
+        self.last_sync: Optional[datetime] = None
+        self.last_full_load = 0.0
+
+        self.lookups = 0
+        self.syncs = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ============= Cập nhật index =============
+
+    def load(self, db) -> int:
+        """
+        Load toàn bộ booking còn hiệu lực kết thúc sau (hôm nay - 1 ngày)
+        """
+        started = datetime.utcnow()
+        covers_from = datetime.now() - timedelta(days=1)
+        rows = db.query(
+            models.Booking.id,
+            models.Booking.room_id,
+            models.Booking.check_in_date,
+            models.Booking.check_out_date,
+        ).filter(
+            models.Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            models.Booking.check_out_date > covers_from,
+        ).all()
+
+        rooms: Dict[int, _RoomCalendar] = {}
+        bookings: Dict[int, Tuple[int, Interval]] = {}
+        for row in rows:
+            interval = (_naive(row.check_in_date), _naive(row.check_out_date), row.id)
+            rooms.setdefault(row.room_id, _RoomCalendar()).add(interval)
+            bookings[row.id] = (row.room_id, interval)
+
+        with self._lock:
+            self._rooms = rooms
+            self._bookings = bookings
+            self.covers_from = covers_from
+            self.last_sync = started
+            self.last_full_load = time.time()
+            self.ready = True
+        return len(bookings)
+
+    def sync(self, db) -> int:
+        """
+        Áp dụng các booking có updated_at mới hơn lần sync trước
+        """
+        if not self.ready:
+            return self.load(db)
+
+        started = datetime.utcnow()
+        rows = db.query(
+            models.Booking.id,
+            models.Booking.room_id,
+            models.Booking.check_in_date,
+            models.Booking.check_out_date,
+            models.Booking.status,
+        ).filter(
+            models.Booking.updated_at >= self.last_sync - SYNC_OVERLAP,
+        ).all()
+
+        with self._lock:
+            for row in rows:
+                self._apply(row.id, row.room_id, row.check_in_date, row.check_out_date, row.status)
+            self.last_sync = started
+            self.syncs += 1
+        return len(rows)
+
+    def apply_changes(self, changes: Dict[int, Optional[tuple]]) -> None:
+        """
+        changes: booking_id -> (room_id, check_in, check_out, status), None nếu bị xóa
+        """
+        with self._lock:
+            for booking_id, values in changes.items():
+                if values is None:
+                    self._discard(booking_id)
+                else:
+                    self._apply(booking_id, *values)
+
+    def _apply(self, booking_id, room_id, check_in, check_out, status) -> None:
+        self._discard(booking_id)
+        if status not in ACTIVE_BOOKING_STATUSES:
+            return
+        interval = (_naive(check_in), _naive(check_out), booking_id)
+        self._rooms.setdefault(room_id, _RoomCalendar()).add(interval)
+        self._bookings[booking_id] = (room_id, interval)
+
+    def _discard(self, booking_id: int) -> None:
+        existing = self._bookings.pop(booking_id, None)
+        if existing is None:
+            return
+        room_id, interval = existing
+        calendar = self._rooms[room_id]
+        calendar.remove(interval)
+        if not calendar.intervals:
+            del self._rooms[room_id]
+
+    # ============= Tra cứu =============
+
+    def _covers(self, check_in: datetime) -> bool:
+        return self.ready and _naive(check_in) >= self.covers_from
+
+    def is_available(
+        self,
+        room_id: int,
+        check_in: datetime,
+        check_out: datetime,
+        exclude_booking_id: Optional[int] = None,
+    ) -> Optional[bool]:
+        """
+        True/False nếu index trả lời được, None nếu phải hỏi DB
+        """
+        if not self._covers(check_in):
+            return None
+        check_in, check_out = _naive(check_in), _naive(check_out)
+        with self._lock:
+            self.lookups += 1
+            calendar = self._rooms.get(room_id)
+            if calendar is None:
+                return True
+            return not calendar.overlaps(check_in, check_out, exclude_booking_id)
+
+    def booked_rooms(
+        self,
+        room_ids: Iterable[int],
+        check_in: datetime,
+        check_out: datetime,
+    ) -> Optional[Set[int]]:
+        """
+        Tập room_id có booking trùng khoảng thời gian, None nếu phải hỏi DB
+        """
+        if not self._covers(check_in):
+            return None
+        check_in, check_out = _naive(check_in), _naive(check_out)
+        with self._lock:
+            self.lookups += 1
+            booked = set()
+            for room_id in room_ids:
+                calendar = self._rooms.get(room_id)
+                if calendar is not None and calendar.overlaps(check_in, check_out):
+                    booked.add(room_id)
+            return booked
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "rooms": len(self._rooms),
+                "bookings": len(self._bookings),
+                "covers_from": self.covers_from.isoformat() if self.covers_from else None,
+                "last_sync": self.last_sync.isoformat() if self.last_sync else None,
+                "lookups": self.lookups,
+                "syncs": self.syncs,
+            }
+
+    # ============= Background sync =============
+
+    def start(self) -> None:
+        """
+        Load index và chạy thread sync định kỳ (gọi khi server khởi động)
+        """
+        with session_scope() as db:
+            count = self.load(db)
+        logging.info(f"[AvailabilityIndex] Loaded {count} active bookings")
+
+        if self.sync_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sync_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sync_interval + 1)
+            self._thread = None
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                with session_scope() as db:
+                    if time.time() - self.last_full_load >= self.full_reload_interval:
+                        self.load(db)
+                    else:
+                        self.sync(db)
+            except Exception as e:
+                logging.error(f"[AvailabilityIndex] Sync failed: {e}")
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+AVAILABILITY_INDEX_ENABLED = os.getenv("AVAILABILITY_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+availability_index = AvailabilityIndex(
+    sync_interval=_env_float("AVAILABILITY_INDEX_SYNC_INTERVAL", 5.0),
+    full_reload_interval=_env_float("AVAILABILITY_INDEX_FULL_RELOAD", 300.0),
+)
+
+
+# ============= Cập nhật theo session event =============
+# Gom Booking thay đổi sau mỗi flush, áp dụng vào index khi commit thành công
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_booking_changes(session, flush_context):
+    if not availability_index.ready:
+        return
+    # Chụp giá trị ngay lúc flush: sau commit object đã bị expire, không query lại được
+    changes = session.info.setdefault("availability_index_changes", {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, models.Booking):
+            changes[obj.id] = (obj.room_id, obj.check_in_date, obj.check_out_date, obj.status)
+    for obj in session.deleted:
+        if isinstance(obj, models.Booking):
+            changes[obj.id] = None
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_booking_changes(session):
+    changes = session.info.pop("availability_index_changes", None)
+    if changes:
+        availability_index.apply_changes(changes)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_booking_changes(session):
+    session.info.pop("availability_index_changes", None)
@@ -0,0 +1,202 @@
+"""
+Rollup booking cho dashboard và report admin
+
+- booking_daily_stats: (ngày tạo, hotel, room) -> số booking, doanh thu, hủy, đã thanh toán
+- booking_user_stats: user -> số booking chưa hủy, tổng chi tiêu
+
+Mỗi booking đóng góp một vector số liệu theo trạng thái hiện tại. Sau mỗi flush,
+với mỗi Booking mới/sửa/xóa: trừ đóng góp của trạng thái cũ, cộng đóng góp của
+trạng thái mới, ghi bằng UPDATE col = col + delta (upsert) trong cùng transaction
+nên rollback thì rollup cũng rollback.
+
+Event đăng ký khi import app.models (mọi writer ORM, kể cả seed.py / scripts).
+Dữ liệu ghi ngoài ORM (SQL tay, script import) không đi qua event:
+chạy lại `python scripts/rebuild_booking_stats.py` để tính lại từ đầu.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import case, event, func, insert, select, update
+from sqlalchemy.orm import Session, attributes
+
+from app import models
+from app.database import SessionLocal
+
+DAILY_METRICS = (
+    "bookings",
+    "active_bookings",
+    "active_revenue",
+    "cancellations",
+    "pending_payment",
+    "paid_bookings",
+    "paid_revenue",
+)
+USER_METRICS = ("active_bookings", "active_revenue")
+
+_TRACKED = ("created_at", "hotel_id", "room_id", "user_id", "status", "payment_status", "total_price")
+
+
+def _contribution(status, payment_status, total_price) -> Dict[str, float]:
+    """
+    Số liệu một booking đóng góp vào rollup
+    """
+    price = total_price or 0.0
+    active = (status or "pending") != "cancelled"
+    paid = payment_status == "paid"
+    return {
+        "bookings": 1,
+        "active_bookings": int(active),
+        "active_revenue": price if active else 0.0,
+        "cancellations": int(not active),
+        "pending_payment": int(active and (payment_status or "pending") == "pending"),
+        "paid_bookings": int(paid),
+        "paid_revenue": price if paid else 0.0,
+    }
+
+
+def _state(booking: models.Booking, old: bool) -> dict:
+    # old=True: giá trị trước flush (lấy từ attribute history)
+    values = {}
+    for key in _TRACKED:
+        history = attributes.get_history(booking, key)
+        if old and history.deleted:
+            values[key] = history.deleted[0]
+        elif not old and history.added:
+            values[key] = history.added[0]
+        else:
+            values[key] = getattr(booking, key)
+    return values
+
+
+def _accumulate(daily, users, state: dict, sign: int) -> None:
+    created_at = state["created_at"] or datetime.utcnow()
+    contribution = _contribution(state["status"], state["payment_status"], state["total_price"])
+
+    key = (created_at.date(), state["hotel_id"], state["room_id"])
+    for metric, value in contribution.items():
+        daily[key][metric] += sign * value
+
+    if state["user_id"] is not None:
+        for metric in USER_METRICS:
+            users[state["user_id"]][metric] += sign * contribution[metric]
+
+
+def _upsert(connection, table, key_values: dict, deltas: dict) -> None:
+    """
+    UPDATE col = col + delta; nếu chưa có dòng thì INSERT
+    """
+    where = [table.c[name] == value for name, value in key_values.items()]
+    result = connection.execute(
+        update(table).where(*where).values(
+            **{metric: table.c[metric] + delta for metric, delta in deltas.items()}
+        )
+    )
+    if result.rowcount:
+        return
+
+    dialect = connection.dialect.name
+    values = {**key_values, **deltas}
+    if dialect in ("postgresql", "sqlite"):
+        # Transaction khác có thể vừa insert cùng key -> cộng dồn thay vì lỗi unique
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_values),
+            set_={metric: table.c[metric] + stmt.excluded[metric] for metric in deltas},
+        )
+        connection.execute(stmt)
+    else:
+        connection.execute(insert(table).values(**values))
+
+
+def apply_booking_changes(session: Session) -> None:
+    """
+    Cập nhật rollup theo các Booking trong flush hiện tại (gọi từ after_flush)
+    """
+    daily: Dict[Tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    users: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    for obj in session.new:
+        if isinstance(obj, models.Booking):
+            _accumulate(daily, users, _state(obj, old=False), +1)
+    for obj in session.dirty:
+        if isinstance(obj, models.Booking) and session.is_modified(obj, include_collections=False):
+            _accumulate(daily, users, _state(obj, old=True), -1)
+            _accumulate(daily, users, _state(obj, old=False), +1)
+    for obj in session.deleted:
+        if isinstance(obj, models.Booking):
+            _accumulate(daily, users, _state(obj, old=True), -1)
+
+    if not daily and not users:
+        return
+
+    connection = session.connection()
+    daily_table = models.BookingDailyStat.__table__
+    user_table = models.BookingUserStat.__table__
+    for (day, hotel_id, room_id), deltas in daily.items():
+        deltas = {m: v for m, v in deltas.items() if v}
+        if deltas:
+            _upsert(connection, daily_table, {"day": day, "hotel_id": hotel_id, "room_id": room_id}, deltas)
+    for user_id, deltas in users.items():
+        deltas = {m: v for m, v in deltas.items() if v}
+        if deltas:
+            _upsert(connection, user_table, {"user_id": user_id}, deltas)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _booking_stats_after_flush(session, flush_context):
+    apply_booking_changes(session)
+
+
+# ============= Rebuild =============
+
+def rebuild_booking_stats(db: Session) -> int:
+    """
+    Tính lại toàn bộ rollup từ bảng bookings (một INSERT ... SELECT mỗi bảng)
+    """
+    booking = models.Booking
+    active = booking.status != "cancelled"
+    paid = booking.payment_status == "paid"
+    day = func.date(booking.created_at)
+
+    daily_select = (
+        select(
+            day,
+            booking.hotel_id,
+            booking.room_id,
+            func.count(booking.id),
+            func.sum(case((active, 1), else_=0)),
+            func.sum(case((active, booking.total_price), else_=0.0)),
+            func.sum(case((active, 0), else_=1)),
+            func.sum(case((active & (booking.payment_status == "pending"), 1), else_=0)),
+            func.sum(case((paid, 1), else_=0)),
+            func.sum(case((paid, booking.total_price), else_=0.0)),
+        )
+        .where(booking.created_at.isnot(None))
+        .group_by(day, booking.hotel_id, booking.room_id)
+    )
+    user_select = (
+        select(
+            booking.user_id,
+            func.count(booking.id),
+            func.sum(booking.total_price),
+        )
+        .where(active, booking.user_id.isnot(None))
+        .group_by(booking.user_id)
+    )
+
+    daily_table = models.BookingDailyStat.__table__
+    user_table = models.BookingUserStat.__table__
+    db.execute(daily_table.delete())
+    db.execute(user_table.delete())
+    db.execute(
+        daily_table.insert().from_select(["day", "hotel_id", "room_id", *DAILY_METRICS], daily_select)
+    )
+    db.execute(user_table.insert().from_select(["user_id", *USER_METRICS], user_select))
+    db.commit()
+    return db.query(func.count(models.BookingDailyStat.id)).scalar() or 0
+
@@ -1,100 +1,620 @@
 """
 Caching service for search results
 Using in-memory cache with TTL (time to live)
+
+Storage được tách thành backend (app.cache_backends):
+- memory (mặc định): dict bounded trong process, eviction LRU/LFU, dọn entry
+  hết hạn qua min-heap
+- redis: dùng chung giữa các uvicorn worker qua giao thức Redis (Redis thật
+  hoặc stand-in `python -m app.cache_server`), chọn bằng CACHE_BACKEND/CACHE_URL
+
+get_or_set() gom các request cùng key (single-flight): chỉ một caller tính
+lại giá trị, các caller khác chờ kết quả. Nếu bật stale_ttl, giá trị vừa
+hết hạn vẫn được trả về trong lúc một thread nền làm mới (stale-while-revalidate).
+Single-flight chỉ áp dụng trong một process. aget_or_set() là bản cho route
+async: loader là coroutine, request cùng key chờ chung một asyncio.Future.
+
+Entry được gắn tag (room:{id}, hotel:{id}, city:{tên}) và bị xóa theo tag khi
+booking/room/hotel thay đổi (invalidate_booking / invalidate_room /
+invalidate_hotel), nên TTL chỉ là giới hạn trên chứ không phải cơ chế chính
+để tránh dữ liệu cũ.
 """
+import asyncio
 import json
 import hashlib
+import os
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Tuple, Union
 from functools import wraps
 import time
 
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+from app.cache_backends import CacheBackend, MemoryBackend, RedisBackend
+from app.utils import normalize_search
+
+# Thời gian tối đa một follower chờ leader tính xong trước khi tự tính lại
+SINGLE_FLIGHT_TIMEOUT = 30.0
+
+
 class CacheManager:
-    def __init__(self, ttl: int = 300):  # 5 minutes default TTL
-        self.cache: Dict[str, tuple] = {}
+    def __init__(
+        self,
+        ttl: int = 300,  # 5 minutes default TTL
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        eviction: str = "lru",
+        stale_ttl: int = 0,
+        backend: Optional[CacheBackend] = None,
+    ):
+        if backend is None:
+            backend = MemoryBackend(
+                max_entries=max_entries, max_bytes=max_bytes, eviction=eviction
+            )
+        self.backend = backend
         self.ttl = ttl
-    
+        self.stale_ttl = stale_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+
+        # Single-flight: key -> _Flight đang tính; key đang được làm mới nền
+        self._inflight: Dict[str, "_Flight"] = {}
+        self._refreshing: set = set()
+        # Single-flight cho aget_or_set (trong event loop)
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: set = set()
+        # Tăng mỗi lần invalidate: kết quả tính trước lúc invalidate không được ghi vào cache
+        self._generation = 0
+        self.invalidations = 0
+
+        self._lock = threading.Lock()
+
     def get_key(self, *args, **kwargs) -> str:
         """
         Generate cache key từ arguments
         """
         key_data = f"{str(args)}{json.dumps(kwargs, sort_keys=True, default=str)}"
         return hashlib.md5(key_data.encode()).hexdigest()
-    
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
         """
-        Set cache value với TTL
+        Set cache value với TTL (và các tag dùng để invalidate); TTL 0 = không cache
         """
-        expire_time = time.time() + (ttl or self.ttl)
-        self.cache[key] = (value, expire_time)
-    
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expire_time = time.time() + ttl
+        stale_until = expire_time + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        self.backend.set(key, value, expire_time, stale_until, tags)
+
     def get(self, key: str) -> Optional[Any]:
         """
         Get cache value nếu chưa expire
         """
-        if key not in self.cache:
-            return None
-        
-        value, expire_time = self.cache[key]
-        
-        # Check if expired
-        if time.time() > expire_time:
-            del self.cache[key]
+        entry = self.backend.get(key)
+
+        # Check if expired (entry còn trong cửa sổ stale thì backend vẫn giữ cho get_or_set)
+        if entry is None or time.time() > entry[1]:
+            with self._lock:
+                self.misses += 1
             return None
-        
-        return value
-    
+
+        with self._lock:
+            self.hits += 1
+        return entry[0]
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        refresh: Optional[Callable[[], Any]] = None,
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+    ) -> Any:
+        """
+        Lấy giá trị từ cache, nếu miss thì gọi loader() đúng một lần cho mỗi key
+        (các request đồng thời cùng key chờ kết quả của request đầu tiên).
+
+        Khi entry đã hết hạn nhưng còn trong cửa sổ stale, trả về giá trị cũ và
+        làm mới ở thread nền bằng refresh() (mặc định là loader). refresh phải
+        tự mở DB session riêng vì session của request sẽ đóng trước khi nó chạy.
+
+        tags có thể là list tag hoặc hàm nhận kết quả và trả về list tag.
+        """
+        entry = self.backend.get(key)
+
+        with self._lock:
+            if entry is not None:
+                value, expire_time, stale_until = entry
+                now = time.time()
+                if now <= expire_time:
+                    self.hits += 1
+                    return value
+                if now <= stale_until:
+                    self.stale_hits += 1
+                    if key not in self._refreshing and key not in self._inflight:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._background_refresh,
+                            args=(key, refresh or loader, ttl, stale_ttl, tags),
+                            daemon=True,
+                        ).start()
+                    return value
+
+            self.misses += 1
+            generation = self._generation
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if flight.event.wait(SINGLE_FLIGHT_TIMEOUT):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            # Leader quá chậm: tự tính, không cache để tránh ghi đè kết quả của leader
+            return loader()
+
+        try:
+            result = loader()
+            self._store(key, result, ttl, stale_ttl, tags, generation)
+            flight.result = result
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+    ) -> Any:
+        """
+        Bản async của get_or_set cho route async (loader/refresh trả về coroutine)
+
+        Làm mới stale chạy bằng asyncio task; refresh phải tự mở session riêng
+        (async_session_scope) vì session của request sẽ đóng trước khi nó chạy.
+        """
+        entry = self.backend.get(key)
+
+        with self._lock:
+            if entry is not None:
+                value, expire_time, stale_until = entry
+                now = time.time()
+                if now <= expire_time:
+                    self.hits += 1
+                    return value
+                if now <= stale_until:
+                    self.stale_hits += 1
+                    if key not in self._refreshing and key not in self._async_inflight:
+                        self._refreshing.add(key)
+                        task = asyncio.create_task(self._async_background_refresh(
+                            key, refresh or loader, ttl, stale_ttl, tags
+                        ))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                    return value
+
+            self.misses += 1
+            generation = self._generation
+            flight = self._async_inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = asyncio.get_running_loop().create_future()
+                self._async_inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                # shield: follower bị timeout/cancel không hủy Future của leader
+                return await asyncio.wait_for(asyncio.shield(flight), SINGLE_FLIGHT_TIMEOUT)
+            except asyncio.TimeoutError:
+                return await loader()
+
+        try:
+            result = await loader()
+            self._store(key, result, ttl, stale_ttl, tags, generation)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Đánh dấu đã đọc để asyncio không log lỗi khi không có follower
+            flight.exception()
+            raise
+        finally:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+
+    async def _async_background_refresh(
+        self,
+        key: str,
+        refresh: Callable[[], Awaitable[Any]],
+        ttl: Optional[int],
+        stale_ttl: Optional[int],
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]],
+    ) -> None:
+        generation = self._generation
+        try:
+            result = await refresh()
+            self._store(key, result, ttl, stale_ttl, tags, generation)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print(f"[Cache] Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _background_refresh(
+        self,
+        key: str,
+        refresh: Callable[[], Any],
+        ttl: Optional[int],
+        stale_ttl: Optional[int],
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]],
+    ) -> None:
+        generation = self._generation
+        try:
+            result = refresh()
+            self._store(key, result, ttl, stale_ttl, tags, generation)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            print(f"[Cache] Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, result, ttl, stale_ttl, tags, generation) -> None:
+        if result is None:
+            return
+        # Có invalidate xảy ra trong lúc đang tính -> kết quả có thể đã cũ, không cache
+        if generation != self._generation:
+            return
+        entry_tags = tags(result) if callable(tags) else tags
+        self.set(key, result, ttl, stale_ttl, entry_tags)
+
     def delete(self, key: str) -> None:
         """
         Delete cache entry
         """
-        if key in self.cache:
-            del self.cache[key]
-    
+        self.backend.delete(key)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Xóa mọi entry gắn một trong các tag
+        """
+        if not tags:
+            return 0
+        with self._lock:
+            self._generation += 1
+        removed = self.backend.invalidate_tags(tags)
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def invalidate_tags_where(self, prefix: str, predicate: Callable[[str], bool]) -> int:
+        """
+        Xóa entry của mọi tag bắt đầu bằng prefix mà predicate(phần còn lại) đúng
+        """
+        matched = [
+            tag for tag in self.backend.list_tags(prefix)
+            if predicate(tag[len(prefix):])
+        ]
+        return self.invalidate_tags(*matched)
+
     def clear(self) -> None:
         """
         Clear all cache
         """
-        self.cache.clear()
-    
+        with self._lock:
+            self._generation += 1
+        self.backend.clear()
+
     def cleanup_expired(self) -> None:
         """
         Remove expired entries (run periodically)
         """
-        current_time = time.time()
-        expired_keys = [
-            k for k, (_, expire_time) in self.cache.items()
-            if current_time > expire_time
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+        self.backend.cleanup_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Thống kê cache (backend, entries, bytes, hit/miss, evictions)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "backend": self.backend.name,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "invalidations": self.invalidations,
+                "inflight": len(self._inflight),
+            }
+        counters.update(self.backend.stats())
+        return counters
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+
+class CachedResponse(NamedTuple):
+    """
+    Response JSON đã encode sẵn kèm ETag. Cache giữ bytes thay vì ORM object nên
+    cache hit không phải chạy lại Pydantic và không đụng tới session đã đóng.
+    """
+    body: bytes
+    etag: str
+    ids: Tuple[int, ...] = ()
+
+    @classmethod
+    def build(cls, data: Any, adapter: TypeAdapter, ids: Iterable[int] = ()) -> "CachedResponse":
+        """
+        Validate + encode data (vd: list ORM object) khi session còn mở
+        """
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        return cls(body, etag, tuple(ids))
+
+    def to_response(self, if_none_match: Optional[str] = None) -> Response:
+        """
+        Trả 304 nếu client đã có đúng bản này (If-None-Match), ngược lại trả body
+        """
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if if_none_match and _etag_matches(if_none_match, self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match có thể là "*" hoặc danh sách ETag (weak W/"..." vẫn tính là khớp)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class _Flight:
+    """
+    Một lần tính giá trị đang chạy cho một key (single-flight)
+    """
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = int(raw)
+    return value if value > 0 else None
+
+
+def _env_ttl(name: str, default: int) -> int:
+    # TTL tính bằng giây: 0 = tắt (không lưu entry), số âm là cấu hình sai
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = int(raw)
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0, got {value}")
+    return value
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_URL = os.getenv("CACHE_URL", "redis://127.0.0.1:6380/0")
+CACHE_EVICTION_POLICY = os.getenv("CACHE_EVICTION_POLICY", "lru").lower()
+
+
+def _cache_signing_key() -> bytes:
+    """
+    Key ký entry trong cache dùng chung; mọi worker phải cùng key (mặc định = JWT secret)
+    """
+    key = os.getenv("CACHE_SIGNING_KEY")
+    if not key:
+        from app.auth import SECRET_KEY
+
+        key = SECRET_KEY
+    return key.encode("utf-8")
+
+
+def make_backend(
+    namespace: str,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> CacheBackend:
+    """
+    Tạo backend theo CACHE_BACKEND (memory | redis)
+    """
+    if CACHE_BACKEND == "memory":
+        return MemoryBackend(
+            max_entries=max_entries, max_bytes=max_bytes, eviction=CACHE_EVICTION_POLICY
+        )
+    if CACHE_BACKEND == "redis":
+        # Giới hạn bộ nhớ do server quản lý (maxmemory / --max-bytes)
+        return RedisBackend(CACHE_URL, namespace=namespace, signing_key=_cache_signing_key())
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
 
 # Global cache manager instance
-search_cache = CacheManager(ttl=600)  # 10 minutes for search results
-availability_cache = CacheManager(ttl=300)  # 5 minutes for availability
+search_cache = CacheManager(
+    ttl=_env_ttl("SEARCH_CACHE_TTL", 600),  # 10 minutes for search results
+    stale_ttl=_env_ttl("SEARCH_CACHE_STALE_TTL", 120),
+    backend=make_backend(
+        "search",
+        max_entries=_env_int("SEARCH_CACHE_MAX_ENTRIES", 2000),
+        max_bytes=_env_int("SEARCH_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    ),
+)
+availability_cache = CacheManager(
+    ttl=_env_ttl("AVAILABILITY_CACHE_TTL", 300),  # 5 minutes for availability
+    stale_ttl=_env_ttl("AVAILABILITY_CACHE_STALE_TTL", 0),
+    backend=make_backend(
+        "availability",
+        max_entries=_env_int("AVAILABILITY_CACHE_MAX_ENTRIES", 20000),
+        max_bytes=_env_int("AVAILABILITY_CACHE_MAX_BYTES", 16 * 1024 * 1024),
+    ),
+)
+
+# User đã xác thực (cột của User, trừ hashed_password) cho get_current_user.
+# Backend memory: mỗi worker một bản, thay đổi ở worker khác thấy sau tối đa TTL.
+principal_cache = CacheManager(
+    ttl=_env_ttl("PRINCIPAL_CACHE_TTL", 30),  # 0 = tắt
+    backend=make_backend(
+        "principal",
+        max_entries=_env_int("PRINCIPAL_CACHE_MAX_ENTRIES", 10000),
+    ),
+)
+
+# ============= Tag-based invalidation =============
+
+def city_key(city: Optional[str]) -> str:
+    """
+    Dạng chuẩn của tên thành phố dùng trong tag (bỏ dấu, lowercase)
+    """
+    return normalize_search(city or "")
+
+
+def room_tag(room_id: int) -> str:
+    return f"room:{room_id}"
+
+
+def hotel_tag(hotel_id: int) -> str:
+    return f"hotel:{hotel_id}"
 
-def cache_result(cache_manager: CacheManager, ttl: Optional[int] = None):
+
+def city_tag(city: Optional[str]) -> str:
+    """
+    Tag cho kết quả search theo city; search không lọc city dùng "city:*"
+    """
+    return f"city:{city_key(city) or '*'}"
+
+
+def dates_tag(city: Optional[str]) -> str:
+    """
+    Tag thêm cho search có check_in/check_out (kết quả phụ thuộc booking)
+    """
+    return f"dates:{city_key(city) or '*'}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def _invalidate_city_searches(*cities: Optional[str], prefix: str = "city:") -> None:
+    # Search lọc city bằng substring nên một hotel ở "Ha Long" ảnh hưởng cả
+    # search "ha", "long", ... -> xóa mọi tag city là substring của city đó
+    keys = {city_key(c) for c in cities if c}
+    search_cache.invalidate_tags_where(
+        prefix,
+        lambda query: query == "*" or any(query in key for key in keys),
+    )
+
+
+def invalidate_booking(room_id: int, city: Optional[str] = None) -> None:
+    """
+    Gọi sau khi booking được tạo/hủy/xóa/đổi trạng thái.
+    Truyền city của hotel khi phòng bị chiếm/giải phóng để xóa search có ngày.
+    """
+    availability_cache.invalidate_tags(room_tag(room_id))
+    if city:
+        _invalidate_city_searches(city, prefix="dates:")
+
+
+def invalidate_room(room_id: int, hotel_id: int, city: Optional[str] = None) -> None:
+    """
+    Gọi sau khi phòng được tạo/sửa/xóa (giá, số khách ảnh hưởng search)
+    """
+    availability_cache.invalidate_tags(room_tag(room_id))
+    search_cache.invalidate_tags(hotel_tag(hotel_id))
+    _invalidate_city_searches(city)
+
+
+def invalidate_hotel(
+    hotel_id: int,
+    *cities: Optional[str],
+    room_ids: Iterable[int] = (),
+) -> None:
+    """
+    Gọi sau khi hotel được tạo/sửa/xóa. Truyền cả city cũ và mới khi đổi city.
+    """
+    search_cache.invalidate_tags(hotel_tag(hotel_id))
+    _invalidate_city_searches(*cities)
+    if room_ids:
+        availability_cache.invalidate_tags(*(room_tag(r) for r in room_ids))
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Gọi sau khi user đổi role/thông tin/mật khẩu hoặc bị xóa
+    """
+    principal_cache.invalidate_tags(user_tag(user_id))
+
+
+def cache_result(
+    cache_manager: CacheManager,
+    ttl: Optional[int] = None,
+    stale_ttl: Optional[int] = None,
+):
     """
-    Decorator to cache function results
+    Decorator to cache function results (single-flight per cache key)
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
             cache_key = cache_manager.get_key(*args, **kwargs)
-            
-            # Try to get from cache
-            cached_result = cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function
-            result = func(*args, **kwargs)
-            
-            # Store in cache
-            cache_manager.set(cache_key, result, ttl)
-            
-            return result
-        
+
+            # Cache hit, hoặc chờ/thực thi một lần duy nhất cho key này
+            return cache_manager.get_or_set(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+            )
+
         return wrapper
     return decorator
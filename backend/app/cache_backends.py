@@ -0,0 +1,612 @@
+"""
+Storage backends cho CacheManager
+
+- MemoryBackend: dict trong process, bounded (LRU/LFU, max entries/bytes)
+- RedisBackend: nói giao thức Redis (RESP) qua TCP hoặc unix socket, dùng chung
+  giữa các worker. Chạy được với Redis thật hoặc với stand-in `app.cache_server`.
+
+Mỗi entry là (value, expire_time, stale_until). Backend giữ entry tới
+stale_until; CacheManager tự quyết định entry còn fresh hay đã stale.
+
+Entry có thể gắn tag (vd: "room:12", "hotel:3", "city:da nang") để xóa theo
+nhóm khi dữ liệu gốc thay đổi (invalidate_tags).
+"""
+import fnmatch
+import heapq
+import hmac
+import pickle
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+Entry = Tuple[Any, float, float]
+
+
+def _approx_size(value: Any) -> int:
+    """
+    Ước lượng số byte mà một giá trị chiếm trong cache
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", errors="ignore"))
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheBackend:
+    """
+    Interface chung cho storage của CacheManager
+    """
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[Entry]:
+        raise NotImplementedError
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        expire_time: float,
+        stale_until: float,
+        tags: Iterable[str] = (),
+    ) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Xóa mọi entry gắn một trong các tag, trả về số entry đã xóa
+        """
+        raise NotImplementedError
+
+    def list_tags(self, prefix: str = "") -> List[str]:
+        """
+        Các tag đang có entry, lọc theo prefix
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def cleanup_expired(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def __len__(self) -> int:
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Cache trong process với giới hạn entry/byte và eviction LRU hoặc LFU.
+    Entry hết hạn được dọn qua min-heap theo stale_until.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        eviction: str = "lru",
+    ):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+
+        # key -> (value, expire_time, stale_until, size_bytes); thứ tự dict = thứ tự LRU
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # Min-heap (stale_until, key); entry cũ trong heap được bỏ qua khi pop
+        self._expiry_heap: List[tuple] = []
+        # LFU: key -> tần suất, tần suất -> các key (giữ thứ tự LRU trong cùng tần suất)
+        self._freq: Dict[str, int] = {}
+        self._freq_buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self._min_freq = 0
+        # Tag index: tag -> các key, key -> các tag của nó
+        self._tag_keys: Dict[str, set] = {}
+        self._key_tags: Dict[str, Tuple[str, ...]] = {}
+
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+            if time.time() > entry[2]:
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._touch(key)
+            return entry[0], entry[1], entry[2]
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        expire_time: float,
+        stale_until: float,
+        tags: Iterable[str] = (),
+    ) -> None:
+        size = _approx_size(value) if self.max_bytes else 0
+        tags = tuple(tags)
+
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+
+            # Giá trị lớn hơn cả giới hạn cache thì không lưu
+            if self.max_bytes and size > self.max_bytes:
+                return
+
+            self.cache[key] = (value, expire_time, stale_until, size)
+            self.total_bytes += size
+            self._touch_new(key)
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tag_keys.setdefault(tag, set()).add(key)
+
+            self._purge_expired(time.time())
+            self._enforce_limits()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tag_keys.get(tag, ())):
+                    if key in self.cache:
+                        self._remove(key)
+                        removed += 1
+                self._tag_keys.pop(tag, None)
+        return removed
+
+    def list_tags(self, prefix: str = "") -> List[str]:
+        with self._lock:
+            return [t for t in self._tag_keys if t.startswith(prefix)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.cache.clear()
+            self._expiry_heap.clear()
+            self._freq.clear()
+            self._freq_buckets.clear()
+            self._min_freq = 0
+            self._tag_keys.clear()
+            self._key_tags.clear()
+            self.total_bytes = 0
+
+    def cleanup_expired(self) -> None:
+        with self._lock:
+            self._purge_expired(time.time())
+
+    def keys(self, pattern: str = "*") -> List[str]:
+        with self._lock:
+            self._purge_expired(time.time())
+            if pattern == "*":
+                return list(self.cache)
+            return [k for k in self.cache if fnmatch.fnmatchcase(k, pattern)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self.cache),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "approx_bytes": self.total_bytes,
+                "eviction": self.eviction,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "tags": len(self._tag_keys),
+            }
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    # ---- internal helpers (caller must hold self._lock) ----
+
+    def _remove(self, key: str) -> None:
+        size = self.cache.pop(key)[3]
+        self.total_bytes -= size
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+        if self.eviction == "lfu":
+            freq = self._freq.pop(key)
+            bucket = self._freq_buckets[freq]
+            del bucket[key]
+            if not bucket:
+                del self._freq_buckets[freq]
+
+    def _touch_new(self, key: str) -> None:
+        if self.eviction == "lfu":
+            self._freq[key] = 1
+            self._freq_buckets.setdefault(1, OrderedDict())[key] = None
+            self._min_freq = 1
+
+    def _touch(self, key: str) -> None:
+        if self.eviction == "lru":
+            self.cache.move_to_end(key)
+            return
+
+        freq = self._freq[key]
+        bucket = self._freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._freq_buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def _victim(self) -> str:
+        if self.eviction == "lru":
+            return next(iter(self.cache))
+        if self._min_freq not in self._freq_buckets:
+            self._min_freq = min(self._freq_buckets)
+        return next(iter(self._freq_buckets[self._min_freq]))
+
+    def _enforce_limits(self) -> None:
+        while self.cache and (
+            (self.max_entries and len(self.cache) > self.max_entries)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            self._remove(self._victim())
+            self.evictions += 1
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            stale_until, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            # Bỏ qua entry heap cũ (key đã bị set lại hoặc đã bị xóa)
+            if entry is not None and entry[2] == stale_until:
+                self._remove(key)
+                self.expirations += 1
+
+        # Heap chứa nhiều entry cũ (key bị set lại nhiều lần) thì build lại
+        if len(heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [(e[2], k) for k, e in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+
+# ============= RESP (Redis protocol) client =============
+
+
+class RespError(Exception):
+    """
+    Lỗi do server trả về (reply bắt đầu bằng '-')
+    """
+
+
+def encode_command(*parts: Any) -> bytes:
+    """
+    Encode một command thành RESP array of bulk strings
+    """
+    out = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif isinstance(part, (int, float)):
+            part = str(part).encode("ascii")
+        out.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(out)
+
+
+def read_reply(rfile) -> Any:
+    """
+    Đọc một reply RESP từ file-like object (blocking)
+    """
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("Cache server closed the connection")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        raise RespError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = rfile.read(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(rfile) for _ in range(length)]
+    raise RespError(f"Unknown RESP reply: {line!r}")
+
+
+class _Connection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+
+    def execute(self, *parts: Any) -> Any:
+        self.sock.sendall(encode_command(*parts))
+        return read_reply(self.rfile)
+
+    def pipeline(self, commands: List[tuple]) -> List[Any]:
+        """
+        Gửi nhiều command trong một lần write, đọc reply theo thứ tự
+        """
+        self.sock.sendall(b"".join(encode_command(*c) for c in commands))
+        replies = []
+        for _ in commands:
+            try:
+                replies.append(read_reply(self.rfile))
+            except RespError as e:
+                replies.append(e)
+        return replies
+
+    def close(self) -> None:
+        try:
+            self.rfile.close()
+        finally:
+            self.sock.close()
+
+
+# HMAC-SHA256 đứng trước payload pickle
+_SIGNATURE_SIZE = 32
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend dùng chung giữa các worker qua giao thức Redis.
+
+    URL: redis://[:password@]host:port/db hoặc unix:///path/to/socket?db=0
+    Mọi key được prefix bằng namespace để nhiều cache dùng chung một server.
+    Lỗi kết nối được coi như cache miss để API vẫn chạy khi cache server down.
+
+    Value được pickle và ký HMAC-SHA256 bằng signing_key: ai ghi được vào cache
+    server mà không có key thì không làm app unpickle dữ liệu của họ.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        namespace: str,
+        signing_key: bytes,
+        timeout: float = 0.5,
+        max_idle: int = 16,
+        retry_after: float = 1.0,
+    ):
+        self.url = url
+        self.namespace = namespace
+        self._signing_key = signing_key
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.errors = 0
+        self.bad_signatures = 0
+        # Sau lỗi kết nối, bỏ qua server trong retry_after giây (tránh mỗi request chờ timeout)
+        self._down_until = 0.0
+
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        self._password = unquote(parsed.password) if parsed.password else None
+        if parsed.scheme == "unix":
+            self._address = parsed.path
+            self._family = socket.AF_UNIX
+            self._db = int(query.get("db", ["0"])[0])
+        elif parsed.scheme == "redis":
+            self._address = (parsed.hostname or "127.0.0.1", parsed.port or 6379)
+            self._family = socket.AF_INET
+            self._db = int((parsed.path or "/0").lstrip("/") or 0)
+        else:
+            raise ValueError(f"Unsupported cache URL: {url}")
+
+        self._pool: "queue.LifoQueue[_Connection]" = queue.LifoQueue(maxsize=max_idle)
+
+    # ---- connection handling ----
+
+    def _connect(self) -> _Connection:
+        sock = socket.socket(self._family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._address)
+        if self._family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = _Connection(sock)
+        if self._password:
+            conn.execute("AUTH", self._password)
+        if self._db:
+            conn.execute("SELECT", self._db)
+        return conn
+
+    def execute(self, *parts: Any) -> Any:
+        """
+        Gửi một command, tự mở/tái sử dụng connection từ pool
+        """
+        return self._with_connection(lambda conn: conn.execute(*parts))
+
+    def pipeline(self, commands: List[tuple]) -> List[Any]:
+        """
+        Gửi nhiều command trong một round trip
+        """
+        return self._with_connection(lambda conn: conn.pipeline(commands))
+
+    def _with_connection(self, fn):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            reply = fn(conn)
+        except RespError:
+            self._release(conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn: _Connection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _safe(self, *parts: Any, default: Any = None) -> Any:
+        return self._guard(parts[0], lambda: self.execute(*parts), default)
+
+    def _safe_pipeline(self, commands: List[tuple]) -> List[Any]:
+        return self._guard(commands[0][0], lambda: self.pipeline(commands), [])
+
+    def _guard(self, command: str, fn, default: Any) -> Any:
+        if time.time() < self._down_until:
+            return default
+        try:
+            return fn()
+        except RespError as e:
+            self.errors += 1
+            print(f"[Cache] {self.name} backend error on {command}: {e}")
+            return default
+        except (OSError, ConnectionError) as e:
+            self.errors += 1
+            self._down_until = time.time() + self.retry_after
+            print(f"[Cache] {self.name} backend unavailable ({command}): {e}")
+            return default
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    # ---- CacheBackend API ----
+
+    def get(self, key: str) -> Optional[Entry]:
+        raw = self._safe("GET", self._key(key))
+        if raw is None:
+            return None
+        signature, payload = raw[:_SIGNATURE_SIZE], raw[_SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            # Không phải do app ghi (hoặc khác signing key): coi như miss, không unpickle
+            self.bad_signatures += 1
+            return None
+        try:
+            return pickle.loads(payload)
+        except Exception:
+            return None
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._signing_key, payload, "sha256").digest()
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        expire_time: float,
+        stale_until: float,
+        tags: Iterable[str] = (),
+    ) -> None:
+        ttl_ms = int((stale_until - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        payload = pickle.dumps(
+            (value, expire_time, stale_until), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        commands = [("SET", self._key(key), self._sign(payload) + payload, "PX", ttl_ms)]
+        # Tag set sống ít nhất bằng entry sống lâu nhất của nó: chỉ kéo dài TTL, không rút ngắn.
+        # NX đặt TTL cho set mới tạo; GT chỉ tăng (GT bỏ qua key chưa có TTL) - Redis >= 7.0
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            commands.append(("SADD", tag_key, key))
+            commands.append(("PEXPIRE", tag_key, ttl_ms, "NX"))
+            commands.append(("PEXPIRE", tag_key, ttl_ms, "GT"))
+        self._safe_pipeline(commands)
+
+    def delete(self, key: str) -> None:
+        self._safe("DEL", self._key(key))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        members = self._safe_pipeline([("SMEMBERS", k) for k in tag_keys])
+        keys = set()
+        for reply in members:
+            if isinstance(reply, list):
+                keys.update(m.decode("utf-8") for m in reply)
+        removed = self._safe("DEL", *[self._key(k) for k in keys]) if keys else 0
+        self._safe("DEL", *tag_keys)
+        return removed or 0
+
+    def list_tags(self, prefix: str = "") -> List[str]:
+        base = self._tag_key("")
+        return [
+            k.decode("utf-8")[len(base):]
+            for k in self.scan_keys(f"{base}{prefix}*")
+        ]
+
+    def scan_keys(self, pattern: str) -> List[bytes]:
+        keys: List[bytes] = []
+        cursor = b"0"
+        while True:
+            reply = self._safe("SCAN", cursor, "MATCH", pattern, "COUNT", 1000)
+            if not reply:
+                return keys
+            cursor, batch = reply
+            keys.extend(batch)
+            if cursor in (b"0", 0, "0"):
+                return keys
+
+    def clear(self) -> None:
+        keys = self.scan_keys(f"{self.namespace}:*")
+        for i in range(0, len(keys), 500):
+            self._safe("DEL", *keys[i:i + 500])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "url": self._redacted_url(),
+            "namespace": self.namespace,
+            "errors": self.errors,
+            "bad_signatures": self.bad_signatures,
+        }
+
+    def __len__(self) -> int:
+        total = len(self.scan_keys(f"{self.namespace}:*"))
+        return total - len(self.scan_keys(self._tag_key("*")))
+
+    def _redacted_url(self) -> str:
+        if self._password:
+            return self.url.replace(self._password, "***")
+        return self.url
@@ -0,0 +1,247 @@
+"""
+Cache server dùng chung cho nhiều uvicorn worker trên một máy.
+
+Stand-in nhỏ cho Redis: nói giao thức RESP, hỗ trợ đủ các command mà
+RedisBackend dùng (GET/SET PX/DEL/SCAN/SADD/SMEMBERS/...). Dữ liệu nằm trong một
+MemoryBackend bounded nên RSS của server không tăng vô hạn.
+
+Usage:
+    cd backend
+    python -m app.cache_server --port 6380
+    python -m app.cache_server --unix /tmp/bookingai-cache.sock
+
+Rồi chạy API với CACHE_BACKEND=redis và CACHE_URL=redis://127.0.0.1:6380/0
+(hoặc unix:///tmp/bookingai-cache.sock). Có thể thay bằng Redis thật.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, List, Optional
+
+from app.cache_backends import MemoryBackend
+
+FOREVER = float("inf")
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(items: List[bytes]) -> bytes:
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+def _int(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+WRONGTYPE = b"-WRONGTYPE Operation against a key holding the wrong kind of value\r\n"
+
+
+class CacheServer:
+    def __init__(self, store: MemoryBackend):
+        self.store = store
+        self.commands = 0
+
+    async def read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command (vd: gõ tay bằng telnet / nc)
+            return line.strip().split()
+        parts = []
+        for _ in range(int(line[1:-2])):
+            header = await reader.readline()
+            length = int(header[1:-2])
+            data = await reader.readexactly(length + 2)
+            parts.append(data[:-2])
+        return parts
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                parts = await self.read_command(reader)
+                if not parts:
+                    break
+                self.commands += 1
+                name = parts[0].upper().decode("ascii", errors="replace")
+                if name == "QUIT":
+                    writer.write(OK)
+                    await writer.drain()
+                    break
+                try:
+                    reply = self.dispatch(name, parts[1:])
+                except Exception as e:
+                    reply = f"-ERR {e}\r\n".encode("utf-8")
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def dispatch(self, name: str, args: List[bytes]) -> bytes:
+        store = self.store
+
+        if name == "PING":
+            return _bulk(args[0]) if args else b"+PONG\r\n"
+
+        if name in ("SELECT", "AUTH", "CLIENT"):
+            return OK
+
+        if name == "GET":
+            entry = store.get(args[0].decode("utf-8"))
+            if entry and not isinstance(entry[0], bytes):
+                return WRONGTYPE
+            return _bulk(entry[0] if entry else None)
+
+        if name == "SET":
+            key = args[0].decode("utf-8")
+            expires = FOREVER
+            options = [a.upper() for a in args[2:]]
+            if b"PX" in options:
+                expires = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires = time.time() + int(args[2 + options.index(b"EX") + 1])
+            store.set(key, args[1], expires, expires)
+            return OK
+
+        if name in ("DEL", "UNLINK"):
+            removed = 0
+            for raw in args:
+                key = raw.decode("utf-8")
+                if store.get(key) is not None:
+                    store.delete(key)
+                    removed += 1
+            return _int(removed)
+
+        if name == "SADD":
+            key = args[0].decode("utf-8")
+            entry = store.get(key)
+            if entry is None:
+                store.set(key, set(args[1:]), FOREVER, FOREVER)
+                return _int(len(set(args[1:])))
+            if not isinstance(entry[0], set):
+                return WRONGTYPE
+            # Sửa set tại chỗ (không tính lại size) để SADD luôn O(1)
+            before = len(entry[0])
+            entry[0].update(args[1:])
+            return _int(len(entry[0]) - before)
+
+        if name == "SMEMBERS":
+            entry = store.get(args[0].decode("utf-8"))
+            if entry and not isinstance(entry[0], set):
+                return WRONGTYPE
+            return _array([_bulk(m) for m in (entry[0] if entry else ())])
+
+        if name == "SREM":
+            key = args[0].decode("utf-8")
+            entry = store.get(key)
+            if not entry:
+                return _int(0)
+            members = entry[0]
+            before = len(members)
+            members.difference_update(args[1:])
+            if not members:
+                store.delete(key)
+            return _int(before - len(members))
+
+        if name in ("PEXPIRE", "EXPIRE"):
+            key = args[0].decode("utf-8")
+            entry = store.get(key)
+            if not entry:
+                return _int(0)
+            amount = int(args[1])
+            expires = time.time() + (amount / 1000 if name == "PEXPIRE" else amount)
+            # NX/XX/GT/LT như Redis 7: key không có TTL coi như TTL vô hạn
+            options = {a.upper() for a in args[2:]}
+            current = entry[1]
+            if (
+                (b"NX" in options and current != FOREVER)
+                or (b"XX" in options and current == FOREVER)
+                or (b"GT" in options and (current == FOREVER or expires <= current))
+                or (b"LT" in options and current != FOREVER and expires >= current)
+            ):
+                return _int(0)
+            store.set(key, entry[0], expires, expires)
+            return _int(1)
+
+        if name == "EXISTS":
+            return _int(sum(1 for raw in args if store.get(raw.decode("utf-8")) is not None))
+
+        if name == "SCAN":
+            pattern = "*"
+            options = [a.upper() for a in args[1:]]
+            if b"MATCH" in options:
+                pattern = args[1 + options.index(b"MATCH") + 1].decode("utf-8")
+            # Trả toàn bộ key khớp trong một lần (cursor luôn về 0)
+            keys = [_bulk(k.encode("utf-8")) for k in store.keys(pattern)]
+            return _array([_bulk(b"0"), _array(keys)])
+
+        if name == "DBSIZE":
+            store.cleanup_expired()
+            return _int(len(store))
+
+        if name in ("FLUSHDB", "FLUSHALL"):
+            store.clear()
+            return OK
+
+        if name == "INFO":
+            stats = store.stats()
+            stats["commands_processed"] = self.commands
+            body = "".join(f"{k}:{v}\r\n" for k, v in stats.items()).encode("utf-8")
+            return _bulk(body)
+
+        return f"-ERR unknown command '{name}'\r\n".encode("utf-8")
+
+
+async def _cleanup_loop(store: MemoryBackend, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        store.cleanup_expired()
+
+
+async def serve(host: str, port: int, unix_path: Optional[str], store: MemoryBackend):
+    server = CacheServer(store)
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.remove(unix_path)
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+        print(f"🚀 Cache server listening on unix://{unix_path}")
+    else:
+        listener = await asyncio.start_server(server.handle, host=host, port=port)
+        print(f"🚀 Cache server listening on {host}:{port}")
+
+    asyncio.create_task(_cleanup_loop(store, 5.0))
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="BookingAI shared cache server (RESP)")
+    parser.add_argument("--host", default=os.getenv("CACHE_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CACHE_SERVER_PORT", 6380)))
+    parser.add_argument("--unix", default=os.getenv("CACHE_SERVER_UNIX"), help="Unix socket path")
+    parser.add_argument("--max-entries", type=int, default=100000)
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--eviction", choices=["lru", "lfu"], default="lru")
+    args = parser.parse_args(argv)
+
+    store = MemoryBackend(
+        max_entries=args.max_entries or None,
+        max_bytes=args.max_bytes or None,
+        eviction=args.eviction,
+    )
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, store))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,202 @@
+import itertools
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+def _normalize_url(url: str) -> str:
+    # Render may inject postgres://, SQLAlchemy expects postgresql://
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
 # Use environment database URL in production, fallback to local SQLite for dev.
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/ai_booking.db")
+SQLALCHEMY_DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL", "sqlite:///./data/ai_booking.db"))
 
-# Render may inject postgres://, SQLAlchemy expects postgresql://
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(
-        "postgres://", "postgresql://", 1
-    )
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=False,
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool settings (đo bằng GET /api/admin/db/pool rồi chỉnh qua env)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)  # giây chờ connection trước khi lỗi
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # đóng connection sống quá N giây
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# SQLite pragmas (áp dụng cho mỗi connection mới)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_CACHE_SIZE = _env_int("SQLITE_CACHE_SIZE", -64000)  # âm = KiB -> 64 MB
+SQLITE_BUSY_TIMEOUT = _env_int("SQLITE_BUSY_TIMEOUT", 5000)  # ms
+
+
+class _PoolStatsMixin:
+    """
+    Đếm số lần checkout, thời gian chờ connection và số lần timeout của pool
+    """
+
+    # Checkout lâu hơn ngưỡng này được tính là phải chờ (pool đang cạn)
+    WAIT_THRESHOLD = 0.001
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += elapsed
+                self.max_wait = max(self.max_wait, elapsed)
+                if elapsed > self.WAIT_THRESHOLD:
+                    self.waits += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(_PoolStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_in_memory_sqlite = SQLALCHEMY_DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        if not _in_memory_sqlite:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    finally:
+        cursor.close()
+
+
+def _create_sync_engine(url: str):
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # DB trong RAM chỉ sống trong một connection -> giữ pool mặc định của SQLAlchemy
+        new_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            echo=False,
+        )
+    elif url.startswith("sqlite"):
+        new_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            echo=False,
+        )
+    else:
+        new_engine = create_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            echo=False,
+        )
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = _create_sync_engine(SQLALCHEMY_DATABASE_URL)
+
+
+def _pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {
+        "pool_class": type(pool).__name__,
+        "dialect": engine.dialect.name,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, _PoolStatsMixin):
+        status.update(pool.stats())
+    return status
+
+
+def pool_status() -> dict:
+    """
+    Trạng thái pool hiện tại + số liệu chờ connection (cho /api/admin/db/pool)
+    """
+    status = _pool_status(engine)
+    if ASYNC_DATABASE_URL in _async_engines:
+        status["async"] = _pool_status(_async_engines[ASYNC_DATABASE_URL].sync_engine)
+    if read_engines:
+        replicas = []
+        for read_engine, async_url in zip(read_engines, _ASYNC_READ_URLS):
+            replica = {"host": read_engine.url.host or read_engine.url.database, **_pool_status(read_engine)}
+            if async_url in _async_engines:
+                replica["async"] = _pool_status(_async_engines[async_url].sync_engine)
+            replicas.append(replica)
+        status["replicas"] = replicas
+    return status
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -34,3 +211,218 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    DB session dùng ngoài request (background refresh, jobs)
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ============= Async engine (route đọc async) =============
+# Các endpoint đọc nhiều (hotels, rooms, availability) chạy thẳng trên event loop
+# với AsyncSession nên không bị giới hạn bởi threadpool của FastAPI.
+# Engine tạo lazy ở request đầu tiên: cần asyncpg (Postgres) / aiosqlite (SQLite).
+# Chỉ dùng để đọc: session event (availability index, rollup) gắn trên SessionLocal.
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        # Backend khác: đặt DATABASE_ASYNC_URL với driver async tương ứng
+        return url
+    parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+    # asyncpg không hiểu sslmode của libpq (Render/Heroku hay gắn ?sslmode=require)
+    if backend == "postgresql" and "sslmode" in parsed.query:
+        sslmode = parsed.query["sslmode"]
+        parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("DATABASE_ASYNC_URL") or _async_database_url(SQLALCHEMY_DATABASE_URL)
+
+_async_engines: Dict[str, object] = {}
+_async_session_factories: Dict[str, object] = {}
+_async_lock = threading.Lock()
+
+
+def _async_session_factory(url: Optional[str] = None):
+    """
+    async_sessionmaker cho url (mặc định primary), tạo engine lazy lần đầu
+    """
+    url = url or ASYNC_DATABASE_URL
+    factory = _async_session_factories.get(url)
+    if factory is not None:
+        return factory
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    with _async_lock:
+        if url not in _async_session_factories:
+            if url.startswith("sqlite") and _in_memory_sqlite:
+                # DB trong RAM không chia sẻ được giữa hai engine
+                async_engine = create_async_engine(url, echo=False)
+            else:
+                async_engine = create_async_engine(
+                    url,
+                    poolclass=InstrumentedAsyncQueuePool,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                    echo=False,
+                )
+            if async_engine.dialect.name == "sqlite":
+                event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+            _async_engines[url] = async_engine
+            _async_session_factories[url] = async_sessionmaker(
+                async_engine, autoflush=False, expire_on_commit=False
+            )
+        return _async_session_factories[url]
+
+
+async def get_async_db():
+    """
+    Dependency AsyncSession cho các route async (chỉ đọc)
+    """
+    async with _async_session_factory()() as db:
+        yield db
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """
+    AsyncSession dùng ngoài request (background refresh của route async)
+    """
+    async with _async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    with _async_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_session_factories.clear()
+    for async_engine in engines:
+        await async_engine.dispose()
+
+
+# ============= Read replicas =============
+# DATABASE_READ_URL: một hoặc nhiều URL replica, cách nhau bằng dấu phẩy. Các endpoint
+# chỉ đọc (get_read_db / get_async_read_db) chia lần lượt cho các replica, mọi ghi
+# vẫn vào DATABASE_URL. Không đặt -> đọc từ primary như cũ.
+#
+# Read-your-writes: sau khi đặt/hủy/thanh toán booking, pin_primary_reads() gắn cookie (chỉ cùng site)
+# + header db_primary_until; trong READ_YOUR_WRITES_SECONDS các request đọc mang cookie
+# (hoặc gửi lại header X-DB-Primary-Until, như frontend/lib/api.ts) đi vào primary, không thấy dữ liệu cũ do replica lag.
+
+DATABASE_READ_URLS = [
+    _normalize_url(url.strip())
+    for url in os.getenv("DATABASE_READ_URL", "").split(",")
+    if url.strip()
+]
+READ_YOUR_WRITES_SECONDS = _env_int("READ_YOUR_WRITES_SECONDS", 10)
+PRIMARY_READ_COOKIE = "db_primary_until"
+PRIMARY_READ_HEADER = "X-DB-Primary-Until"
+
+read_engines = [_create_sync_engine(url) for url in DATABASE_READ_URLS]
+_read_session_factories = [
+    sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    for read_engine in read_engines
+]
+_ASYNC_READ_URLS = [_async_database_url(url) for url in DATABASE_READ_URLS]
+_read_counter = itertools.count()
+
+
+def _reads_pinned_to_primary(request: Optional[Request]) -> bool:
+    if request is None:
+        return False
+    raw = request.headers.get(PRIMARY_READ_HEADER) or request.cookies.get(PRIMARY_READ_COOKIE)
+    if not raw:
+        return False
+    try:
+        return float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+def _pick_replica(request: Optional[Request]) -> Optional[int]:
+    # None -> đọc từ primary
+    if not read_engines or _reads_pinned_to_primary(request):
+        return None
+    return next(_read_counter) % len(read_engines)
+
+
+def read_session(request: Optional[Request] = None):
+    replica = _pick_replica(request)
+    if replica is None:
+        return SessionLocal()
+    return _read_session_factories[replica]()
+
+
+def get_read_db(request: Request):
+    """
+    Dependency session chỉ đọc: replica nếu có, primary nếu client vừa ghi
+    """
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def read_session_scope():
+    """
+    Session chỉ đọc dùng ngoài request (background refresh của endpoint đọc)
+    """
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """
+    Như get_read_db cho route async
+    """
+    replica = _pick_replica(request)
+    url = None if replica is None else _ASYNC_READ_URLS[replica]
+    async with _async_session_factory(url)() as db:
+        yield db
+
+
+@asynccontextmanager
+async def async_read_session_scope():
+    replica = _pick_replica(None)
+    url = None if replica is None else _ASYNC_READ_URLS[replica]
+    async with _async_session_factory(url)() as db:
+        yield db
+
+
+def pin_primary_reads(response: Response) -> None:
+    """
+    Cho client vừa ghi đọc từ primary trong READ_YOUR_WRITES_SECONDS giây
+    """
+    if not read_engines:
+        return
+    until = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+    response.set_cookie(
+        PRIMARY_READ_COOKIE,
+        until,
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+    response.headers[PRIMARY_READ_HEADER] = until
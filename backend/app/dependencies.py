@@ -1,15 +1,40 @@
 # Authentication Dependencies
+import copy
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.database import get_db
 from app import models
 from app.auth import decode_token
+from app.cache import principal_cache, user_tag
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+# Không cache hash mật khẩu; change-password đọc lại từ DB khi cần (attribute expired)
+_PRINCIPAL_EXCLUDED = {"hashed_password"}
+
+
+def _principal_values(user: models.User) -> dict:
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(models.User).column_attrs
+        if attr.key not in _PRINCIPAL_EXCLUDED
+    }
+
+
+def _attach_principal(db: Session, values: dict) -> models.User:
+    """
+    Dựng lại User từ cache và gắn vào session của request mà không query.
+    Object ở trạng thái persistent như vừa load nên route sửa rồi commit vẫn được.
+    """
+    user = models.User(**copy.deepcopy(values))
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -41,11 +66,24 @@ def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    # Get user from database
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
-    if user is None:
+    # Get user from principal cache (miss -> database)
+    user_id = int(user_id)
+    loaded = {}
+
+    def load_principal():
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        loaded["user"] = user
+        return _principal_values(user) if user is not None else None
+
+    values = principal_cache.get_or_set(
+        f"user:{user_id}", load_principal, tags=[user_tag(user_id)]
+    )
+    if values is None:
         raise credentials_exception
-    
+
+    user = loaded.get("user")
+    if user is None:
+        user = _attach_principal(db, values)
     return user
 
 
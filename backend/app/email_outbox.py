@@ -0,0 +1,539 @@
+"""
+Outbox email: endpoint insert row, một worker async duy nhất gửi qua SMTP
+
+Trước đây mỗi email xác nhận chạy trong một thread/asyncio.run riêng (mở kết nối
+SMTP mới, mất email nếu process dừng), còn admin.confirm_payment chờ gửi xong mới
+trả response. Giờ:
+
+- enqueue_email() thêm row email_outbox vào session của request -> commit cùng
+  payment, không có I/O SMTP trong request
+- EmailOutboxWorker (task trên event loop, start trong lifespan) claim từng batch
+  row đến hạn, gửi tuần tự trên một kết nối SMTP dùng lại giữa các batch
+- Lỗi tạm thời (mất kết nối, timeout, 4xx): retry với exponential backoff
+- Lỗi vĩnh viễn (5xx, người nhận bị từ chối, không render được) hoặc quá
+  EMAIL_OUTBOX_MAX_ATTEMPTS lần: status = dead (dead-letter), admin gửi lại được
+
+Claim bằng UPDATE ... WHERE status/next_attempt_at + claim_token nên nhiều worker
+uvicorn chạy cùng lúc không gửi trùng. Row "sending" của worker chết giữa chừng
+được claim lại sau EMAIL_OUTBOX_LEASE_SECONDS.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, session_scope
+
+PENDING, SENDING, SENT, DEAD = "pending", "sending", "sent", "dead"
+
+# Kết quả gửi một email
+_SENT, _RETRY, _DEAD = "sent", "retry", "dead"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ============= Enqueue (trong request) =============
+
+def enqueue_email(db: Session, kind: str, to_email: str, payload: dict) -> models.EmailOutbox:
+    """
+    Thêm email vào outbox; được gửi sau khi session commit
+    """
+    row = models.EmailOutbox(
+        kind=kind,
+        to_email=to_email,
+        payload=payload,
+        status=PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(row)
+    db.info["email_outbox_enqueued"] = True
+    return row
+
+
+def booking_confirmation_payload(
+    db: Session,
+    booking: models.Booking,
+    customer_name: str,
+    payment_method: str,
+    total_price,
+) -> dict:
+    """
+    Dữ liệu cho template xác nhận đặt phòng (chỉ kiểu JSON được)
+    """
+    hotel_name, room_name = (
+        db.query(models.Hotel.name).filter(models.Hotel.id == booking.hotel_id).scalar(),
+        db.query(models.Room.name).filter(models.Room.id == booking.room_id).scalar(),
+    )
+    return {
+        "booking_id": booking.id,
+        "customer_name": customer_name,
+        "hotel_name": hotel_name or "N/A",
+        "room_type": room_name or "N/A",
+        "check_in_date": booking.check_in_date.strftime("%d/%m/%Y"),
+        "check_out_date": booking.check_out_date.strftime("%d/%m/%Y"),
+        "guests": booking.guests,
+        "payment_method": payment_method,
+        "payment_status": "Đã thanh toán",
+        "total_price": int(total_price),
+    }
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _wake_worker_after_commit(session):
+    # Có email mới -> worker gửi ngay thay vì chờ lượt poll
+    if session.info.pop("email_outbox_enqueued", False):
+        email_outbox_worker.notify()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_enqueued_flag(session):
+    session.info.pop("email_outbox_enqueued", None)
+
+
+# ============= SMTP =============
+
+class SMTPSettings:
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.port = _env_int("SMTP_PORT", 587)
+        self.username = os.getenv("SMTP_USER", "")
+        self.password = os.getenv("SMTP_PASSWORD", "")
+        self.sender = os.getenv("SMTP_FROM", "noreply@bookingai.com")
+        # Địa chỉ cho MAIL FROM (SMTP_FROM có thể dạng "Tên <addr>")
+        self.envelope_sender = parseaddr(self.sender)[1] or self.sender
+        self.start_tls = _env_bool("SMTP_STARTTLS", True)
+        self.use_tls = _env_bool("SMTP_SSL", False)
+        self.validate_certs = _env_bool("SMTP_VALIDATE_CERTS", True)
+        self.timeout = _env_float("SMTP_TIMEOUT", 30.0)
+
+
+def build_message(sender: str, to_email: str, subject: str, html_body: str) -> EmailMessage:
+    """
+    Email text/html (utf-8, base64). Header mã hóa qua headerregistry nên tên hiển thị /
+    subject không phải ASCII vẫn đúng; địa chỉ không phải ASCII được gửi bằng SMTPUTF8.
+    """
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = to_email
+    message["Subject"] = subject
+    message["Date"] = formatdate(usegmt=True)
+    message["Message-ID"] = make_msgid(domain=_msgid_domain(sender))
+    message.set_content(html_body, subtype="html", charset="utf-8", cte="base64")
+    return message
+
+
+@lru_cache(maxsize=8)
+def _msgid_domain(sender: str) -> str:
+    # make_msgid() không có domain sẽ gọi socket.getfqdn() mỗi lần
+    domain = parseaddr(sender)[1].rpartition("@")[2]
+    try:
+        return domain.encode("idna").decode("ascii") if domain else "localhost"
+    except UnicodeError:
+        return "localhost"
+
+
+# ============= Worker =============
+
+class EmailOutboxWorker:
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        lease_seconds: float,
+        idle_timeout: float,
+        max_messages_per_connection: int,
+        retention_days: int,
+    ):
+        self.batch_size = max(batch_size, 1)
+        self.poll_interval = poll_interval
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max(max_messages_per_connection, 1)
+        self.retention_days = retention_days
+        self.smtp = SMTPSettings()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._client = None
+        self._client_messages = 0
+        self._client_used_at = 0.0
+        self._last_purge = 0.0
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.connections = 0
+
+    # ============= Lifecycle =============
+
+    def start(self) -> None:
+        """
+        Chạy worker trên event loop hiện tại (gọi trong lifespan)
+        """
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+        logging.info("[EmailOutbox] Worker started")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            # Cho batch đang gửi chạy xong; row chưa gửi sẽ được claim lại sau lease
+            await asyncio.wait_for(task, timeout=self.smtp.timeout + 5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            task.cancel()
+        await self._close_client()
+
+    def notify(self) -> None:
+        """
+        Báo có email mới (gọi được từ thread của request sync)
+        """
+        loop = self._loop
+        if loop is None or self._task is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass  # loop đã đóng
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            claimed = 0
+            try:
+                claimed = await self.process_batch()
+                await self._maybe_purge()
+            except Exception as e:
+                logging.error(f"[EmailOutbox] Batch failed: {e}")
+
+            # Batch đầy -> còn email đến hạn, gửi tiếp ngay
+            if claimed >= self.batch_size:
+                continue
+            if self._client is not None and time.monotonic() - self._client_used_at >= self.idle_timeout:
+                await self._close_client()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._idle_wait())
+            except asyncio.TimeoutError:
+                pass
+
+    def _idle_wait(self) -> float:
+        if self._client is None:
+            return self.poll_interval
+        # Thức dậy đúng lúc để đóng kết nối SMTP rảnh
+        remaining = self.idle_timeout - (time.monotonic() - self._client_used_at)
+        return max(0.1, min(self.poll_interval, remaining))
+
+    # ============= Batch =============
+
+    async def process_batch(self) -> int:
+        """
+        Claim và gửi một batch email đến hạn; trả về số row đã claim
+        """
+        lease_until = time.monotonic() + self.lease_seconds
+        rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+
+        results = []
+        held = None
+        for row_id, token, kind, to_email, payload, attempts in rows:
+            # Gửi tuần tự có thể lâu hơn lease: gia hạn trước khi lease kịp hết hạn,
+            # nếu không worker khác claim lại và gửi trùng
+            if lease_until - time.monotonic() < self._send_budget():
+                lease_until = time.monotonic() + self.lease_seconds
+                held = await asyncio.to_thread(self._renew_lease, token)
+            if held is not None and row_id not in held:
+                continue  # lease đã mất, row thuộc worker khác
+            if attempts > self.max_attempts:
+                # Bị claim lại nhiều lần mà không ghi được kết quả (worker chết giữa chừng)
+                results.append((row_id, token, attempts, _DEAD, "Exceeded max attempts"))
+                continue
+            outcome, error = await self._deliver(kind, to_email, payload)
+            if outcome == _RETRY and attempts >= self.max_attempts:
+                outcome = _DEAD
+            results.append((row_id, token, attempts, outcome, error))
+
+        await asyncio.to_thread(self._record, results)
+        return len(rows)
+
+    def _claim(self) -> List[Tuple]:
+        outbox = models.EmailOutbox
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = (outbox.status.in_((PENDING, SENDING)), outbox.next_attempt_at <= now)
+        with session_scope() as db:
+            # Không ORDER BY: mọi row lấy ra đều đã đến hạn, sort thêm chỉ tốn temp b-tree
+            ids = db.execute(select(outbox.id).where(*due).limit(self.batch_size)).scalars().all()
+            if not ids:
+                return []
+            # Điều kiện lặp lại trong UPDATE: worker khác claim trước thì row bị bỏ qua
+            db.execute(
+                update(outbox)
+                .where(outbox.id.in_(ids), *due)
+                .values(
+                    status=SENDING,
+                    claim_token=token,
+                    attempts=outbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return [
+                tuple(row)
+                for row in db.execute(
+                    select(outbox.id, outbox.claim_token, outbox.kind, outbox.to_email, outbox.payload, outbox.attempts)
+                    .where(outbox.claim_token == token, outbox.status == SENDING)
+                    .order_by(outbox.id)
+                )
+            ]
+
+    def _send_budget(self) -> float:
+        # Thời gian tối đa cho một email: connect/STARTTLS/AUTH + MAIL/RCPT/DATA, mỗi bước <= timeout
+        return self.smtp.timeout * 6
+
+    def _renew_lease(self, token: str) -> set:
+        """
+        Gia hạn lease các row của batch (kể cả row đã gửi, chưa ghi kết quả);
+        trả về id row còn giữ
+        """
+        outbox = models.EmailOutbox
+        with session_scope() as db:
+            db.execute(
+                update(outbox)
+                .where(outbox.claim_token == token, outbox.status == SENDING)
+                .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return set(db.execute(
+                select(outbox.id).where(outbox.claim_token == token, outbox.status == SENDING)
+            ).scalars())
+
+    def _record(self, results: List[Tuple]) -> None:
+        outbox = models.EmailOutbox
+        now = datetime.utcnow()
+        with session_scope() as db:
+            for row_id, token, attempts, outcome, error in results:
+                if outcome == _SENT:
+                    values = {"status": SENT, "sent_at": now, "last_error": None}
+                elif outcome == _RETRY:
+                    values = {"status": PENDING, "next_attempt_at": now + self._backoff(attempts), "last_error": error}
+                else:
+                    values = {"status": DEAD, "last_error": error}
+                # claim_token: lease hết hạn và worker khác đã claim lại -> không ghi đè
+                db.execute(
+                    update(outbox)
+                    .where(outbox.id == row_id, outbox.claim_token == token)
+                    .values(claim_token=None, **values)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+
+        for _, _, _, outcome, error in results:
+            if outcome == _SENT:
+                self.sent += 1
+            elif outcome == _RETRY:
+                self.retried += 1
+            else:
+                self.dead += 1
+                logging.error(f"[EmailOutbox] Email moved to dead-letter: {error}")
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(attempts - 1, 0)))
+        # Jitter để các email lỗi cùng lúc không retry cùng lúc
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    async def _maybe_purge(self) -> None:
+        if self.retention_days <= 0 or time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        await asyncio.to_thread(self._purge_sent)
+
+    def _purge_sent(self) -> None:
+        outbox = models.EmailOutbox
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        with session_scope() as db:
+            db.execute(delete(outbox).where(outbox.status == SENT, outbox.sent_at < cutoff))
+            db.commit()
+
+    # ============= Gửi =============
+
+    async def _deliver(self, kind: str, to_email: str, payload: dict) -> Tuple[str, Optional[str]]:
+        import aiosmtplib
+
+        from app.services.email_service import render_email
+
+        try:
+            subject, html_body = render_email(kind, payload or {})
+            message = build_message(self.smtp.sender, to_email, subject, html_body)
+        except Exception as e:
+            return _DEAD, f"Render failed: {e!r}"
+
+        try:
+            client = await self._get_client()
+        except Exception as e:
+            # Không kết nối / login được: không phải lỗi của email này
+            await self._close_client()
+            return _RETRY, f"Connect failed: {e!r}"[:1000]
+
+        try:
+            await client.send_message(message, sender=self.smtp.envelope_sender, recipients=[to_email])
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            error = "; ".join(f"{r.code} {r.message}" for r in e.recipients)[:1000]
+            # 4xx (greylisting, mailbox tạm bận) vẫn retry
+            if all(r.code >= 500 for r in e.recipients):
+                return _DEAD, error
+            return _RETRY, error
+        except (ValueError, aiosmtplib.SMTPNotSupported) as e:
+            # Địa chỉ email không hợp lệ, hoặc không phải ASCII mà server không hỗ trợ SMTPUTF8
+            return _DEAD, repr(e)[:1000]
+        except aiosmtplib.SMTPResponseException as e:
+            # Server đã trả lời cho message này: kết nối vẫn dùng được
+            if e.code >= 500:
+                return _DEAD, f"{e.code} {e.message}"[:1000]
+            return _RETRY, f"{e.code} {e.message}"[:1000]
+        except Exception as e:
+            # Mất kết nối / timeout / login lỗi: bỏ kết nối, retry sau
+            await self._close_client()
+            return _RETRY, repr(e)[:1000]
+
+        self._client_messages += 1
+        self._client_used_at = time.monotonic()
+        if self._client_messages >= self.max_messages_per_connection:
+            await self._close_client()
+        return _SENT, None
+
+    async def _get_client(self):
+        if self._client is not None and self._client.is_connected:
+            return self._client
+        await self._close_client()
+
+        import aiosmtplib
+
+        smtp = self.smtp
+        client = aiosmtplib.SMTP(
+            hostname=smtp.host,
+            port=smtp.port,
+            username=smtp.username or None,
+            password=smtp.password or None,
+            use_tls=smtp.use_tls,
+            start_tls=False if smtp.use_tls else smtp.start_tls,
+            validate_certs=smtp.validate_certs,
+            timeout=smtp.timeout,
+        )
+        await client.connect()
+        self._client = client
+        self._client_messages = 0
+        self._client_used_at = time.monotonic()
+        self.connections += 1
+        return client
+
+    async def _close_client(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+    # ============= Stats =============
+
+    def stats(self) -> dict:
+        outbox = models.EmailOutbox
+        with session_scope() as db:
+            counts = dict(db.execute(select(outbox.status, func.count(outbox.id)).group_by(outbox.status)).all())
+        return {
+            "running": self._task is not None,
+            "queued": {status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, DEAD)},
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "smtp_connections": self.connections,
+        }
+
+
+def requeue_dead(db: Session, outbox_id: Optional[int] = None) -> int:
+    """
+    Đưa email dead về pending (None = tất cả); trả về số row
+    """
+    outbox = models.EmailOutbox
+    stmt = update(outbox).where(outbox.status == DEAD)
+    if outbox_id is not None:
+        stmt = stmt.where(outbox.id == outbox_id)
+    result = db.execute(
+        stmt.values(status=PENDING, attempts=0, next_attempt_at=datetime.utcnow(), claim_token=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.info["email_outbox_enqueued"] = True
+    db.commit()
+    return result.rowcount
+
+
+EMAIL_OUTBOX_ENABLED = _env_bool("EMAIL_OUTBOX_ENABLED", True)
+
+email_outbox_worker = EmailOutboxWorker(
+    batch_size=_env_int("EMAIL_OUTBOX_BATCH_SIZE", 50),
+    poll_interval=_env_float("EMAIL_OUTBOX_POLL_INTERVAL", 5.0),
+    max_attempts=_env_int("EMAIL_OUTBOX_MAX_ATTEMPTS", 8),
+    backoff_base=_env_float("EMAIL_OUTBOX_BACKOFF_BASE", 30.0),
+    backoff_max=_env_float("EMAIL_OUTBOX_BACKOFF_MAX", 3600.0),
+    lease_seconds=_env_float("EMAIL_OUTBOX_LEASE_SECONDS", 300.0),
+    idle_timeout=_env_float("SMTP_IDLE_TIMEOUT", 30.0),
+    max_messages_per_connection=_env_int("SMTP_MAX_MESSAGES_PER_CONNECTION", 100),
+    retention_days=_env_int("EMAIL_OUTBOX_RETENTION_DAYS", 7),
+)
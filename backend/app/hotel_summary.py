@@ -0,0 +1,111 @@
+"""
+Cột tổng hợp trên hotels: giá phòng min/max, số khách tối đa, rating trung bình
+
+- min_room_price, max_room_price, max_guests: từ rooms của hotel
+- avg_rating, review_count: từ reviews của hotel
+
+Sau mỗi flush có Room/Review mới/sửa/xóa, tính lại các cột cho đúng những hotel
+bị ảnh hưởng bằng một UPDATE (subquery theo hotel_id, dùng index của rooms/reviews)
+trong cùng transaction. Nhờ đó filter/sort danh sách hotel đọc cột có index,
+không join rooms hay aggregate reviews.
+
+Dữ liệu ghi ngoài ORM (SQL tay, bulk delete) không đi qua event:
+chạy lại `python scripts/backfill_hotel_summary.py`.
+"""
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session, attributes
+
+from app import models
+from app.database import SessionLocal
+
+SUMMARY_COLUMNS = ("min_room_price", "max_room_price", "max_guests", "avg_rating", "review_count")
+
+# Thay đổi các cột này mới làm summary đổi
+_ROOM_FIELDS = ("hotel_id", "base_price", "max_guests")
+_REVIEW_FIELDS = ("hotel_id", "overall_rating")
+
+
+def _summary_values() -> dict:
+    hotel_id = models.Hotel.id
+    room = models.Room
+    review = models.Review
+    return {
+        "min_room_price": select(func.min(room.base_price)).where(room.hotel_id == hotel_id).scalar_subquery(),
+        "max_room_price": select(func.max(room.base_price)).where(room.hotel_id == hotel_id).scalar_subquery(),
+        "max_guests": select(func.max(room.max_guests)).where(room.hotel_id == hotel_id).scalar_subquery(),
+        "avg_rating": select(func.avg(review.overall_rating)).where(review.hotel_id == hotel_id).scalar_subquery(),
+        "review_count": select(func.count(review.id)).where(review.hotel_id == hotel_id).scalar_subquery(),
+    }
+
+
+def _touched_hotels(obj, include_old: bool) -> Set[int]:
+    hotel_ids = {obj.hotel_id}
+    if include_old:
+        # Room/Review chuyển sang hotel khác -> hotel cũ cũng phải tính lại
+        history = attributes.get_history(obj, "hotel_id")
+        hotel_ids.update(history.deleted)
+    return {hotel_id for hotel_id in hotel_ids if hotel_id is not None}
+
+
+def _changed(session: Session, obj, fields: Iterable[str]) -> bool:
+    if not session.is_modified(obj, include_collections=False):
+        return False
+    return any(attributes.get_history(obj, field).has_changes() for field in fields)
+
+
+def refresh_hotel_summaries(session: Session, hotel_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Tính lại cột summary cho các hotel (None = tất cả)
+    """
+    hotels = models.Hotel.__table__
+    # Giữ nguyên updated_at: summary đổi không phải là sửa thông tin hotel
+    stmt = update(hotels).values(updated_at=hotels.c.updated_at, **_summary_values())
+    if hotel_ids is not None:
+        hotel_ids = sorted(set(hotel_ids))
+        if not hotel_ids:
+            return
+        stmt = stmt.where(hotels.c.id.in_(hotel_ids))
+    session.connection().execute(stmt)
+
+    # Hotel đang nằm trong session giữ giá trị cũ -> expire để lần đọc sau load lại
+    deleted = set(session.deleted)
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, models.Hotel) and obj not in deleted and (hotel_ids is None or obj.id in hotel_ids):
+            session.expire(obj, SUMMARY_COLUMNS)
+
+
+def apply_summary_changes(session: Session) -> None:
+    """
+    Tính lại summary cho các hotel có Room/Review thay đổi trong flush (gọi từ after_flush)
+    """
+    hotel_ids: Set[int] = set()
+    for obj in session.new:
+        if isinstance(obj, (models.Room, models.Review)):
+            hotel_ids |= _touched_hotels(obj, include_old=False)
+    for obj in session.dirty:
+        if isinstance(obj, models.Room) and _changed(session, obj, _ROOM_FIELDS):
+            hotel_ids |= _touched_hotels(obj, include_old=True)
+        elif isinstance(obj, models.Review) and _changed(session, obj, _REVIEW_FIELDS):
+            hotel_ids |= _touched_hotels(obj, include_old=True)
+    for obj in session.deleted:
+        if isinstance(obj, (models.Room, models.Review)):
+            hotel_ids |= _touched_hotels(obj, include_old=True)
+
+    if hotel_ids:
+        refresh_hotel_summaries(session, hotel_ids)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _hotel_summary_after_flush(session, flush_context):
+    apply_summary_changes(session)
+
+
+def rebuild_hotel_summaries(db: Session) -> int:
+    """
+    Tính lại summary cho mọi hotel (backfill)
+    """
+    refresh_hotel_summaries(db)
+    db.commit()
+    return db.query(func.count(models.Hotel.id)).scalar() or 0
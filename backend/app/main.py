@@ -1,6 +1,5 @@
 from fastapi import FastAPI, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
 from app.routers import (
     users,
     rooms,
@@ -12,11 +11,14 @@ from app.routers import (
     admin as admin_router,
     wishlists,
 )
-from app.cache import search_cache, availability_cache
+from app.cache import search_cache, availability_cache, principal_cache, invalidate_user
+from app.availability_index import availability_index, AVAILABILITY_INDEX_ENABLED
+from app.email_outbox import email_outbox_worker, EMAIL_OUTBOX_ENABLED
+from app.database import dispose_async_engine
+from app.password_hasher import PasswordHasherBusy, password_hasher
 import os
 
-# Create all database tables (handled via seed endpoint or startup)
-Base.metadata.create_all(bind=engine)
+# Schema DB do migration quản lý (alembic upgrade head, chạy trong start.py)
 
 import logging
 from contextlib import asynccontextmanager
@@ -59,6 +61,7 @@ def _ensure_default_admin():
             if existing.role != "admin":
                 existing.role = "admin"
                 db.commit()
+                invalidate_user(existing.id)
                 logging.info(
                     f"[Admin] Đã nâng cấp '{DEFAULT_ADMIN_EMAIL}' lên role admin."
                 )
@@ -89,14 +92,20 @@ def _ensure_default_admin():
 
 @asynccontextmanager
 async def lifespan(app):
-
-    Base.metadata.create_all(bind=engine)
-
-
     _ensure_default_admin()
 
+    if AVAILABILITY_INDEX_ENABLED:
+        availability_index.start()
+    if EMAIL_OUTBOX_ENABLED:
+        email_outbox_worker.start()
+
     yield
 
+    await email_outbox_worker.stop()
+    availability_index.stop()
+    password_hasher.shutdown()
+    await dispose_async_engine()
+
 
 app = FastAPI(
     title="AI-Booking API",
@@ -124,6 +133,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """
+    Quá nhiều login/đổi mật khẩu cùng lúc: báo client thử lại thay vì xếp hàng
+    """
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many login attempts in progress, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     """
@@ -178,7 +199,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],  
+    # "*" không có tác dụng với request có credentials -> liệt kê header cần đọc
+    expose_headers=["*", "X-Next-Cursor", "ETag", "X-DB-Primary-Until"],
 )
 
 app.include_router(auth.router, prefix="/api")
@@ -247,6 +269,7 @@ async def init_admin(token: str | None = Query(default=None)):
             if existing.role != "admin":
                 existing.role = "admin"
                 db.commit()
+                invalidate_user(existing.id)
                 return {
                     "status": "updated",
                     "message": f"Đã nâng cấp {DEFAULT_ADMIN_EMAIL} lên admin",
@@ -296,6 +319,7 @@ async def clear_all_cache():
     """
     search_cache.clear()
     availability_cache.clear()
+    principal_cache.clear()
     return {
         "status": "success",
         "message": "All caches cleared",
@@ -312,9 +336,8 @@ async def cache_stats():
     availability_cache.cleanup_expired()
 
     return {
-        "search_cache": {"entries": len(search_cache.cache), "ttl": search_cache.ttl},
-        "availability_cache": {
-            "entries": len(availability_cache.cache),
-            "ttl": availability_cache.ttl,
-        },
+        "search_cache": search_cache.stats(),
+        "availability_cache": availability_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "availability_index": availability_index.stats(),
     }
@@ -8,10 +8,15 @@ from sqlalchemy import (
     Text,
     Boolean,
     JSON,
+    Date,
+    Index,
+    UniqueConstraint,
 )
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
+from app.utils import normalize_search
 
 
 class User(Base):
@@ -28,7 +33,7 @@ class User(Base):
     preferences = Column(
         JSON, nullable=True
     )  # User preferences (language, currency, etc.)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
@@ -52,6 +57,15 @@ class Hotel(Base):
     images = Column(JSON, nullable=True)  # Array of image URLs
     amenities = Column(JSON, nullable=True)  # Hotel-level amenities
     policies = Column(JSON, nullable=True)  # Check-in time, cancellation policy, etc.
+    # Bản không dấu, lowercase để search (điền tự động khi insert/update)
+    search_text = Column(Text, nullable=True)  # name + address + city
+    city_normalized = Column(String(100), nullable=True, index=True)
+    # Tổng hợp từ rooms/reviews, cập nhật sau mỗi flush (app/hotel_summary.py)
+    min_room_price = Column(Float, nullable=True, index=True)
+    max_room_price = Column(Float, nullable=True)
+    max_guests = Column(Integer, nullable=True, index=True)
+    avg_rating = Column(Float, nullable=True, index=True)
+    review_count = Column(Integer, nullable=False, default=0, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -80,6 +94,11 @@ class Room(Base):
 
     # Relationships
     hotel = relationship("Hotel", back_populates="rooms")
+
+    __table_args__ = (
+        # Phòng của một hotel + min/max giá cho cột summary
+        Index("ix_rooms_hotel_price", "hotel_id", "base_price"),
+    )
     bookings = relationship("Booking", back_populates="room")
 
 
@@ -105,14 +124,29 @@ class Booking(Base):
     cancellation_date = Column(DateTime, nullable=True)
     refund_amount = Column(Float, nullable=True, default=0.0)
     cancellation_reason = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = relationship("User", back_populates="bookings")
+    hotel = relationship("Hotel")
     room = relationship("Room", back_populates="bookings")
     payment = relationship("Payment", back_populates="booking", uselist=False)
 
+    __table_args__ = (
+        # Kiểm tra trùng lịch: room_id = ? AND status IN (...) AND check_in < ? AND check_out > ?
+        Index("ix_bookings_room_status_dates", "room_id", "status", "check_in_date", "check_out_date"),
+        # Booking của user (mới nhất trước)
+        Index("ix_bookings_user_created", "user_id", "created_at"),
+        # Thống kê theo hotel trong admin
+        Index("ix_bookings_hotel_status", "hotel_id", "status"),
+        # Availability index: load booking còn hiệu lực / sync theo updated_at
+        Index("ix_bookings_status_check_out", "status", "check_out_date"),
+        Index("ix_bookings_updated_at", "updated_at"),
+        # Keyset pagination admin (created_at, id)
+        Index("ix_bookings_created_id", "created_at", "id"),
+    )
+
 
 class Payment(Base):
     __tablename__ = "payments"
@@ -134,6 +168,10 @@ class Payment(Base):
     # Relationships
     booking = relationship("Booking", back_populates="payment")
 
+    __table_args__ = (
+        Index("ix_payments_booking_id", "booking_id"),
+    )
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -147,12 +185,17 @@ class Review(Base):
         JSON, nullable=True
     )  # Breakdown: cleanliness, location, service, etc.
     comment = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="reviews")
     hotel = relationship("Hotel", back_populates="reviews")
 
+    __table_args__ = (
+        # Review của hotel, mới nhất trước (keyset theo created_at, id)
+        Index("ix_reviews_hotel_created", hotel_id, created_at.desc(), id.desc()),
+    )
+
 
 class Wishlist(Base):
     __tablename__ = "wishlists"
@@ -166,6 +209,11 @@ class Wishlist(Base):
     user = relationship("User", back_populates="wishlists")
     hotel = relationship("Hotel", back_populates="wishlists")
 
+    __table_args__ = (
+        # Mỗi user chỉ lưu một hotel một lần; cũng phục vụ lookup (user_id, hotel_id)
+        Index("uq_wishlists_user_hotel", "user_id", "hotel_id", unique=True),
+    )
+
 
 class AILog(Base):
     __tablename__ = "ai_logs"
@@ -183,3 +231,78 @@ class AILog(Base):
     # Relationships
     user = relationship("User")
     booking = relationship("Booking")
+
+
+class BookingDailyStat(Base):
+    """
+    Rollup booking theo (ngày tạo, hotel, room) cho dashboard/report admin.
+    Cập nhật tăng dần sau mỗi flush có Booking thay đổi (app/booking_stats.py).
+    """
+    __tablename__ = "booking_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "hotel_id", "room_id", name="uq_booking_daily_stats_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)  # ngày tạo booking
+    hotel_id = Column(Integer, nullable=False, index=True)
+    room_id = Column(Integer, nullable=False, index=True)
+    bookings = Column(Integer, nullable=False, default=0)  # mọi booking
+    active_bookings = Column(Integer, nullable=False, default=0)  # status != cancelled
+    active_revenue = Column(Float, nullable=False, default=0.0)
+    cancellations = Column(Integer, nullable=False, default=0)
+    pending_payment = Column(Integer, nullable=False, default=0)  # chưa thanh toán, chưa hủy
+    paid_bookings = Column(Integer, nullable=False, default=0)
+    paid_revenue = Column(Float, nullable=False, default=0.0)
+
+
+class BookingUserStat(Base):
+    """
+    Rollup booking (chưa hủy) theo user cho report top customers
+    """
+    __tablename__ = "booking_user_stats"
+
+    user_id = Column(Integer, primary_key=True)
+    active_bookings = Column(Integer, nullable=False, default=0)
+    active_revenue = Column(Float, nullable=False, default=0.0)
+
+
+class EmailOutbox(Base):
+    """
+    Email chờ gửi (outbox). Endpoint chỉ insert row trong cùng transaction với
+    thay đổi nghiệp vụ; worker nền (app/email_outbox.py) gửi qua SMTP.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # booking_confirmation, cancellation
+    to_email = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)  # dữ liệu cho template
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    # pending: thời điểm được gửi (backoff); sending: hết hạn claim của worker
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+@event.listens_for(Hotel, "before_insert")
+@event.listens_for(Hotel, "before_update")
+def _fill_hotel_search_columns(mapper, connection, hotel):
+    """
+    Giữ search_text / city_normalized khớp với name, address, city
+    """
+    hotel.search_text = normalize_search(" ".join(
+        part for part in (hotel.name, hotel.address, hotel.city) if part
+    ))
+    hotel.city_normalized = normalize_search(hotel.city)
+
+
+# Event sau flush đăng ký cùng model để mọi writer ORM (router, seed.py, scripts)
+# đều giữ cột summary của hotels và rollup booking đúng, không phụ thuộc router nào đã được import
+from app import booking_stats, hotel_summary  # noqa: E402,F401
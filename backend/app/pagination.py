@@ -0,0 +1,144 @@
+"""
+Keyset (cursor) pagination
+
+Thay vì OFFSET (DB phải đọc bỏ qua mọi dòng phía trước), lọc theo khóa sort của
+dòng cuối trang trước: WHERE (created_at, id) < (:c, :i) ORDER BY created_at, id.
+Trang sâu tốn như trang đầu nếu có index trên khóa sort.
+
+Cursor là chuỗi base64 opaque, trả về qua header X-Next-Cursor (body vẫn là
+list như cũ). Không có header nghĩa là đã tới trang cuối.
+
+Cột sort nullable (vd. min_room_price của hotel chưa có phòng): NULL xếp cuối
+theo cả hai chiều, điều kiện keyset viết tường minh vì so sánh tuple với NULL
+cho ra NULL và làm mất dòng. Giá trị NULL đi qua cursor dưới dạng JSON null.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, and_, false, literal, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Giải mã cursor thành giá trị của từng cột sort, 400 nếu cursor không hợp lệ
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor size mismatch")
+        return [
+            datetime.fromisoformat(v) if v is not None and column.type.python_type is datetime else v
+            for v, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError, binascii.Error, NotImplementedError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _nullable(column) -> bool:
+    return getattr(getattr(column, "expression", column), "nullable", True)
+
+
+def _after_nullable(columns, values, nullable, descending):
+    """
+    Dòng đứng sau values theo thứ tự sort, NULL xếp cuối:
+    OR_i (c_1 = v_1 AND ... AND c_(i-1) = v_(i-1) AND c_i sau v_i)
+    """
+    clauses, equal = [], []
+    for column, value, can_be_null in zip(columns, values, nullable):
+        # Cursor đang ở NULL: không còn giá trị nào của cột này đứng sau
+        if value is not None:
+            after = column < value if descending else column > value
+            if can_be_null:
+                after = or_(after, column.is_(None))
+            clauses.append(and_(*equal, after))
+        equal.append(column.is_(None) if value is None else column == value)
+    return or_(*clauses) if clauses else false()
+
+
+def _keyset_page(query, columns, cursor, limit, descending, skip):
+    # Query và Select đều có filter/order_by/offset/limit
+    nullable = [_nullable(c) for c in columns]
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if any(nullable):
+            query = query.filter(_after_nullable(columns, values, nullable, descending))
+        else:
+            if len(columns) == 1:
+                key, bound = columns[0], values[0]
+            else:
+                key = tuple_(*columns)
+                bound = tuple_(*(literal(v, type_=c.type) for v, c in zip(values, columns)))
+            query = query.filter(key < bound if descending else key > bound)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    order = [o.nulls_last() if n else o for o, n in zip(order, nullable)]
+    query = query.order_by(None).order_by(*order)
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    # Lấy dư một dòng để biết còn trang sau hay không
+    return query.limit(limit + 1)
+
+
+def _finish_page(items: list, columns, response: Response, limit: int) -> list:
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, c.key) for c in columns]
+        )
+    return items
+
+
+def keyset_paginate(
+    query: Query,
+    columns: Sequence[Any],
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    descending: bool = False,
+    skip: int = 0,
+) -> list:
+    """
+    Áp dụng ORDER BY columns + keyset filter, trả về một trang và set X-Next-Cursor
+
+    columns phải xác định thứ tự duy nhất (thường kết thúc bằng id).
+    skip chỉ dùng khi không có cursor (tương thích client cũ dùng offset).
+    """
+    items = _keyset_page(query, columns, cursor, limit, descending, skip).all()
+    return _finish_page(items, columns, response, limit)
+
+
+async def keyset_paginate_async(
+    db: AsyncSession,
+    stmt: Select,
+    columns: Sequence[Any],
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    descending: bool = False,
+    skip: int = 0,
+) -> list:
+    """
+    Như keyset_paginate cho route async: stmt là select(Model) chạy trên AsyncSession
+    """
+    result = await db.execute(_keyset_page(stmt, columns, cursor, limit, descending, skip))
+    return _finish_page(list(result.scalars().all()), columns, response, limit)
@@ -0,0 +1,130 @@
+"""
+Hash / verify password bcrypt trong process pool riêng
+
+Mỗi lần bcrypt tốn ~250ms CPU. Chạy ngay trong thread của request thì giữ GIL,
+các handler sync khác trong cùng worker phải chờ khi có nhiều người login cùng lúc.
+PasswordHasher đẩy việc này sang một ProcessPoolExecutor nhỏ:
+
+- Thread/coroutine của request chỉ chờ kết quả (không giữ GIL)
+- Số việc đang chờ + đang chạy có giới hạn: vượt giới hạn -> PasswordHasherBusy
+  (main.py trả 429 + Retry-After) thay vì để hàng đợi dài vô hạn
+- Pool tạo ở lần hash/verify đầu tiên (không làm chậm khởi động)
+
+PASSWORD_HASH_WORKERS=0: chạy trực tiếp trong thread gọi (như trước đây).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app import utils
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Hàng đợi hash password đã đầy
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hasher is busy")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int, retry_after: int = 1):
+        self.workers = max(workers, 0)
+        self.max_pending = max(max_pending, 1)
+        self.retry_after = retry_after
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    # ============= Pool =============
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: không fork process đang chạy thread (event loop, sync index, pool DB)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logging.info(f"[PasswordHasher] Started process pool with {self.workers} workers")
+        return self._executor
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy(self.retry_after)
+            self._pending += 1
+            try:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    # Worker bị kill (OOM...) -> tạo pool mới
+                    logging.warning("[PasswordHasher] Process pool broken, restarting")
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+                    future = self._get_executor().submit(fn, *args)
+            except BaseException:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _run(self, fn, *args):
+        if self.workers == 0:
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        if self.workers == 0:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    # ============= API =============
+
+    def hash(self, password: str) -> str:
+        return self._run(utils.hash_password, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(utils.verify_password, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(utils.hash_password, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(utils.verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+PASSWORD_HASH_WORKERS = _env_int("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+# Mặc định ~4 lượt bcrypt xếp hàng cho mỗi worker (~1s chờ tối đa)
+PASSWORD_HASH_MAX_PENDING = _env_int("PASSWORD_HASH_MAX_PENDING", max(1, PASSWORD_HASH_WORKERS) * 4)
+
+password_hasher = PasswordHasher(
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+)
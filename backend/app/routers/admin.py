@@ -4,15 +4,18 @@ All routes require admin role via require_admin dependency.
 Prefix: /api/admin
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db, pin_primary_reads, pool_status
 from app import models
 from app.dependencies import require_admin
+from app.cache import invalidate_booking, invalidate_user
+from app.email_outbox import booking_confirmation_payload, email_outbox_worker, enqueue_email, requeue_dead
+from app.pagination import keyset_paginate
 from app.schemas import UserResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -70,70 +73,89 @@ class AdminBookingResponse(BaseModel):
 
 @router.get("/dashboard", response_model=DashboardStats)
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _admin=Depends(require_admin),
 ):
     """
     Trả về thống kê tổng quan cho trang Admin Dashboard
     """
     total_users = db.query(func.count(models.User.id)).scalar() or 0
-    total_bookings = db.query(func.count(models.Booking.id)).scalar() or 0
     total_hotels = db.query(func.count(models.Hotel.id)).scalar() or 0
 
-    total_revenue = (
-        db.query(func.sum(models.Booking.total_price))
-        .filter(models.Booking.status != "cancelled")
-        .scalar()
-        or 0.0
-    )
-
-    # Booking chờ thanh toán 
-    pending_bookings = (
-        db.query(func.count(models.Booking.id))
-        .filter(
-            models.Booking.payment_status == "pending",
-            models.Booking.status != "cancelled",
-        )
-        .scalar()
-        or 0
-    )
-    # Booking đã xác nhận thanh toán 
-    confirmed_bookings = (
-        db.query(func.count(models.Booking.id))
-        .filter(models.Booking.payment_status == "paid")
-        .scalar()
-        or 0
+    # Số liệu booking đọc từ rollup (không quét bảng bookings)
+    stats = models.BookingDailyStat
+    totals = db.query(
+        func.sum(stats.bookings),
+        func.sum(stats.active_revenue),
+        func.sum(stats.pending_payment),  # Booking chờ thanh toán
+        func.sum(stats.paid_bookings),  # Booking đã xác nhận thanh toán
+    ).one()
+    total_bookings, total_revenue, pending_bookings, confirmed_bookings = (
+        value or 0 for value in totals
     )
 
     return DashboardStats(
         total_users=total_users,
-        total_bookings=total_bookings,
+        total_bookings=int(total_bookings),
         total_hotels=total_hotels,
         total_revenue=float(total_revenue),
-        pending_bookings=pending_bookings,
-        confirmed_bookings=confirmed_bookings,
+        pending_bookings=int(pending_bookings),
+        confirmed_bookings=int(confirmed_bookings),
     )
 
 
 
 
 
+@router.get("/db/pool")
+def get_db_pool_status(_admin=Depends(require_admin)):
+    """
+    Trạng thái connection pool của worker hiện tại: số connection đang mượn,
+    overflow, số lần phải chờ / timeout khi lấy connection
+    """
+    return pool_status()
+
+
+@router.get("/email-outbox")
+def get_email_outbox_status(_admin=Depends(require_admin)):
+    """
+    Số email theo trạng thái (pending/sending/sent/dead) và thống kê worker hiện tại
+    """
+    return email_outbox_worker.stats()
+
+
+@router.post("/email-outbox/retry-dead")
+def retry_dead_emails(
+    outbox_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    _admin=Depends(require_admin),
+):
+    """
+    Đưa email dead-letter về hàng đợi (outbox_id bỏ trống = tất cả)
+    """
+    return {"requeued": requeue_dead(db, outbox_id)}
+
+
 @router.get("/users", response_model=List[AdminUserResponse])
 def list_users(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     _admin=Depends(require_admin),
 ):
     """
-    Lấy danh sách tất cả users (có phân trang)
+    Lấy danh sách tất cả users (có phân trang, cursor qua header X-Next-Cursor)
     """
-    users = (
-        db.query(models.User)
-        .order_by(models.User.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    users = keyset_paginate(
+        db.query(models.User),
+        [models.User.created_at, models.User.id],
+        response,
+        cursor=cursor,
+        limit=limit,
+        descending=True,
+        skip=skip,
     )
     return users
 
@@ -162,33 +184,42 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
 
 
 
 
 @router.get("/bookings", response_model=List[AdminBookingResponse])
 def list_bookings(
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     _admin=Depends(require_admin),
 ):
     """
     Lấy danh sách tất cả bookings (kèm thông tin user, hotel, room)
+    Phân trang bằng cursor qua header X-Next-Cursor
     """
-    bookings = (
-        db.query(models.Booking)
-        .order_by(models.Booking.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    # user/hotel/room được JOIN trong cùng query (không query thêm cho từng booking)
+    bookings = keyset_paginate(
+        db.query(models.Booking).options(
+            joinedload(models.Booking.user),
+            joinedload(models.Booking.hotel),
+            joinedload(models.Booking.room),
+        ),
+        [models.Booking.created_at, models.Booking.id],
+        response,
+        cursor=cursor,
+        limit=limit,
+        descending=True,
+        skip=skip,
     )
 
     result = []
     for b in bookings:
-        user = db.query(models.User).filter(models.User.id == b.user_id).first()
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == b.hotel_id).first()
-        room = db.query(models.Room).filter(models.Room.id == b.room_id).first()
+        user, hotel, room = b.user, b.hotel, b.room
 
         result.append(
             AdminBookingResponse(
@@ -216,6 +247,7 @@ def list_bookings(
 @router.delete("/bookings/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_booking(
     booking_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _admin=Depends(require_admin),
 ):
@@ -229,13 +261,18 @@ def delete_booking(
             detail=f"Booking {booking_id} not found",
         )
 
+    room_id = booking.room_id
+    hotel_city = db.query(models.Hotel.city).filter(models.Hotel.id == booking.hotel_id).scalar()
     db.delete(booking)
     db.commit()
+    invalidate_booking(room_id, hotel_city)
+    pin_primary_reads(response)
 
 
 @router.patch("/bookings/{booking_id}/confirm-payment")
 def confirm_payment(
     booking_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _admin=Depends(require_admin),
 ):
@@ -280,54 +317,26 @@ def confirm_payment(
         )
         db.add(db_payment)
 
-    db.commit()
-    db.refresh(booking)
-
-    # Gửi email thông báo cho khách hàng (bất đồng bộ, không chặn response)
-    try:
-        user = db.query(models.User).filter(models.User.id == booking.user_id).first()
-        hotel = (
-            db.query(models.Hotel).filter(models.Hotel.id == booking.hotel_id).first()
+    # Email thông báo cho khách vào outbox (commit cùng payment, worker nền gửi)
+    user = db.query(models.User).filter(models.User.id == booking.user_id).first()
+    if user and user.email:
+        enqueue_email(
+            db,
+            "booking_confirmation",
+            user.email,
+            booking_confirmation_payload(
+                db,
+                booking,
+                customer_name=user.full_name,
+                payment_method="Chuyển khoản ngân hàng",
+                total_price=booking.total_price,
+            ),
         )
-        room = db.query(models.Room).filter(models.Room.id == booking.room_id).first()
-
-        if user and user.email:
-            from app.services.email_service import send_booking_confirmation_email
-            import asyncio
 
-            booking_data = {
-                "booking_id": booking.id,
-                "hotel_name": hotel.name if hotel else "N/A",
-                "room_name": room.name if room else "N/A",
-                "check_in": booking.check_in_date.strftime("%d/%m/%Y"),
-                "check_out": booking.check_out_date.strftime("%d/%m/%Y"),
-                "guests": booking.guests,
-                "total_price": booking.total_price,
-                "payment_method": "Chuyển khoản ngân hàng",
-                "customer_name": user.full_name,
-                "payment_status": "Đã thanh toán",
-            }
-
-            # Chạy email async trong background
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    import concurrent.futures
-
-                    with concurrent.futures.ThreadPoolExecutor() as pool:
-                        future = pool.submit(
-                            asyncio.run,
-                            send_booking_confirmation_email(user.email, booking_data),
-                        )
-                else:
-                    loop.run_until_complete(
-                        send_booking_confirmation_email(user.email, booking_data)
-                    )
-            except Exception:
-                pass  # Email lỗi không ảnh hưởng confirm
-
-    except Exception:
-        pass  # Không để email lỗi chặn response
+    db.commit()
+    db.refresh(booking)
+    invalidate_booking(booking.room_id)
+    pin_primary_reads(response)
 
     return {
         "id": booking.id,
@@ -365,6 +374,7 @@ def update_user_role(
 
     user.role = role
     db.commit()
+    invalidate_user(user.id)
     db.refresh(user)
 
     return {
@@ -391,29 +401,30 @@ def list_hotels(
         .limit(limit)
         .all()
     )
+    hotel_ids = [h.id for h in hotels]
 
-    result = []
-    for h in hotels:
-        room_count = (
-            db.query(func.count(models.Room.id))
-            .filter(models.Room.hotel_id == h.id)
-            .scalar()
-            or 0
-        )
-        booking_count = (
-            db.query(func.count(models.Booking.id))
-            .filter(models.Booking.hotel_id == h.id)
-            .scalar()
-            or 0
-        )
-        revenue = (
-            db.query(func.sum(models.Booking.total_price))
-            .filter(
-                models.Booking.hotel_id == h.id, models.Booking.status != "cancelled"
-            )
-            .scalar()
-            or 0.0
+    # Thống kê chỉ cho hotel trong trang: số phòng từ rooms, booking từ rollup booking_daily_stats
+    room_counts = dict(
+        db.query(models.Room.hotel_id, func.count(models.Room.id))
+        .filter(models.Room.hotel_id.in_(hotel_ids))
+        .group_by(models.Room.hotel_id)
+        .all()
+    )
+    stats = models.BookingDailyStat
+    hotel_stats = {
+        hotel_id: (booking_count, revenue)
+        for hotel_id, booking_count, revenue in db.query(
+            stats.hotel_id,
+            func.sum(stats.bookings),
+            func.sum(stats.active_revenue),
         )
+        .filter(stats.hotel_id.in_(hotel_ids))
+        .group_by(stats.hotel_id)
+    }
+    rows = [(h, room_counts.get(h.id), *hotel_stats.get(h.id, (0, 0.0))) for h in hotels]
+
+    result = []
+    for h, room_count, booking_count, revenue in rows:
         result.append(
             {
                 "id": h.id,
@@ -423,9 +434,9 @@ def list_hotels(
                 or "N/A",
                 "address": getattr(h, "address", "N/A"),
                 "star_rating": getattr(h, "star_rating", None),
-                "room_count": room_count,
-                "booking_count": booking_count,
-                "total_revenue": float(revenue),
+                "room_count": room_count or 0,
+                "booking_count": booking_count or 0,
+                "total_revenue": float(revenue or 0.0),
                 "created_at": h.created_at.isoformat() if h.created_at else None,
             }
         )
@@ -442,22 +453,24 @@ def list_rooms_admin(
     _admin=Depends(require_admin),
 ):
     """Danh sách phòng (có thể lọc theo hotel_id)"""
-    query = db.query(models.Room)
+    query = db.query(models.Room).options(joinedload(models.Room.hotel))
     if hotel_id:
         query = query.filter(models.Room.hotel_id == hotel_id)
     rooms = query.order_by(models.Room.id.desc()).offset(skip).limit(limit).all()
 
+    # Số booking chưa hủy của các phòng trong trang, từ rollup booking_daily_stats
+    stats = models.BookingDailyStat
+    booking_counts = dict(
+        db.query(stats.room_id, func.sum(stats.active_bookings))
+        .filter(stats.room_id.in_([r.id for r in rooms]))
+        .group_by(stats.room_id)
+        .all()
+    )
+    rows = [(r, booking_counts.get(r.id)) for r in rooms]
+
     result = []
-    for r in rooms:
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == r.hotel_id).first()
-        booking_count = (
-            db.query(func.count(models.Booking.id))
-            .filter(
-                models.Booking.room_id == r.id, models.Booking.status != "cancelled"
-            )
-            .scalar()
-            or 0
-        )
+    for r, booking_count in rows:
+        hotel = r.hotel
         result.append(
             {
                 "id": r.id,
@@ -467,92 +480,146 @@ def list_rooms_admin(
                 "max_guests": r.max_guests,
                 "hotel_id": r.hotel_id,
                 "hotel_name": hotel.name if hotel else "N/A",
-                "booking_count": booking_count,
+                "booking_count": booking_count or 0,
             }
         )
     return result
 
 
-
-
 @router.get("/reports/revenue")
 def revenue_report(
     year: int = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _admin=Depends(require_admin),
 ):
-    """Doanh thu theo từng tháng trong năm (mặc định năm hiện tại)"""
+    """
+    Doanh thu theo từng tháng trong năm (mặc định năm hiện tại)
+    kèm breakdown theo năm (by_year), khách sạn (by_hotel) và thành phố (by_city).
+
+    Một query GROUP BY (năm, tháng, khách sạn) trên rollup booking_daily_stats;
+    các breakdown được cộng dồn từ kết quả đã gom nhóm.
+    """
     from sqlalchemy import extract
 
     if not year:
         year = datetime.now().year
 
-    monthly = []
-    for month in range(1, 13):
-        revenue = (
-            db.query(func.sum(models.Booking.total_price))
-            .filter(
-                models.Booking.payment_status == "paid",
-                extract("year", models.Booking.created_at) == year,
-                extract("month", models.Booking.created_at) == month,
-            )
-            .scalar()
-            or 0.0
-        )
-        count = (
-            db.query(func.count(models.Booking.id))
-            .filter(
-                models.Booking.payment_status == "paid",
-                extract("year", models.Booking.created_at) == year,
-                extract("month", models.Booking.created_at) == month,
-            )
-            .scalar()
-            or 0
+    stats = models.BookingDailyStat
+    stat_year = extract("year", stats.day).label("year")
+    stat_month = extract("month", stats.day).label("month")
+    rows = (
+        db.query(
+            stat_year,
+            stat_month,
+            stats.hotel_id,
+            models.Hotel.name,
+            models.Hotel.city,
+            func.sum(stats.paid_revenue).label("revenue"),
+            func.sum(stats.paid_bookings).label("bookings"),
         )
-        monthly.append(
-            {"month": month, "year": year, "revenue": float(revenue), "bookings": count}
+        .outerjoin(models.Hotel, models.Hotel.id == stats.hotel_id)
+        .filter(stats.paid_bookings != 0)
+        .group_by(
+            stat_year,
+            stat_month,
+            stats.hotel_id,
+            models.Hotel.name,
+            models.Hotel.city,
         )
+        .all()
+    )
 
+    monthly = {
+        month: {"month": month, "year": year, "revenue": 0.0, "bookings": 0}
+        for month in range(1, 13)
+    }
+    by_year = {}
+    by_hotel = {}
+    by_city = {}
+    for row in rows:
+        row_year, revenue, count = int(row.year), float(row.revenue or 0.0), int(row.bookings)
+
+        totals = by_year.setdefault(row_year, {"year": row_year, "revenue": 0.0, "bookings": 0})
+        totals["revenue"] += revenue
+        totals["bookings"] += count
+
+        if row_year != year:
+            continue
+
+        for bucket in (
+            monthly[int(row.month)],
+            by_hotel.setdefault(row.hotel_id, {
+                "hotel_id": row.hotel_id,
+                "hotel_name": row.name,
+                "city": row.city,
+                "revenue": 0.0,
+                "bookings": 0,
+            }),
+            by_city.setdefault(row.city, {"city": row.city, "revenue": 0.0, "bookings": 0}),
+        ):
+            bucket["revenue"] += revenue
+            bucket["bookings"] += count
+
+    def by_revenue(items):
+        return sorted(items, key=lambda item: item["revenue"], reverse=True)
+
+    monthly = list(monthly.values())
     total = sum(m["revenue"] for m in monthly)
-    return {"year": year, "total_revenue": total, "monthly": monthly}
+    return {
+        "year": year,
+        "total_revenue": total,
+        "monthly": monthly,
+        "by_year": sorted(by_year.values(), key=lambda item: item["year"]),
+        "by_hotel": by_revenue(by_hotel.values()),
+        "by_city": by_revenue(by_city.values()),
+    }
 
 
 @router.get("/reports/top-rooms")
 def top_rooms_report(
     limit: int = 5,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _admin=Depends(require_admin),
 ):
-    """Top phòng được đặt nhiều nhất"""
+    """Top phòng được đặt nhiều nhất (đọc từ rollup booking_daily_stats)"""
+    stats = models.BookingDailyStat
+    room_totals = (
+        db.query(
+            stats.room_id.label("room_id"),
+            func.sum(stats.active_bookings).label("booking_count"),
+            func.sum(stats.active_revenue).label("total_revenue"),
+        )
+        .group_by(stats.room_id)
+        .having(func.sum(stats.active_bookings) > 0)
+        .subquery()
+    )
     rows = (
         db.query(
             models.Room.id,
             models.Room.name,
             models.Room.room_type,
             models.Room.base_price,
-            models.Room.hotel_id,
-            func.count(models.Booking.id).label("booking_count"),
-            func.sum(models.Booking.total_price).label("total_revenue"),
+            models.Hotel.name.label("hotel_name"),
+            room_totals.c.booking_count,
+            room_totals.c.total_revenue,
         )
-        .join(models.Booking, models.Booking.room_id == models.Room.id)
-        .filter(models.Booking.status != "cancelled")
-        .group_by(models.Room.id)
-        .order_by(func.count(models.Booking.id).desc())
+        .join(room_totals, room_totals.c.room_id == models.Room.id)
+        .outerjoin(models.Hotel, models.Hotel.id == models.Room.hotel_id)
+        .order_by(room_totals.c.booking_count.desc())
         .limit(limit)
         .all()
     )
 
     result = []
     for r in rows:
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == r.hotel_id).first()
         result.append(
             {
                 "room_id": r.id,
                 "room_name": r.name,
                 "room_type": r.room_type,
                 "base_price": r.base_price,
-                "hotel_name": hotel.name if hotel else "N/A",
-                "booking_count": r.booking_count,
+                "hotel_name": r.hotel_name or "N/A",
+                "booking_count": int(r.booking_count),
                 "total_revenue": float(r.total_revenue or 0),
             }
         )
@@ -562,22 +629,22 @@ def top_rooms_report(
 @router.get("/reports/top-customers")
 def top_customers_report(
     limit: int = 5,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _admin=Depends(require_admin),
 ):
-    """Top khách hàng đặt phòng nhiều nhất"""
+    """Top khách hàng đặt phòng nhiều nhất (đọc từ rollup booking_user_stats)"""
+    stats = models.BookingUserStat
     rows = (
         db.query(
             models.User.id,
             models.User.full_name,
             models.User.email,
-            func.count(models.Booking.id).label("booking_count"),
-            func.sum(models.Booking.total_price).label("total_spent"),
+            stats.active_bookings.label("booking_count"),
+            stats.active_revenue.label("total_spent"),
         )
-        .join(models.Booking, models.Booking.user_id == models.User.id)
-        .filter(models.Booking.status != "cancelled")
-        .group_by(models.User.id)
-        .order_by(func.count(models.Booking.id).desc())
+        .join(stats, stats.user_id == models.User.id)
+        .filter(stats.active_bookings > 0)
+        .order_by(stats.active_bookings.desc())
         .limit(limit)
         .all()
     )
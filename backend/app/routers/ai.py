@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import models, schemas
 from app.dependencies import get_current_user
 from pydantic import BaseModel
@@ -8,8 +8,6 @@ from typing import List, Optional, Dict, Any
 import json
 import re
 import os
-from urllib import request as urlrequest
-from urllib import error as urlerror
 
 router = APIRouter(prefix="/ai", tags=["AI Assistance"])
 
@@ -223,7 +221,7 @@ GREETINGS = ["xin chào", "hello", "hi", "chào", "hey", "hia", "helo"]
 
 
 @router.post("/chat", response_model=ChatResponse)
-def ai_chat(request: ChatRequest, db: Session = Depends(get_db)):
+def ai_chat(request: ChatRequest, db: Session = Depends(get_read_db)):
     """
     Multi-turn conversational AI endpoint (no auth required).
     Progressively collects travel info and suggests matching rooms.
@@ -449,6 +447,10 @@ def _call_llm_review_summary(reviews: list, hotel_name: str) -> Optional[dict]:
     if not api_key:
         return None
 
+    # Chỉ import HTTP client khi thật sự gọi LLM
+    from urllib import error as urlerror
+    from urllib import request as urlrequest
+
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
 
@@ -532,7 +534,7 @@ def _call_llm_review_summary(reviews: list, hotel_name: str) -> Optional[dict]:
 
 
 @router.get("/hotels/{hotel_id}/summary")
-def get_ai_review_summary(hotel_id: int, db: Session = Depends(get_db)):
+def get_ai_review_summary(hotel_id: int, db: Session = Depends(get_read_db)):
     """
     Trả về bản tóm tắt AI cho tất cả đánh giá của một khách sạn.
     Phân tích bằng rule-based keyword matching (không cần Gemini API).
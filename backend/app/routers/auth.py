@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app import models, schemas
 from app.auth import (
     verify_password,
@@ -13,6 +15,8 @@ from app.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 from app.dependencies import get_current_user
+from app.cache import invalidate_user
+from app.password_hasher import password_hasher
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -48,18 +52,21 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=schemas.LoginResponse)
-def login(
+async def login(
     credentials: schemas.LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login with email and password
     Returns access token and refresh token
     """
     # Find user by email
-    user = db.query(models.User).filter(models.User.email == credentials.email).first()
+    user = (
+        await db.execute(select(models.User).where(models.User.email == credentials.email))
+    ).scalars().first()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    # bcrypt chạy trong process pool, event loop chỉ chờ kết quả
+    if not user or not await password_hasher.verify_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -92,16 +99,18 @@ def login(
 
 
 @router.post("/login/oauth2", response_model=schemas.Token)
-def login_oauth2(
+async def login_oauth2(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible login endpoint (for Swagger UI)
     """
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    user = (
+        await db.execute(select(models.User).where(models.User.email == form_data.username))
+    ).scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -195,6 +204,7 @@ def update_current_user(
         setattr(current_user, field, value)
     
     db.commit()
+    invalidate_user(current_user.id)
     db.refresh(current_user)
     
     return current_user
@@ -219,6 +229,7 @@ def change_password(
     # Update password
     current_user.hashed_password = get_password_hash(request.new_password)
     db.commit()
+    invalidate_user(current_user.id)
     
     return {"message": "Password changed successfully"}
 
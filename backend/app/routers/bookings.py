@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select
 from typing import List, Optional
 from datetime import datetime, timedelta
-import asyncio
-import threading
-from app.database import get_db
+from app.database import async_session_scope, get_async_db, get_db, pin_primary_reads
 from app import models, schemas
 from app.dependencies import get_current_user
-from app.cache import availability_cache
-from app.services.email_service import send_booking_confirmation_email
+from app.utils import stay_discount_multiplier
+from app.cache import availability_cache, room_tag, invalidate_booking
+from app.availability_index import availability_index, ACTIVE_BOOKING_STATUSES
+from app.email_outbox import booking_confirmation_payload, enqueue_email
 import pytz
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
@@ -20,34 +21,104 @@ def check_room_availability(
     room_id: int,
     check_in_date: datetime,
     check_out_date: datetime,
-    exclude_booking_id: int = None
+    exclude_booking_id: int = None,
+    use_index: bool = True
 ) -> bool:
     """
     Kiểm tra xem phòng có trống trong khoảng thời gian không
     Logic: Trùng nếu (start < req_end) AND (end > req_start)
+
+    Mặc định trả lời từ availability_index (không SQL); use_index=False để
+    kiểm tra trực tiếp trên DB (create_booking, bên trong row lock).
+    """
+    if use_index:
+        available = availability_index.is_available(
+            room_id, check_in_date, check_out_date, exclude_booking_id
+        )
+        if available is not None:
+            return available
+    
+    conflicting_booking = db.query(models.Booking).filter(
+        *_conflict_conditions(room_id, check_in_date, check_out_date, exclude_booking_id)
+    ).first()
+    
+    # Return True if available (no conflict), False if not available
+    return conflicting_booking is None
+
+
+async def check_room_availability_async(
+    db: AsyncSession,
+    room_id: int,
+    check_in_date: datetime,
+    check_out_date: datetime,
+    exclude_booking_id: int = None,
+) -> bool:
     """
-    query = db.query(models.Booking).filter(
+    Như check_room_availability cho route async (index trước, fallback SQL qua AsyncSession)
+    """
+    available = availability_index.is_available(
+        room_id, check_in_date, check_out_date, exclude_booking_id
+    )
+    if available is not None:
+        return available
+    
+    conflicting_id = await db.scalar(
+        select(models.Booking.id).where(
+            *_conflict_conditions(room_id, check_in_date, check_out_date, exclude_booking_id)
+        ).limit(1)
+    )
+    return conflicting_id is None
+
+
+def _conflict_conditions(
+    room_id: int,
+    check_in_date: datetime,
+    check_out_date: datetime,
+    exclude_booking_id: int = None,
+) -> list:
+    conditions = [
         models.Booking.room_id == room_id,
-        models.Booking.status.in_(["confirmed", "pending"]), # Consider pending as blocked to prevent overbooking during payment
+        models.Booking.status.in_(ACTIVE_BOOKING_STATUSES), # Consider pending as blocked to prevent overbooking during payment
         models.Booking.check_in_date < check_out_date,
         models.Booking.check_out_date > check_in_date
-    )
-    
+    ]
     # Exclude current booking if updating (rescheduling)
     if exclude_booking_id:
-        query = query.filter(models.Booking.id != exclude_booking_id)
+        conditions.append(models.Booking.id != exclude_booking_id)
+    return conditions
+
+
+def booked_room_ids(
+    db: Session,
+    room_ids: List[int],
+    check_in_date: datetime,
+    check_out_date: datetime,
+) -> set:
+    """
+    Trả về tập room_id có booking trùng khoảng thời gian (một query cho mọi phòng)
+    """
+    if not room_ids:
+        return set()
     
-    conflicting_booking = query.first()
+    booked = availability_index.booked_rooms(room_ids, check_in_date, check_out_date)
+    if booked is not None:
+        return booked
     
-    # Return True if available (no conflict), False if not available
-    return conflicting_booking is None
+    rows = db.query(models.Booking.room_id).filter(
+        models.Booking.room_id.in_(room_ids),
+        models.Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        models.Booking.check_in_date < check_out_date,
+        models.Booking.check_out_date > check_in_date
+    ).group_by(models.Booking.room_id).all()
+    
+    return {row.room_id for row in rows}
 
 @router.get("/availability")
-def check_availability(
+async def check_availability(
     room_id: int,
     check_in_date: datetime,
     check_out_date: datetime,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     API kiểm tra tình trạng phòng (Public) + dynamic pricing
@@ -66,18 +137,35 @@ def check_availability(
         check_out=str(check_out_date)
     )
     
-    # Try cache
-    cached = availability_cache.get(cache_key)
-    if cached is not None:
-        return cached
-    
+    async def refresh():
+        async with async_session_scope() as refresh_db:
+            return await _availability_result(refresh_db, room_id, check_in_date, check_out_date)
+
+    # Request đồng thời cùng key chỉ query DB một lần; entry bị xóa khi phòng có booking mới/hủy
+    return await availability_cache.aget_or_set(
+        cache_key,
+        lambda: _availability_result(db, room_id, check_in_date, check_out_date),
+        refresh=refresh,
+        tags=[room_tag(room_id)],
+    )
+
+
+async def _availability_result(
+    db: AsyncSession,
+    room_id: int,
+    check_in_date: datetime,
+    check_out_date: datetime,
+) -> dict:
+    """
+    Tính availability + pricing cho một phòng (không cache)
+    """
     # Get room info
-    room = db.query(models.Room).filter(models.Room.id == room_id).first()
+    room = await db.get(models.Room, room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
     # Check availability
-    is_available = check_room_availability(db, room_id, check_in_date, check_out_date)
+    is_available = await check_room_availability_async(db, room_id, check_in_date, check_out_date)
     
     # Calculate pricing
     nights = (check_out_date - check_in_date).days
@@ -88,11 +176,7 @@ def check_availability(
     total_price = base_price * nights
     
     # Apply discount for longer stays
-    discount_multiplier = 1.0
-    if nights >= 7:
-        discount_multiplier = 0.9  # 10% discount for week+
-    elif nights >= 3:
-        discount_multiplier = 0.95  # 5% discount for 3+ nights
+    discount_multiplier = stay_discount_multiplier(nights)
     
     final_total = int(total_price * discount_multiplier)
     
@@ -109,15 +193,13 @@ def check_availability(
         "check_out_date": check_out_date.isoformat()
     }
     
-    # Cache result (5 minutes)
-    availability_cache.set(cache_key, result, ttl=300)
-    
     return result
 
 
 @router.post("/", response_model=schemas.BookingResponse, status_code=status.HTTP_201_CREATED)
 def create_booking(
     booking: schemas.BookingCreate,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -164,12 +246,13 @@ def create_booking(
                 detail=f"Room can accommodate maximum {room.max_guests} guests"
             )
         
-        # 3. Check availability inside the lock
+        # 3. Check availability inside the lock (luôn hỏi DB, không dùng index)
         is_available = check_room_availability(
             db=db,
             room_id=booking.room_id,
             check_in_date=booking.check_in_date,
-            check_out_date=booking.check_out_date
+            check_out_date=booking.check_out_date,
+            use_index=False
         )
         
         if not is_available:
@@ -198,6 +281,9 @@ def create_booking(
         db.add(db_booking)
         db.commit() # Release lock here
         db.refresh(db_booking)
+        invalidate_booking(db_booking.room_id, hotel.city)
+        # Client vừa đặt phòng đọc lại từ primary (read replica có thể chưa kịp)
+        pin_primary_reads(response)
         
         return db_booking
 
@@ -233,61 +319,53 @@ def check_bulk_availability(
     if not room_ids:
         return []
     
-    results = []
-    
-    for room_id in room_ids:
-        # Try cache first
-        cache_key = availability_cache.get_key(
+    def cache_key(room_id):
+        return availability_cache.get_key(
             room_id=room_id,
             check_in=str(check_in),
-            check_out=str(check_out)
+            check_out=str(check_out),
+            bulk=True,
         )
+    
+    # Try cache first, gom các room miss lại để query một lần
+    cached = {}
+    missing = []
+    for room_id in dict.fromkeys(room_ids):
+        hit = availability_cache.get(cache_key(room_id))
+        if hit:
+            cached[room_id] = hit
+        else:
+            missing.append(room_id)
+    
+    if missing:
+        # 1 query lấy rooms + 1 query GROUP BY lấy các room đã có booking trùng
+        rooms = db.query(models.Room).filter(models.Room.id.in_(missing)).all()
+        booked = booked_room_ids(db, [room.id for room in rooms], check_in, check_out)
         
-        cached = availability_cache.get(cache_key)
-        if cached:
-            results.append(cached)
-            continue
-        
-        # Get room
-        room = db.query(models.Room).filter(models.Room.id == room_id).first()
-        if not room:
-            continue
-        
-        # Check availability
-        is_available = check_room_availability(db, room_id, check_in, check_out)
-        
-        # Calculate pricing
         nights = (check_out - check_in).days
         if nights <= 0:
             nights = 1
+        discount_multiplier = stay_discount_multiplier(nights)
         
-        base_price = room.base_price
-        total_price = base_price * nights
-        
-        # Apply discount
-        discount_multiplier = 1.0
-        if nights >= 7:
-            discount_multiplier = 0.9
-        elif nights >= 3:
-            discount_multiplier = 0.95
-        
-        final_total = int(total_price * discount_multiplier)
-        
-        result = {
-            "room_id": room_id,
-            "room_name": room.name,
-            "available": is_available,
-            "base_price": base_price,
-            "nights": nights,
-            "total_price": final_total,
-            "discount_rate": 1 - discount_multiplier
-        }
-        
-        # Cache it
-        availability_cache.set(cache_key, result, ttl=300)
-        results.append(result)
-    
-    return results
+        for room in rooms:
+            base_price = room.base_price
+            final_total = int(base_price * nights * discount_multiplier)
+            result = {
+                "room_id": room.id,
+                "room_name": room.name,
+                "available": room.id not in booked,
+                "base_price": base_price,
+                "nights": nights,
+                "total_price": final_total,
+                "discount_rate": 1 - discount_multiplier
+            }
+            
+            # Cache it
+            availability_cache.set(cache_key(room.id), result, tags=[room_tag(room.id)])
+            cached[room.id] = result
+    
+    # Giữ thứ tự room_ids của request, bỏ qua room không tồn tại
+    return [cached[room_id] for room_id in room_ids if room_id in cached]
 
 
 @router.get("/", response_model=List[schemas.BookingResponse])
@@ -330,6 +408,7 @@ def get_booking(
 @router.patch("/{booking_id}/cancel", response_model=schemas.BookingResponse)
 def cancel_booking(
     booking_id: int,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -356,6 +435,9 @@ def cancel_booking(
     booking.status = "cancelled"
     db.commit()
     db.refresh(booking)
+    hotel_city = db.query(models.Hotel.city).filter(models.Hotel.id == booking.hotel_id).scalar()
+    invalidate_booking(booking.room_id, hotel_city)
+    pin_primary_reads(response)
     
     return booking
 
@@ -363,6 +445,7 @@ def cancel_booking(
 @router.post("/payment", response_model=schemas.PaymentResponse, status_code=status.HTTP_201_CREATED)
 def create_payment(
     payment: schemas.PaymentCreate,
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -412,46 +495,36 @@ def create_payment(
     booking.status = "confirmed"
     
     db.add(db_payment)
+
+    # Email xác nhận vào outbox, commit cùng payment; worker nền gửi SMTP
+    customer_email = current_user.email
+    customer_name = current_user.full_name
+
+    metadata = payment.payment_metadata or {}
+    if isinstance(metadata, dict):
+        metadata_email = metadata.get("customer_email")
+        metadata_name = metadata.get("customer_name")
+        if isinstance(metadata_email, str) and "@" in metadata_email:
+            customer_email = metadata_email.strip()
+        if isinstance(metadata_name, str) and metadata_name.strip():
+            customer_name = metadata_name.strip()
+
+    enqueue_email(
+        db,
+        "booking_confirmation",
+        customer_email,
+        booking_confirmation_payload(
+            db,
+            booking,
+            customer_name=customer_name,
+            payment_method=booking.payment_method or payment.payment_method,
+            total_price=payment.amount,
+        ),
+    )
+
     db.commit()
     db.refresh(db_payment)
+    invalidate_booking(booking.room_id)
+    pin_primary_reads(response)
 
-    # Send confirmation email after successful payment (best-effort, non-blocking for payment flow)
-    try:
-        hotel = db.query(models.Hotel).filter(models.Hotel.id == booking.hotel_id).first()
-        room = db.query(models.Room).filter(models.Room.id == booking.room_id).first()
-
-        customer_email = current_user.email
-        customer_name = current_user.full_name
-
-        metadata = payment.payment_metadata or {}
-        if isinstance(metadata, dict):
-            metadata_email = metadata.get("customer_email")
-            metadata_name = metadata.get("customer_name")
-            if isinstance(metadata_email, str) and "@" in metadata_email:
-                customer_email = metadata_email.strip()
-            if isinstance(metadata_name, str) and metadata_name.strip():
-                customer_name = metadata_name.strip()
-
-        booking_data = {
-            "booking_id": booking.id,
-            "customer_name": customer_name,
-            "hotel_name": hotel.name if hotel else "N/A",
-            "room_type": room.name if room else "N/A",
-            "check_in_date": booking.check_in_date.strftime("%d/%m/%Y"),
-            "check_out_date": booking.check_out_date.strftime("%d/%m/%Y"),
-            "payment_method": booking.payment_method or payment.payment_method,
-            "payment_status": "Đã thanh toán",
-            "total_price": int(payment.amount),
-        }
-
-        # Fire-and-forget email send to keep API response fast.
-        threading.Thread(
-            target=lambda: asyncio.run(
-                send_booking_confirmation_email(customer_email, booking_data)
-            ),
-            daemon=True,
-        ).start()
-    except Exception as e:
-        print(f"[Email] Failed to schedule confirmation email: {e}")
-    
     return db_payment
@@ -1,38 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import exists, func, or_, select
+from pydantic import TypeAdapter
+from typing import List, Optional, Tuple
 from datetime import datetime
 from urllib.parse import unquote
-from app.database import get_db
+from app.database import get_async_read_db, get_db, session_scope
 from app import models, schemas
-from app.cache import search_cache, availability_cache
+from app.cache import (
+    search_cache,
+    availability_cache,
+    CachedResponse,
+    city_tag,
+    dates_tag,
+    hotel_tag,
+    invalidate_hotel,
+)
 from app.dependencies import get_current_user, get_current_user_optional
-import unicodedata
+from app.utils import stay_discount_multiplier
+from app.search_index import hotel_city_filter, hotel_search_filter
+from app.pagination import keyset_paginate_async
+from app.availability_index import ACTIVE_BOOKING_STATUSES
+
+# sort -> (cột keyset, giảm dần)
+HOTEL_SORTS = {
+    "price_asc": ([models.Hotel.min_room_price, models.Hotel.id], False),
+    "price_desc": ([models.Hotel.min_room_price, models.Hotel.id], True),
+    "rating": ([models.Hotel.avg_rating, models.Hotel.id], True),
+    "reviews": ([models.Hotel.review_count, models.Hotel.id], True),
+}
 
 router = APIRouter(prefix="/hotels", tags=["Hotels"])
 
+_search_result_adapter = TypeAdapter(List[schemas.HotelSearchResult])
 
-def normalize_text(text: str) -> str:
-    """Normalize text for flexible matching - removes diacritics"""
-    if not text:
-        return text
-    # Normalize unicode to decomposed form then remove diacritics
-    nfd = unicodedata.normalize('NFD', text)
-    return ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
 
+# Các route GET đọc nhiều chạy async trên AsyncSession (không chiếm thread của threadpool)
+# và đọc từ read replica nếu có cấu hình DATABASE_READ_URL
 
 @router.get("/cities", response_model=List[str])
-def get_cities(db: Session = Depends(get_db)):
+async def get_cities(db: AsyncSession = Depends(get_async_read_db)):
     """
     Lấy danh sách tất cả các thành phố có khách sạn
     """
     try:
-        cities = db.query(models.Hotel.city)\
-            .filter(models.Hotel.city.isnot(None))\
-            .distinct()\
-            .order_by(models.Hotel.city)\
-            .all()
+        result = await db.execute(
+            select(models.Hotel.city)
+            .where(models.Hotel.city.isnot(None))
+            .distinct()
+            .order_by(models.Hotel.city)
+        )
+        cities = result.all()
         
         # Extract city names from tuples and return as list
         city_list = [city[0] for city in cities if city[0]]
@@ -47,52 +66,43 @@ def get_cities(db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[schemas.HotelResponse])
-def get_hotels(
+async def get_hotels(
+    response: Response,
     city: Optional[str] = Query(None, description="Lọc theo thành phố"),
     country: Optional[str] = Query(None, description="Lọc theo quốc gia"),
     star_rating: Optional[int] = Query(None, ge=1, le=5, description="Lọc theo số sao"),
     min_price: Optional[float] = Query(None, ge=0, description="Giá tối thiểu"),
     max_price: Optional[float] = Query(None, ge=0, description="Giá tối đa"),
     search: Optional[str] = Query(None, description="Tìm kiếm theo tên hoặc địa điểm"),
+    sort: Optional[str] = Query(None, description="Sắp xếp: price_asc, price_desc, rating, reviews"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor trang sau (header X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Lấy danh sách khách sạn với filter và search
+    - Lọc giá: hotel có ít nhất một phòng giá trong khoảng
+    - Phân trang bằng cursor: truyền lại X-Next-Cursor của trang trước
     """
+    if sort is not None and sort not in HOTEL_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sort. Use one of: {', '.join(HOTEL_SORTS)}",
+        )
+
     try:
-        query = db.query(models.Hotel)
+        query = select(models.Hotel)
         
-        # Search by name or address
+        # Search by name, address or city (không phân biệt dấu)
         if search:
             # Decode URL encoding if present
-            search_decoded = unquote(search)
-            search_filter = f"%{search_decoded}%"
-            search_normalized = normalize_text(search_decoded)
-            
-            query = query.filter(
-                or_(
-                    models.Hotel.name.ilike(search_filter),
-                    models.Hotel.address.ilike(search_filter),
-                    models.Hotel.city.ilike(search_filter),
-                    # Also try normalized search
-                    models.Hotel.city.ilike(f"%{search_normalized}%")
-                )
-            )
+            query = query.filter(hotel_search_filter(unquote(search)))
         
         # Filter by city
         if city:
             # Decode URL encoding if present
-            city_decoded = unquote(city)
-            city_normalized = normalize_text(city_decoded)
-            
-            query = query.filter(
-                or_(
-                    models.Hotel.city.ilike(f"%{city_decoded}%"),
-                    models.Hotel.city.ilike(f"%{city_normalized}%")
-                )
-            )
+            query = query.filter(hotel_city_filter(unquote(city)))
         
         # Filter by country
         if country:
@@ -103,19 +113,29 @@ def get_hotels(
         if star_rating:
             query = query.filter(models.Hotel.star_rating == star_rating)
         
-        # Filter by price (based on minimum room price)
+        # Filter by price: hotel có ít nhất một phòng giá trong [min_price, max_price].
+        # Cột summary loại nhanh hotel ngoài khoảng, EXISTS trên rooms giữ đúng ngữ nghĩa
         if min_price is not None or max_price is not None:
-            # Join with rooms to filter by price
-            query = query.join(models.Room)
+            room_in_range = [models.Room.hotel_id == models.Hotel.id]
             if min_price is not None:
-                query = query.filter(models.Room.base_price >= min_price)
+                query = query.filter(models.Hotel.max_room_price >= min_price)
+                room_in_range.append(models.Room.base_price >= min_price)
             if max_price is not None:
-                query = query.filter(models.Room.base_price <= max_price)
-            query = query.distinct()
+                query = query.filter(models.Hotel.min_room_price <= max_price)
+                room_in_range.append(models.Room.base_price <= max_price)
+            query = query.filter(exists().where(*room_in_range))
         
-        hotels = query.offset(skip).limit(limit).all()
+        # Hotel chưa có phòng / chưa có review (cột sort NULL) xếp cuối, không bị loại
+        columns, descending = HOTEL_SORTS.get(sort, ([models.Hotel.id], False))
+        
+        hotels = await keyset_paginate_async(
+            db, query, columns, response,
+            cursor=cursor, limit=limit, descending=descending, skip=skip
+        )
         return hotels
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_hotels: {str(e)}")
         raise HTTPException(
@@ -125,11 +145,11 @@ def get_hotels(
 
 
 @router.get("/{hotel_id}", response_model=schemas.HotelResponse)
-def get_hotel(hotel_id: int, db: Session = Depends(get_db)):
+async def get_hotel(hotel_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
     Lấy thông tin chi tiết một khách sạn
     """
-    hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
+    hotel = await db.get(models.Hotel, hotel_id)
     if not hotel:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -138,7 +158,7 @@ def get_hotel(hotel_id: int, db: Session = Depends(get_db)):
     return hotel
 
 
-@router.get("/search/advanced", response_model=List[schemas.HotelResponse])
+@router.get("/search/advanced", response_model=List[schemas.HotelSearchResult])
 def search_hotels_advanced(
     city: Optional[str] = Query(None, description="Thành phố"),
     check_in: Optional[str] = Query(None, description="Ngày nhận (YYYY-MM-DD)"),
@@ -147,14 +167,17 @@ def search_hotels_advanced(
     min_price: Optional[float] = Query(None, ge=0, description="Giá tối thiểu/đêm"),
     max_price: Optional[float] = Query(None, ge=0, description="Giá tối đa/đêm"),
     star_rating: Optional[int] = Query(None, ge=1, le=5, description="Số sao"),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Search hotels nâng cao với caching
     - Filter theo city, dates, price, guests, rating
+    - Có check_in/check_out: chỉ trả hotel còn ít nhất một phòng trống phù hợp
     - Trả về hotels + min price for period
-    - Cache results 10 minutes
+    - Cache JSON đã encode 10 minutes, kèm ETag (If-None-Match → 304)
     """
+    stay = _parse_stay(check_in, check_out)
+
     # Generate cache key
     cache_key = search_cache.get_key(
         city=city,
@@ -166,111 +189,238 @@ def search_hotels_advanced(
         star_rating=star_rating
     )
     
-    # Try cache
-    cached_result = search_cache.get(cache_key)
-    if cached_result is not None:
-        return cached_result
-    
+    params = dict(
+        city=city,
+        stay=stay,
+        guests=guests,
+        min_price=min_price,
+        max_price=max_price,
+        star_rating=star_rating,
+    )
+
+    # Điền cache luôn đọc primary: đọc replica ngay sau invalidate có thể lấy lại dữ liệu
+    # cũ (replica lag) và giữ nó trong cache cả TTL với ETag mới
+    def load():
+        with session_scope() as primary_db:
+            return _serialize_search(_run_advanced_search(primary_db, **params))
+
+    def tags(entry):
+        # Kết quả có ngày phụ thuộc booking -> thêm tag để create/cancel booking xóa
+        extra = [dates_tag(city)] if stay else []
+        return [city_tag(city)] + extra + [hotel_tag(i) for i in entry.ids]
+
+    # Cache hit, hoặc chỉ một request chạy query cho key này (single-flight).
+    # Gắn tag city + từng hotel trong kết quả để write path xóa đúng entry.
+    cached = search_cache.get_or_set(
+        cache_key,
+        load,
+        tags=tags,
+    )
+    return cached.to_response(if_none_match)
+
+
+def _serialize_search(results: List[schemas.HotelSearchResult]) -> CachedResponse:
+    """
+    Encode kết quả search thành JSON ngay khi session còn mở
+    """
+    return CachedResponse.build(results, _search_result_adapter, ids=[r.id for r in results])
+
+
+def _parse_stay(
+    check_in: Optional[str],
+    check_out: Optional[str],
+) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Parse cặp ngày YYYY-MM-DD; None nếu không truyền đủ cả hai
+    """
+    if not check_in or not check_out:
+        return None
+    try:
+        start = datetime.fromisoformat(check_in)
+        end = datetime.fromisoformat(check_out)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format, expected YYYY-MM-DD"
+        )
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Check-out date must be after check-in date"
+        )
+    return start, end
+
+
+def _room_is_free(check_in: datetime, check_out: datetime):
+    """
+    NOT EXISTS booking (confirmed/pending) trùng lịch với Room đang xét
+    """
+    overlapping = select(models.Booking.id).where(
+        models.Booking.room_id == models.Room.id,
+        models.Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        models.Booking.check_in_date < check_out,
+        models.Booking.check_out_date > check_in,
+    )
+    return ~overlapping.exists()
+
+
+def _run_advanced_search(
+    db: Session,
+    city: Optional[str],
+    stay: Optional[Tuple[datetime, datetime]],
+    guests: Optional[int],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    star_rating: Optional[int],
+) -> List[schemas.HotelSearchResult]:
+    """
+    Query hotels cho search nâng cao (không cache)
+
+    Một query duy nhất: gom các phòng thỏa điều kiện (và còn trống nếu có ngày)
+    theo hotel_id để lấy giá thấp nhất + số phòng, rồi join với hotels.
+    """
+    # Các phòng phù hợp, gom theo hotel
+    room_filters = []
+    if stay:
+        room_filters.append(_room_is_free(*stay))
+    if guests:
+        room_filters.append(models.Room.max_guests >= guests)
+    if min_price is not None:
+        room_filters.append(models.Room.base_price >= min_price)
+    if max_price is not None:
+        room_filters.append(models.Room.base_price <= max_price)
+
+    room_stats = (
+        select(
+            models.Room.hotel_id.label("hotel_id"),
+            func.min(models.Room.base_price).label("min_price"),
+            func.count(models.Room.id).label("available_rooms"),
+        )
+        .where(*room_filters)
+        .group_by(models.Room.hotel_id)
+        .subquery()
+    )
+
     # Build query
-    query = db.query(models.Hotel)
+    query = db.query(models.Hotel, room_stats.c.min_price, room_stats.c.available_rooms)
+    if room_filters:
+        # Chỉ giữ hotel có ít nhất một phòng phù hợp
+        query = query.join(room_stats, room_stats.c.hotel_id == models.Hotel.id)
+    else:
+        query = query.outerjoin(room_stats, room_stats.c.hotel_id == models.Hotel.id)
     
     if city:
-        query = query.filter(models.Hotel.city.ilike(f"%{city}%"))
+        query = query.filter(hotel_city_filter(city))
     
     if star_rating:
         query = query.filter(models.Hotel.star_rating >= star_rating)
     
-    # Filter by price if specified
-    if min_price is not None or max_price is not None:
-        query = query.join(models.Room)
-        if min_price is not None:
-            query = query.filter(models.Room.base_price >= min_price)
-        if max_price is not None:
-            query = query.filter(models.Room.base_price <= max_price)
-        query = query.distinct()
-    
-    # Filter by guest count if specified
+    # Loại sớm hotel chắc chắn không có phòng phù hợp bằng cột summary có index
     if guests:
-        query = query.join(models.Room)
-        query = query.filter(models.Room.max_guests >= guests)
-        query = query.distinct()
-    
-    hotels = query.limit(100).all()
-    
-    # Cache result
-    search_cache.set(cache_key, hotels)
+        query = query.filter(models.Hotel.max_guests >= guests)
+    if min_price is not None:
+        query = query.filter(models.Hotel.max_room_price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Hotel.min_room_price <= max_price)
     
-    return hotels
+    nights = None
+    discount_multiplier = 1.0
+    if stay:
+        nights = max((stay[1] - stay[0]).days, 1)
+        discount_multiplier = stay_discount_multiplier(nights)
+
+    results = []
+    for hotel, room_min_price, available_rooms in query.limit(100).all():
+        result = schemas.HotelSearchResult.model_validate(hotel)
+        result.min_price = room_min_price
+        result.available_rooms = available_rooms or 0
+        if nights and room_min_price is not None:
+            result.nights = nights
+            result.min_total_price = int(room_min_price * nights * discount_multiplier)
+        results.append(result)
+    return results
 
 
 @router.get("/{hotel_id}/rooms", response_model=List[schemas.RoomResponse])
-def get_hotel_rooms(
+async def get_hotel_rooms(
     hotel_id: int,
     available_from: Optional[str] = Query(None, description="Check-in date (YYYY-MM-DD)"),
     available_to: Optional[str] = Query(None, description="Check-out date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Lấy danh sách phòng của một khách sạn
+    - Có available_from/available_to: chỉ trả các phòng còn trống trong khoảng đó
     """
+    stay = _parse_stay(available_from, available_to)
+
     # Check if hotel exists
-    hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
-    if not hotel:
+    if await db.scalar(select(models.Hotel.id).where(models.Hotel.id == hotel_id)) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Hotel not found"
         )
     
-    rooms = db.query(models.Room).filter(models.Room.hotel_id == hotel_id).all()
+    query = select(models.Room).where(models.Room.hotel_id == hotel_id)
     
-    # TODO: Filter by availability if dates are provided
+    # Filter by availability if dates are provided
+    if stay:
+        query = query.where(_room_is_free(*stay))
     
-    return rooms
+    result = await db.execute(query)
+    return result.scalars().all()
 
 
 @router.get("/{hotel_id}/reviews", response_model=List[schemas.ReviewWithUser])
-def get_hotel_reviews(
+async def get_hotel_reviews(
     hotel_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor trang sau (header X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Lấy danh sách đánh giá của khách sạn
+    Lấy danh sách đánh giá của khách sạn (mới nhất trước, phân trang bằng cursor)
     """
     # Check if hotel exists
-    hotel = db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
-    if not hotel:
+    if await db.scalar(select(models.Hotel.id).where(models.Hotel.id == hotel_id)) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Hotel not found"
         )
     
-    reviews = db.query(models.Review)\
-        .filter(models.Review.hotel_id == hotel_id)\
-        .options(joinedload(models.Review.user))\
-        .order_by(models.Review.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    query = select(models.Review)\
+        .where(models.Review.hotel_id == hotel_id)\
+        .options(joinedload(models.Review.user))
+    
+    reviews = await keyset_paginate_async(
+        db,
+        query,
+        [models.Review.created_at, models.Review.id],
+        response,
+        cursor=cursor,
+        limit=limit,
+        descending=True,
+        skip=skip,
+    )
     
     return reviews
 
 
 @router.get("/{hotel_id}/average-rating")
-def get_hotel_average_rating(hotel_id: int, db: Session = Depends(get_db)):
+async def get_hotel_average_rating(hotel_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
-    Lấy rating trung bình của khách sạn
+    Lấy rating trung bình của khách sạn (đọc cột summary, không aggregate reviews)
     """
-    result = db.query(
-        func.avg(models.Review.overall_rating).label("average_rating"),
-        func.count(models.Review.id).label("total_reviews")
-    ).filter(models.Review.hotel_id == hotel_id).first()
+    result = (await db.execute(
+        select(models.Hotel.avg_rating, models.Hotel.review_count).where(models.Hotel.id == hotel_id)
+    )).first()
     
     return {
         "hotel_id": hotel_id,
-        "average_rating": round(result.average_rating, 1) if result.average_rating else None,
-        "total_reviews": result.total_reviews
+        "average_rating": round(result.avg_rating, 1) if result and result.avg_rating else None,
+        "total_reviews": result.review_count if result else 0
     }
 
 
@@ -311,6 +461,8 @@ def create_hotel_review(
     )
     db.add(db_review)
     db.commit()
+    # avg_rating / review_count của hotel vừa đổi (hotel_summary) -> xóa cache search
+    invalidate_hotel(hotel_id, hotel.city)
     db.refresh(db_review)
     return db_review
 
@@ -327,6 +479,7 @@ def create_hotel(
     db.add(db_hotel)
     db.commit()
     db.refresh(db_hotel)
+    invalidate_hotel(db_hotel.id, db_hotel.city)
     return db_hotel
 
 
@@ -346,6 +499,8 @@ def update_hotel(
             detail="Hotel not found"
         )
     
+    old_city = db_hotel.city
+
     # Update fields
     update_data = hotel.dict(exclude_unset=True)
     for field, value in update_data.items():
@@ -353,6 +508,7 @@ def update_hotel(
     
     db.commit()
     db.refresh(db_hotel)
+    invalidate_hotel(db_hotel.id, old_city, db_hotel.city)
     return db_hotel
 
 
@@ -368,6 +524,10 @@ def delete_hotel(hotel_id: int, db: Session = Depends(get_db)):
             detail="Hotel not found"
         )
     
+    city = db_hotel.city
+    room_ids = [room.id for room in db_hotel.rooms]
+
     db.delete(db_hotel)
     db.commit()
+    invalidate_hotel(hotel_id, city, room_ids=room_ids)
     return None
@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_async_read_db, get_db
 from app import models, schemas
+from app.cache import invalidate_room
+from app.pagination import keyset_paginate_async
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
 
 @router.get("/", response_model=List[schemas.RoomWithHotel])
-def get_rooms(
+async def get_rooms(
+    response: Response,
     hotel_id: Optional[int] = Query(None, description="Lọc theo khách sạn"),
     location: Optional[str] = Query(None, description="Địa điểm (City/Country)"),
     room_type: Optional[str] = Query(None, description="Loại phòng"),
@@ -18,12 +22,13 @@ def get_rooms(
     max_guests: Optional[int] = Query(None, ge=1, description="Số khách tối đa"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor trang sau (header X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Lấy danh sách phòng với các bộ lọc
+    Lấy danh sách phòng với các bộ lọc (phân trang bằng cursor)
     """
-    query = db.query(models.Room)
+    query = select(models.Room)
     
     # Filter by location (Hotel city/country)
     if location:
@@ -53,16 +58,26 @@ def get_rooms(
     if max_guests:
         query = query.filter(models.Room.max_guests >= max_guests)
     
-    rooms = query.options(joinedload(models.Room.hotel)).offset(skip).limit(limit).all()
+    rooms = await keyset_paginate_async(
+        db,
+        query.options(joinedload(models.Room.hotel)),
+        [models.Room.id],
+        response,
+        cursor=cursor,
+        limit=limit,
+        skip=skip,
+    )
     return rooms
 
 
 @router.get("/{room_id}", response_model=schemas.RoomWithHotel)
-def get_room(room_id: int, db: Session = Depends(get_db)):
+async def get_room(room_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
     Lấy thông tin chi tiết một phòng
     """
-    room = db.query(models.Room).options(joinedload(models.Room.hotel)).filter(models.Room.id == room_id).first()
+    room = await db.scalar(
+        select(models.Room).options(joinedload(models.Room.hotel)).where(models.Room.id == room_id)
+    )
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -91,6 +106,7 @@ def create_room(
     db.add(db_room)
     db.commit()
     db.refresh(db_room)
+    invalidate_room(db_room.id, hotel.id, hotel.city)
     return db_room
 
 
@@ -117,6 +133,7 @@ def update_room(
     
     db.commit()
     db.refresh(db_room)
+    invalidate_room(db_room.id, db_room.hotel_id, db_room.hotel.city)
     return db_room
 
 
@@ -132,6 +149,9 @@ def delete_room(room_id: int, db: Session = Depends(get_db)):
             detail="Room not found"
         )
     
+    hotel = db_room.hotel
+
     db.delete(db_room)
     db.commit()
+    invalidate_room(room_id, hotel.id, hotel.city)
     return None
@@ -9,8 +9,10 @@ from typing import Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Header, Query, status
 from app.database import SessionLocal, Base, engine
-from app.models import User, Hotel, Room, Booking, Review
+from app.models import User, Hotel, Room, Booking, Review, BookingDailyStat, BookingUserStat
 from app.utils import hash_password
+from app.cache import availability_cache, principal_cache, search_cache
+from app.availability_index import availability_index
 import json
 from pathlib import Path
 
@@ -444,8 +446,18 @@ async def seed_database_endpoint(
         # For this request, let's keep users if they exist, or just recreate them.
         # User requested "load full data", implying a reset.
         db.query(User).delete()
+        # Bulk delete không chạy session event: xóa luôn rollup booking, nếu không
+        # số liệu cũ gắn vào hotel/room/user mới được cấp lại cùng id
+        db.query(BookingDailyStat).delete()
+        db.query(BookingUserStat).delete()
 
         db.commit()
+        # id user/hotel/room cũ có thể được dùng lại cho dữ liệu mới
+        principal_cache.clear()
+        search_cache.clear()
+        availability_cache.clear()
+        if availability_index.ready:
+            availability_index.load(db)
 
         # Create tables
         Base.metadata.create_all(bind=engine)
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app import models, schemas
-from app.utils import hash_password
+from app.password_hasher import password_hasher
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -22,7 +22,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user with hashed password
-    hashed_password = hash_password(user.password)
+    hashed_password = password_hasher.hash(user.password)
     db_user = models.User(
         email=user.email,
         full_name=user.full_name,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
@@ -70,7 +71,15 @@ def add_wishlist(
         hotel_id=wishlist.hotel_id,
     )
     db.add(db_wishlist)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Request đồng thời đã thêm trước (unique user_id + hotel_id)
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Khách sạn đã có trong danh sách yêu thích",
+        )
     db.refresh(db_wishlist)
     return db_wishlist
 
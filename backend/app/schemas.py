@@ -105,6 +105,11 @@ class HotelResponse(HotelBase):
     images: Optional[List[str]] = None
     amenities: Optional[List[str]] = None
     policies: Optional[Dict[str, Any]] = None
+    min_room_price: Optional[float] = None
+    max_room_price: Optional[float] = None
+    max_guests: Optional[int] = None
+    avg_rating: Optional[float] = None
+    review_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -112,6 +117,14 @@ class HotelResponse(HotelBase):
         from_attributes = True
 
 
+class HotelSearchResult(HotelResponse):
+    """Kết quả search nâng cao: hotel + giá thấp nhất của các phòng còn trống"""
+    min_price: Optional[float] = None  # giá/đêm thấp nhất trong các phòng phù hợp
+    available_rooms: Optional[int] = None  # số phòng phù hợp (còn trống nếu có ngày)
+    nights: Optional[int] = None
+    min_total_price: Optional[int] = None  # tổng tiền thấp nhất cho cả kỳ (đã giảm giá)
+
+
 # ============= Room Schemas =============
 
 class RoomBase(BaseModel):
@@ -0,0 +1,66 @@
+"""
+Search hotel không dấu theo name/address/city
+
+Hotel.search_text và Hotel.city_normalized giữ bản lowercase, không dấu
+(điền bởi event trong models.py). Filter dùng LIKE '%...%' trên các cột này:
+
+- Postgres: GIN index pg_trgm (gin_trgm_ops) -> LIKE dùng được index
+- SQLite: bảng FTS5 tokenize='trigram' đồng bộ bằng trigger -> LIKE chạy trên FTS
+
+Cột, index và backfill dữ liệu cũ: migration 0003_hotel_search_columns
+"""
+import threading
+from typing import Dict
+
+from sqlalchemy import column, literal_column, select, table, text
+
+from app import models
+from app.database import engine
+from app.utils import normalize_search
+
+SQLITE_FTS_TABLE = "hotels_search_fts"
+
+_fts_available: Dict[str, bool] = {}
+_fts_lock = threading.Lock()
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _has_sqlite_fts() -> bool:
+    # Kiểm tra một lần bằng engine sync (route async dùng chung DB)
+    if engine.dialect.name != "sqlite":
+        return False
+    key = str(engine.url)
+    with _fts_lock:
+        if key not in _fts_available:
+            with engine.connect() as conn:
+                _fts_available[key] = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": SQLITE_FTS_TABLE},
+                ).first() is not None
+        return _fts_available[key]
+
+
+def hotel_search_filter(term: str):
+    """
+    Điều kiện "name/address/city chứa term" (không phân biệt hoa thường, dấu)
+    """
+    normalized = normalize_search(term)
+    if _has_sqlite_fts() and "%" not in normalized and "_" not in normalized:
+        fts = table(SQLITE_FTS_TABLE, column("search_text"))
+        matches = select(literal_column("rowid")).select_from(fts).where(
+            fts.c.search_text.like(f"%{normalized}%")
+        )
+        return models.Hotel.id.in_(matches)
+    return models.Hotel.search_text.like(_like_pattern(normalized), escape="\\")
+
+
+def hotel_city_filter(term: str):
+    """
+    Điều kiện "city chứa term" (không phân biệt hoa thường, dấu)
+    """
+    return models.Hotel.city_normalized.like(_like_pattern(normalize_search(term)), escape="\\")
+
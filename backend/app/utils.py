@@ -1,20 +1,53 @@
-from passlib.context import CryptContext
+import unicodedata
+from functools import lru_cache
 
-# Password hashing context
-# bcrypt__truncate_error=False: silently truncate passwords >72 bytes (bcrypt limit)
-# instead of raising an error (bcrypt 5.x changed this behavior)
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__truncate_error=False,
-)
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Password hashing context, tạo lần đầu hash/verify (passlib không import lúc khởi động)
+    """
+    from passlib.context import CryptContext
+
+    # bcrypt__truncate_error=False: silently truncate passwords >72 bytes (bcrypt limit)
+    # instead of raising an error (bcrypt 5.x changed this behavior)
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__truncate_error=False,
+    )
 
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for flexible matching - removes diacritics"""
+    if not text:
+        return text
+    # Normalize unicode to decomposed form then remove diacritics
+    nfd = unicodedata.normalize('NFD', text)
+    stripped = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+    # "đ" has no decomposed form, map it explicitly
+    return stripped.replace('đ', 'd').replace('Đ', 'D')
+
+
+def normalize_search(text: str) -> str:
+    """Lowercased, diacritic-free form used by the hotel search columns"""
+    return ' '.join(normalize_text(text or '').lower().split())
+
+
+def stay_discount_multiplier(nights: int) -> float:
+    """Discount multiplier for long stays: 7+ nights -10%, 3+ nights -5%"""
+    if nights >= 7:
+        return 0.9  # 10% discount for week+
+    if nights >= 3:
+        return 0.95  # 5% discount for 3+ nights
+    return 1.0
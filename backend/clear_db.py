@@ -1,19 +1,20 @@
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from app.database import Base, engine 
 from app.models import User, Hotel, Room, Booking, Review, Wishlist, AILog, Payment
+from start import run_migrations
 
 def clear_data():
-    meta = MetaData()
-    meta.reflect(bind=engine)
-    
     # Drop all tables in reverse order of dependencies
     print("Dropping all tables...")
     Base.metadata.drop_all(bind=engine)
+    # Bảng ngoài model: lịch sử migration và bảng FTS search (SQLite)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS hotels_search_fts"))
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
     
     # Recreate all tables
     print("Recreating all tables...")
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
     
     print("Database cleared successfully!")
 
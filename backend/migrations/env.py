@@ -0,0 +1,58 @@
+"""
+Môi trường chạy migration: dùng engine và metadata của app
+
+DB lấy từ DATABASE_URL (app.database), không đọc sqlalchemy.url trong alembic.ini.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, engine
+from app import models  # noqa: F401 - đăng ký bảng vào Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Bảng ảo FTS5 của SQLite (app/search_index.py) không khai báo trong models
+_UNMANAGED_TABLES = {"hotels_search_fts"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "table" and (name in _UNMANAGED_TABLES or name.startswith("hotels_search_fts_")):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite không ALTER được cột/constraint -> copy bảng (batch mode)
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
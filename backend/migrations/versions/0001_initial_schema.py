@@ -0,0 +1,150 @@
+"""Initial schema (users, hotels, rooms, bookings, payments, reviews, wishlists, ai_logs)
+
+Schema lúc trước khi có migration (tạo bằng Base.metadata.create_all).
+DB cũ đã có các bảng này được stamp ở revision này (xem start.py).
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(500), nullable=False),
+        sa.Column("full_name", sa.String(255), nullable=False),
+        sa.Column("phone", sa.String(20), nullable=True),
+        sa.Column("avatar", sa.String(500), nullable=True),
+        sa.Column("role", sa.String(50), nullable=True),
+        sa.Column("email_verified", sa.Boolean(), nullable=True),
+        sa.Column("preferences", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "hotels",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("address", sa.String(500), nullable=False),
+        sa.Column("city", sa.String(100), nullable=False),
+        sa.Column("country", sa.String(100), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("star_rating", sa.Integer(), nullable=True),
+        sa.Column("images", sa.JSON(), nullable=True),
+        sa.Column("amenities", sa.JSON(), nullable=True),
+        sa.Column("policies", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_hotels_id", "hotels", ["id"])
+    op.create_index("ix_hotels_name", "hotels", ["name"])
+    op.create_index("ix_hotels_city", "hotels", ["city"])
+    op.create_index("ix_hotels_country", "hotels", ["country"])
+
+    op.create_table(
+        "rooms",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("hotel_id", sa.Integer(), sa.ForeignKey("hotels.id"), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("room_type", sa.String(100), nullable=False),
+        sa.Column("max_guests", sa.Integer(), nullable=False),
+        sa.Column("size", sa.Float(), nullable=True),
+        sa.Column("bed_type", sa.String(50), nullable=True),
+        sa.Column("base_price", sa.Float(), nullable=False),
+        sa.Column("images", sa.JSON(), nullable=True),
+        sa.Column("amenities", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_rooms_id", "rooms", ["id"])
+
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("hotel_id", sa.Integer(), sa.ForeignKey("hotels.id"), nullable=False),
+        sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id"), nullable=False),
+        sa.Column("check_in_date", sa.DateTime(), nullable=False),
+        sa.Column("check_out_date", sa.DateTime(), nullable=False),
+        sa.Column("guests", sa.Integer(), nullable=False),
+        sa.Column("total_price", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("payment_status", sa.String(50), nullable=True),
+        sa.Column("payment_method", sa.String(50), nullable=True),
+        sa.Column("special_requests", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"])
+    op.create_index("ix_bookings_check_in_date", "bookings", ["check_in_date"])
+    op.create_index("ix_bookings_check_out_date", "bookings", ["check_out_date"])
+
+    op.create_table(
+        "payments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("booking_id", sa.Integer(), sa.ForeignKey("bookings.id"), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(10), nullable=True),
+        sa.Column("payment_method", sa.String(50), nullable=False),
+        sa.Column("transaction_id", sa.String(255), nullable=True, unique=True),
+        sa.Column("status", sa.String(50), nullable=True),
+        sa.Column("payment_metadata", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_payments_id", "payments", ["id"])
+
+    op.create_table(
+        "reviews",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("hotel_id", sa.Integer(), sa.ForeignKey("hotels.id"), nullable=False),
+        sa.Column("booking_id", sa.Integer(), sa.ForeignKey("bookings.id"), nullable=True),
+        sa.Column("overall_rating", sa.Float(), nullable=False),
+        sa.Column("ratings", sa.JSON(), nullable=True),
+        sa.Column("comment", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_reviews_id", "reviews", ["id"])
+
+    op.create_table(
+        "wishlists",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("hotel_id", sa.Integer(), sa.ForeignKey("hotels.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_wishlists_id", "wishlists", ["id"])
+
+    op.create_table(
+        "ai_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("booking_id", sa.Integer(), sa.ForeignKey("bookings.id"), nullable=True),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("action_type", sa.String(50), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ai_logs_id", "ai_logs", ["id"])
+
+
+def downgrade():
+    for table in ("ai_logs", "wishlists", "reviews", "payments", "bookings", "rooms", "hotels", "users"):
+        op.drop_table(table)
@@ -0,0 +1,37 @@
+"""Add cancellation fields to bookings
+
+Thay cho scripts/update_db_schema.py và scripts/add_cancellation_fields.py.
+Bỏ qua cột đã có (DB đã chạy một trong hai script cũ).
+
+Revision ID: 0002_booking_cancellation_fields
+Revises: 0001_initial_schema
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_booking_cancellation_fields"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("cancellation_date", sa.DateTime(), nullable=True),
+    sa.Column("refund_amount", sa.Float(), nullable=True),
+    sa.Column("cancellation_reason", sa.Text(), nullable=True),
+]
+
+
+def upgrade():
+    existing = {col["name"] for col in sa.inspect(op.get_bind()).get_columns("bookings")}
+    with op.batch_alter_table("bookings") as batch:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column)
+
+
+def downgrade():
+    with op.batch_alter_table("bookings") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
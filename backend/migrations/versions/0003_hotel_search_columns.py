@@ -0,0 +1,139 @@
+"""Add diacritic-insensitive search columns to hotels
+
+Thay cho scripts/add_hotel_search_index.py: thêm search_text / city_normalized,
+điền cho hotel đã có, tạo trigram index (Postgres) hoặc bảng FTS5 + trigger (SQLite).
+
+Revision ID: 0003_hotel_search_columns
+Revises: 0002_booking_cancellation_fields
+Create Date: 2026-10-18
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_hotel_search_columns"
+down_revision = "0002_booking_cancellation_fields"
+branch_labels = None
+depends_on = None
+
+SQLITE_FTS_TABLE = "hotels_search_fts"
+
+# Snapshot các cột cần dùng: không phụ thuộc app.models hiện tại
+hotels = sa.table(
+    "hotels",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("address", sa.String),
+    sa.column("city", sa.String),
+    sa.column("search_text", sa.Text),
+    sa.column("city_normalized", sa.String),
+)
+
+
+def _normalize(text):
+    # Bản sao app.utils.normalize_search tại thời điểm tạo revision
+    nfd = unicodedata.normalize("NFD", text or "")
+    stripped = "".join(char for char in nfd if unicodedata.category(char) != "Mn")
+    return " ".join(stripped.replace("đ", "d").replace("Đ", "D").lower().split())
+
+
+def _backfill(bind, batch_size=1000):
+    # Table stub không có onupdate -> updated_at giữ nguyên
+    stmt = (
+        sa.update(hotels)
+        .where(hotels.c.id == sa.bindparam("hotel_id"))
+        .values(search_text=sa.bindparam("search_text"), city_normalized=sa.bindparam("city_normalized"))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(hotels.c.id, hotels.c.name, hotels.c.address, hotels.c.city)
+            .where(hotels.c.id > last_id)
+            .order_by(hotels.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        bind.execute(stmt, [
+            {
+                "hotel_id": row.id,
+                "search_text": _normalize(" ".join(part for part in (row.name, row.address, row.city) if part)),
+                "city_normalized": _normalize(row.city),
+            }
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def _create_search_index(bind):
+    if bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_hotels_search_text_trgm "
+            "ON hotels USING gin (search_text gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_hotels_city_normalized_trgm "
+            "ON hotels USING gin (city_normalized gin_trgm_ops)"
+        )
+    elif bind.dialect.name == "sqlite":
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+            "search_text, content='hotels', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS hotels_search_fts_ai AFTER INSERT ON hotels BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); "
+            "END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS hotels_search_fts_ad AFTER DELETE ON hotels BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, search_text) "
+            "VALUES ('delete', old.id, old.search_text); "
+            "END"
+        )
+        op.execute(
+            # Chỉ khi cột search thay đổi: update giá/rating/updated_at không ghi lại FTS
+            "CREATE TRIGGER IF NOT EXISTS hotels_search_fts_au "
+            f"AFTER UPDATE OF name, address, city, search_text ON hotels BEGIN "
+            f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, search_text) "
+            "VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); "
+            "END"
+        )
+        op.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("hotels")}
+    indexes = {ix["name"] for ix in inspector.get_indexes("hotels")}
+
+    if "search_text" not in columns:
+        op.add_column("hotels", sa.Column("search_text", sa.Text(), nullable=True))
+    if "city_normalized" not in columns:
+        op.add_column("hotels", sa.Column("city_normalized", sa.String(100), nullable=True))
+    if "ix_hotels_city_normalized" not in indexes:
+        op.create_index("ix_hotels_city_normalized", "hotels", ["city_normalized"])
+
+    _backfill(bind)
+    _create_search_index(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in ("hotels_search_fts_ai", "hotels_search_fts_ad", "hotels_search_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_hotels_search_text_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_hotels_city_normalized_trgm")
+
+    op.drop_index("ix_hotels_city_normalized", table_name="hotels")
+    with op.batch_alter_table("hotels") as batch:
+        batch.drop_column("city_normalized")
+        batch.drop_column("search_text")
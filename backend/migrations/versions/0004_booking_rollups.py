@@ -0,0 +1,79 @@
+"""Add booking rollup tables for the admin dashboard and reports
+
+Tạo booking_daily_stats / booking_user_stats và build từ bookings hiện có
+(trước đây build lúc app khởi động).
+
+Revision ID: 0004_booking_rollups
+Revises: 0003_hotel_search_columns
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_booking_rollups"
+down_revision = "0003_hotel_search_columns"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    if "booking_daily_stats" not in tables:
+        op.create_table(
+            "booking_daily_stats",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("hotel_id", sa.Integer(), nullable=False),
+            sa.Column("room_id", sa.Integer(), nullable=False),
+            sa.Column("bookings", sa.Integer(), nullable=False),
+            sa.Column("active_bookings", sa.Integer(), nullable=False),
+            sa.Column("active_revenue", sa.Float(), nullable=False),
+            sa.Column("cancellations", sa.Integer(), nullable=False),
+            sa.Column("pending_payment", sa.Integer(), nullable=False),
+            sa.Column("paid_bookings", sa.Integer(), nullable=False),
+            sa.Column("paid_revenue", sa.Float(), nullable=False),
+            sa.UniqueConstraint("day", "hotel_id", "room_id", name="uq_booking_daily_stats_key"),
+        )
+        op.create_index("ix_booking_daily_stats_id", "booking_daily_stats", ["id"])
+        op.create_index("ix_booking_daily_stats_day", "booking_daily_stats", ["day"])
+        op.create_index("ix_booking_daily_stats_hotel_id", "booking_daily_stats", ["hotel_id"])
+        op.create_index("ix_booking_daily_stats_room_id", "booking_daily_stats", ["room_id"])
+
+    if "booking_user_stats" not in tables:
+        op.create_table(
+            "booking_user_stats",
+            sa.Column("user_id", sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column("active_bookings", sa.Integer(), nullable=False),
+            sa.Column("active_revenue", sa.Float(), nullable=False),
+        )
+
+    # SQL cố định thay vì app.booking_stats.rebuild_booking_stats (phụ thuộc model hiện tại)
+    op.execute("DELETE FROM booking_daily_stats")
+    op.execute("DELETE FROM booking_user_stats")
+    op.execute(
+        "INSERT INTO booking_daily_stats (day, hotel_id, room_id, bookings, active_bookings, active_revenue, "
+        "cancellations, pending_payment, paid_bookings, paid_revenue) "
+        "SELECT date(created_at), hotel_id, room_id, count(id), "
+        "sum(CASE WHEN status != 'cancelled' THEN 1 ELSE 0 END), "
+        "sum(CASE WHEN status != 'cancelled' THEN total_price ELSE 0.0 END), "
+        "sum(CASE WHEN status != 'cancelled' THEN 0 ELSE 1 END), "
+        "sum(CASE WHEN status != 'cancelled' AND payment_status = 'pending' THEN 1 ELSE 0 END), "
+        "sum(CASE WHEN payment_status = 'paid' THEN 1 ELSE 0 END), "
+        "sum(CASE WHEN payment_status = 'paid' THEN total_price ELSE 0.0 END) "
+        "FROM bookings WHERE created_at IS NOT NULL "
+        "GROUP BY date(created_at), hotel_id, room_id"
+    )
+    op.execute(
+        "INSERT INTO booking_user_stats (user_id, active_bookings, active_revenue) "
+        "SELECT user_id, count(id), sum(total_price) FROM bookings "
+        "WHERE status != 'cancelled' AND user_id IS NOT NULL "
+        "GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.drop_table("booking_user_stats")
+    op.drop_table("booking_daily_stats")
@@ -0,0 +1,59 @@
+"""Add price/guest/rating summary columns to hotels
+
+Thay cho phần ALTER của scripts/backfill_hotel_summary.py: thêm cột, index
+và tính giá trị cho mọi hotel từ rooms/reviews.
+
+Revision ID: 0005_hotel_summary_columns
+Revises: 0004_booking_rollups
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_hotel_summary_columns"
+down_revision = "0004_booking_rollups"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("min_room_price", sa.Float(), nullable=True),
+    sa.Column("max_room_price", sa.Float(), nullable=True),
+    sa.Column("max_guests", sa.Integer(), nullable=True),
+    sa.Column("avg_rating", sa.Float(), nullable=True),
+    sa.Column("review_count", sa.Integer(), nullable=False, server_default="0"),
+]
+INDEXED = ["min_room_price", "max_guests", "avg_rating", "review_count"]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("hotels")}
+    indexes = {ix["name"] for ix in inspector.get_indexes("hotels")}
+
+    # add_column thường (không batch): SQLite không phải copy bảng, giữ trigger FTS
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("hotels", column)
+    for name in INDEXED:
+        if f"ix_hotels_{name}" not in indexes:
+            op.create_index(f"ix_hotels_{name}", "hotels", [name])
+
+    # SQL cố định thay vì app.hotel_summary.refresh_hotel_summaries (phụ thuộc model hiện tại)
+    op.execute(
+        "UPDATE hotels SET "
+        "min_room_price = (SELECT min(rooms.base_price) FROM rooms WHERE rooms.hotel_id = hotels.id), "
+        "max_room_price = (SELECT max(rooms.base_price) FROM rooms WHERE rooms.hotel_id = hotels.id), "
+        "max_guests = (SELECT max(rooms.max_guests) FROM rooms WHERE rooms.hotel_id = hotels.id), "
+        "avg_rating = (SELECT avg(reviews.overall_rating) FROM reviews WHERE reviews.hotel_id = hotels.id), "
+        "review_count = (SELECT count(reviews.id) FROM reviews WHERE reviews.hotel_id = hotels.id)"
+    )
+
+
+def downgrade():
+    for name in INDEXED:
+        op.drop_index(f"ix_hotels_{name}", table_name="hotels")
+    with op.batch_alter_table("hotels") as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
@@ -0,0 +1,59 @@
+"""Add composite indexes for hot booking/review/wishlist queries
+
+Thay cho scripts/add_composite_indexes.py. Xóa wishlist trùng (giữ bản cũ nhất)
+trước khi tạo unique index. Postgres: CREATE INDEX CONCURRENTLY ngoài transaction
+để bookings vẫn ghi được trong lúc tạo.
+
+Revision ID: 0006_composite_indexes
+Revises: 0005_hotel_summary_columns
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_composite_indexes"
+down_revision = "0005_hotel_summary_columns"
+branch_labels = None
+depends_on = None
+
+# (tên, bảng, cột, unique)
+INDEXES = [
+    ("ix_rooms_hotel_price", "rooms", ["hotel_id", "base_price"], False),
+    ("ix_bookings_room_status_dates", "bookings", ["room_id", "status", "check_in_date", "check_out_date"], False),
+    ("ix_bookings_user_created", "bookings", ["user_id", "created_at"], False),
+    ("ix_bookings_hotel_status", "bookings", ["hotel_id", "status"], False),
+    ("ix_bookings_status_check_out", "bookings", ["status", "check_out_date"], False),
+    ("ix_bookings_updated_at", "bookings", ["updated_at"], False),
+    ("ix_bookings_created_id", "bookings", ["created_at", "id"], False),
+    ("ix_payments_booking_id", "payments", ["booking_id"], False),
+    ("ix_reviews_hotel_created", "reviews", ["hotel_id", sa.text("created_at DESC"), sa.text("id DESC")], False),
+    ("uq_wishlists_user_hotel", "wishlists", ["user_id", "hotel_id"], True),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing = set()
+    for table in {table for _, table, _, _ in INDEXES}:
+        existing.update(ix["name"] for ix in inspector.get_indexes(table))
+
+    op.execute(
+        "DELETE FROM wishlists WHERE id NOT IN ("
+        "SELECT MIN(id) FROM wishlists GROUP BY user_id, hotel_id)"
+    )
+
+    missing = [ix for ix in INDEXES if ix[0] not in existing]
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns, unique in missing:
+                op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+    else:
+        for name, table, columns, unique in missing:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,42 @@
+"""Narrow the SQLite FTS update trigger on hotels to the searched columns
+
+hotels_search_fts_au (0003) chạy với mọi UPDATE hotels, kể cả cập nhật
+min/max_room_price, avg_rating, updated_at -> xóa + ghi lại FTS không cần thiết.
+Tạo lại trigger chỉ cho UPDATE OF name, address, city, search_text.
+
+Revision ID: 0008_narrow_hotel_fts_trigger
+Revises: 0007_email_outbox
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_narrow_hotel_fts_trigger"
+down_revision = "0007_email_outbox"
+branch_labels = None
+depends_on = None
+
+SQLITE_FTS_TABLE = "hotels_search_fts"
+
+
+def _recreate_update_trigger(columns):
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or SQLITE_FTS_TABLE not in sa.inspect(bind).get_table_names():
+        return
+    op.execute("DROP TRIGGER IF EXISTS hotels_search_fts_au")
+    op.execute(
+        f"CREATE TRIGGER hotels_search_fts_au AFTER UPDATE {columns}ON hotels BEGIN "
+        f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, search_text) "
+        "VALUES ('delete', old.id, old.search_text); "
+        f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); "
+        "END"
+    )
+
+
+def upgrade():
+    _recreate_update_trigger("OF name, address, city, search_text ")
+
+
+def downgrade():
+    _recreate_update_trigger("")
@@ -0,0 +1,63 @@
+"""Make created_at NOT NULL on users, bookings and reviews
+
+created_at là khóa keyset của GET /admin/users, /admin/bookings và
+/hotels/{id}/reviews. Dòng có created_at NULL (insert ngoài ORM) bị so sánh
+tuple (created_at, id) bỏ qua và cursor của nó không giải mã được.
+Backfill từ updated_at (nếu có) rồi đặt NOT NULL.
+
+Revision ID: 0009_keyset_created_at_not_null
+Revises: 0008_narrow_hotel_fts_trigger
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_keyset_created_at_not_null"
+down_revision = "0008_narrow_hotel_fts_trigger"
+branch_labels = None
+depends_on = None
+
+# bảng -> giá trị backfill cho created_at NULL
+TABLES = {
+    "users": "COALESCE(updated_at, :now)",
+    "bookings": "COALESCE(updated_at, :now)",
+    "reviews": ":now",
+}
+
+
+def _restore_review_index():
+    # SQLite batch mode tạo lại bảng từ reflection, mất DESC của index (0006)
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    if "ix_reviews_hotel_created" in {i["name"] for i in sa.inspect(bind).get_indexes("reviews")}:
+        op.drop_index("ix_reviews_hotel_created", table_name="reviews")
+    op.create_index(
+        "ix_reviews_hotel_created", "reviews",
+        ["hotel_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def _set_nullable(nullable: bool):
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("created_at", existing_type=sa.DateTime(), nullable=nullable)
+    _restore_review_index()
+
+
+def upgrade():
+    # :now bind kiểu DateTime (không dùng CURRENT_TIMESTAMP): trên SQLite giá trị phải
+    # cùng định dạng chuỗi với ORM thì so sánh keyset mới đúng
+    now = sa.bindparam("now", datetime.utcnow(), type_=sa.DateTime())
+    for table, backfill in TABLES.items():
+        op.execute(
+            sa.text(f"UPDATE {table} SET created_at = {backfill} WHERE created_at IS NULL").bindparams(now)
+        )
+    _set_nullable(False)
+
+
+def downgrade():
+    _set_nullable(True)
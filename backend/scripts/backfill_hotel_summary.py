@@ -0,0 +1,31 @@
+"""
+Tính lại các cột summary của hotels (giá phòng, số khách, rating)
+
+Cột và index do migration 0005_hotel_summary_columns tạo. Bình thường các cột
+được cập nhật tự động khi room/review thay đổi qua ORM; chạy script này nếu có
+dữ liệu ghi ngoài ORM (SQL tay, import).
+
+Usage:
+    cd backend
+    python scripts/backfill_hotel_summary.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.hotel_summary import rebuild_hotel_summaries
+
+
+def main():
+    db = SessionLocal()
+    try:
+        count = rebuild_hotel_summaries(db)
+        print(f"Backfilled summary columns for {count} hotels")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
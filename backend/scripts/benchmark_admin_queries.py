@@ -0,0 +1,113 @@
+"""
+Đếm số query SQL mỗi trang của các endpoint admin danh sách
+
+Tạo một SQLite DB tạm với dữ liệu giả, gọi trực tiếp list_bookings,
+list_hotels, list_rooms_admin với nhiều page size và in số query + thời gian.
+Số query phải không đổi theo page size (không còn N+1).
+
+Usage:
+    cd backend
+    python scripts/benchmark_admin_queries.py
+    python scripts/benchmark_admin_queries.py --hotels 200 --rooms-per-hotel 10 --bookings 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admin list endpoints: queries per page")
+    parser.add_argument("--hotels", type=int, default=100)
+    parser.add_argument("--rooms-per-hotel", type=int, default=5)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--page-sizes", default="10,50,100")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from fastapi import Response
+    from sqlalchemy import event
+
+    from app.database import Base, SessionLocal, engine
+    from app import models
+    from app.routers.admin import list_bookings, list_hotels, list_rooms_admin
+
+    Base.metadata.create_all(bind=engine)
+
+    # ---- Seed ----
+    db = SessionLocal()
+    users = [
+        models.User(email=f"user{i}@bench.local", full_name=f"User {i}", hashed_password="x")
+        for i in range(50)
+    ]
+    db.add_all(users)
+    rooms = []
+    for h in range(args.hotels):
+        hotel = models.Hotel(
+            name=f"Hotel {h}", address=f"{h} Street", city=f"City {h % 10}", country="Vietnam"
+        )
+        db.add(hotel)
+        db.flush()
+        for r in range(args.rooms_per_hotel):
+            room = models.Room(
+                hotel_id=hotel.id, name=f"Room {h}-{r}", room_type="Deluxe", base_price=100 + r * 10
+            )
+            db.add(room)
+            rooms.append(room)
+    db.flush()
+
+    start = datetime(2026, 1, 1)
+    for i in range(args.bookings):
+        room = random.choice(rooms)
+        check_in = start + timedelta(days=random.randint(0, 365))
+        db.add(models.Booking(
+            user_id=random.choice(users).id,
+            hotel_id=room.hotel_id,
+            room_id=room.id,
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=2),
+            guests=1,
+            total_price=room.base_price * 2,
+            status=random.choice(["confirmed", "pending", "cancelled"]),
+        ))
+    db.commit()
+    db.close()
+
+    # ---- Đếm query ----
+    counter = {"queries": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    endpoints = {
+        "list_bookings": lambda db, n: list_bookings(
+            response=Response(), skip=0, limit=n, cursor=None, db=db, _admin=None
+        ),
+        "list_hotels": lambda db, n: list_hotels(skip=0, limit=n, db=db, _admin=None),
+        "list_rooms_admin": lambda db, n: list_rooms_admin(
+            hotel_id=None, skip=0, limit=n, db=db, _admin=None
+        ),
+    }
+
+    print(f"{'endpoint':<18} {'page':>5} {'rows':>5} {'queries':>8} {'ms':>8}")
+    for name, call in endpoints.items():
+        for size in [int(s) for s in args.page_sizes.split(",")]:
+            db = SessionLocal()
+            counter["queries"] = 0
+            started = time.perf_counter()
+            rows = call(db, size)
+            elapsed = (time.perf_counter() - started) * 1000
+            db.close()
+            print(f"{name:<18} {size:>5} {len(rows):>5} {counter['queries']:>8} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
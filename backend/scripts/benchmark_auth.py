@@ -0,0 +1,72 @@
+"""
+Microbenchmark đường xác thực token (µs/lần gọi)
+
+So sánh:
+- jose + secret str:  jwt.decode(token, SECRET_KEY) như trước (dựng key mỗi lần)
+- jose + key sẵn:     jwt.decode(token, _signing_key()) - key HMAC dựng một lần
+- decode_token hit:   app.auth.decode_token khi token đã nằm trong cache
+- get_current_user:   decode_token + principal cache (SQLite tạm, cache đã ấm)
+
+Usage:
+    cd backend
+    python scripts/benchmark_auth.py
+    python scripts/benchmark_auth.py --iterations 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(fn, iterations: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token verification microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}"
+
+    from jose import jwt
+
+    from app import auth, models
+    from app.database import Base, SessionLocal, engine
+    from app.dependencies import get_current_user
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = models.User(email="bench@example.com", full_name="Bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    token = auth.create_access_token({"sub": str(user.id)})
+    key = auth._signing_key()
+    n = args.iterations
+
+    cases = [
+        ("jose + secret str", lambda: jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])),
+        ("jose + precomputed key", lambda: jwt.decode(token, key, algorithms=[auth.ALGORITHM])),
+        ("decode_token (cache hit)", lambda: auth.decode_token(token)),
+        ("get_current_user (warm)", lambda: get_current_user(token=token, db=db)),
+    ]
+
+    print(f"{n} iterations")
+    print(f"{'case':<26} {'µs/op':>9}")
+    for name, fn in cases:
+        print(f"{name:<26} {measure(fn, n):>9.1f}")
+
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Đo tốc độ render email (mails/s) với template đã compile
+
+So sánh:
+- string.Template mỗi lần:  đọc file + string.Template(...).substitute (không cache)
+- compile mỗi lần:          CompiledTemplate(source) + render (không cache)
+- render_email:             từng email, template cache sẵn
+- render_many:              mỗi batch --batch-size email một lần gọi
+
+Usage:
+    cd backend
+    python scripts/benchmark_email_render.py
+    python scripts/benchmark_email_render.py --emails 50000 --batch-size 200 --kind cancellation
+"""
+import argparse
+import os
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def sample(i: int) -> dict:
+    return {
+        "booking_id": i,
+        "customer_name": f"Nguyễn Văn {i}",
+        "hotel_name": "Khách sạn Hạ Long Bay",
+        "room_type": "Deluxe Ocean View",
+        "check_in_date": "01/06/2026",
+        "check_out_date": "03/06/2026",
+        "payment_method": "vnpay",
+        "payment_status": "Đã thanh toán",
+        "total_price": 1_500_000 + i,
+        "refund_amount": 900_000 + i,
+        "cancellation_date": "02/06/2026",
+    }
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email template render benchmark")
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=50, help="Số email mỗi lần render_many")
+    parser.add_argument("--kind", default="booking_confirmation", choices=["booking_confirmation", "cancellation"])
+    args = parser.parse_args()
+
+    from app.services.email_service import (
+        EMAIL_KINDS,
+        TEMPLATE_DIR,
+        CompiledTemplate,
+        render_email,
+        render_many,
+    )
+
+    items = [sample(i) for i in range(args.emails)]
+    template_name, _, build_context = EMAIL_KINDS[args.kind]
+    path = os.path.join(TEMPLATE_DIR, f"{template_name}.html")
+    render_many(args.kind, items[:10])  # warm-up + compile
+
+    def uncached_string_template():
+        for data in items:
+            with open(path, encoding="utf-8") as f:
+                string.Template(f.read()).substitute(build_context(data))
+
+    def uncached_compile():
+        for data in items:
+            with open(path, encoding="utf-8") as f:
+                CompiledTemplate(template_name, f.read()).render(build_context(data))
+
+    def one_by_one():
+        for data in items:
+            render_email(args.kind, data)
+
+    batches = [items[i:i + args.batch_size] for i in range(0, len(items), args.batch_size)]
+
+    def batch():
+        for chunk in batches:
+            render_many(args.kind, chunk)
+
+    cases = [
+        ("string.Template each call", uncached_string_template),
+        ("compile each call", uncached_compile),
+        ("render_email (cached)", one_by_one),
+        ("render_many", batch),
+    ]
+
+    print(f"{args.emails} x {args.kind}, {len(render_email(args.kind, items[0])[1])} bytes/mail")
+    print(f"{'case':<28} {'µs/mail':>9} {'mails/s':>10}")
+    for name, fn in cases:
+        elapsed = timed(fn)
+        print(f"{name:<28} {elapsed / args.emails * 1_000_000:>9.1f} {args.emails / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Đo throughput login và độ trễ các request khác trong lúc có login burst
+
+Tạo SQLite DB tạm với một số user, chạy uvicorn (1 worker) cho từng chế độ:
+- inline: PASSWORD_HASH_WORKERS=0, bcrypt chạy ngay trong thread của request (như trước)
+- pool:   bcrypt chạy trong process pool (app/password_hasher.py)
+
+Mỗi chế độ: N client login song song, đồng thời một client gọi GET /api/auth/me
+(handler sync, cần thread pool) để đo request thường bị chậm bao nhiêu.
+In login/s, p50/p95 login, số 429 và p50/p95 của /auth/me.
+
+Usage:
+    cd backend
+    python scripts/benchmark_login.py
+    python scripts/benchmark_login.py --clients 16 --seconds 10 --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = "benchmark-password"
+
+
+def seed(db_url: str, users: int) -> None:
+    os.environ["DATABASE_URL"] = db_url
+    from app.database import Base, SessionLocal, engine
+    from app import models
+    from app.utils import hash_password
+
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password(PASSWORD)
+    db = SessionLocal()
+    db.add_all(
+        models.User(email=f"user{i}@example.com", full_name=f"User {i}", hashed_password=hashed)
+        for i in range(users)
+    )
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url: str, body: dict = None, token: str = None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method="POST" if data else "GET")
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            status, payload = resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    return status, payload, (time.perf_counter() - started) * 1000
+
+
+def start_server(db_url: str, port: int, hash_workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=db_url, PASSWORD_HASH_WORKERS=str(hash_workers))
+    env.pop("DEFAULT_ADMIN_PASSWORD", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            request(f"{base}/")
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    sys.exit("server did not start")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_mode(name: str, db_url: str, hash_workers: int, args) -> None:
+    port = free_port()
+    proc = start_server(db_url, port, hash_workers)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        # Token cho client đo /auth/me + khởi động process pool trước khi đo
+        status, payload, _ = request(f"{base}/api/auth/login", {"email": "user0@example.com", "password": PASSWORD})
+        token = json.loads(payload)["access_token"]
+
+        login_ms, probe_ms = [], []
+        rejected = [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def login_client(i: int):
+            while time.perf_counter() < deadline:
+                email = f"user{i % args.users}@example.com"
+                status, _, ms = request(f"{base}/api/auth/login", {"email": email, "password": PASSWORD})
+                with lock:
+                    if status == 200:
+                        login_ms.append(ms)
+                    elif status == 429:
+                        rejected[0] += 1
+                if status == 429:
+                    time.sleep(0.05)
+
+        def probe_client():
+            while time.perf_counter() < deadline:
+                status, _, ms = request(f"{base}/api/auth/me", token=token)
+                if status == 200:
+                    probe_ms.append(ms)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=login_client, args=(i,)) for i in range(args.clients)]
+        threads.append(threading.Thread(target=probe_client))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        print(
+            f"{name:<8} {len(login_ms) / elapsed:>8.1f} {percentile(login_ms, 0.5):>9.0f} "
+            f"{percentile(login_ms, 0.95):>9.0f} {rejected[0]:>6} "
+            f"{percentile(probe_ms, 0.5):>9.1f} {percentile(probe_ms, 0.95):>9.1f}"
+        )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput: inline bcrypt vs process pool")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=8, help="Số client login song song")
+    parser.add_argument("--seconds", type=float, default=8.0)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="PASSWORD_HASH_WORKERS cho chế độ pool")
+    args = parser.parse_args()
+
+    db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'login.db')}"
+    seed(db_url, args.users)
+
+    print(f"{args.clients} login clients, {args.seconds:.0f}s per mode, cpu_count={os.cpu_count()}")
+    print(f"{'mode':<8} {'login/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'429':>6} {'me p50':>9} {'me p95':>9}")
+    run_mode("inline", db_url, 0, args)
+    run_mode("pool", db_url, args.workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Chạy worker email_outbox end-to-end với SMTP stub local, exit 1 nếu sai
+
+Tạo SQLite DB tạm bằng migration, enqueue N email hợp lệ + vài email chắc chắn
+lỗi, chạy EmailOutboxWorker tới khi hàng đợi rỗng rồi kiểm tra:
+- mọi email hợp lệ được stub nhận đúng một lần (kể cả khi stub trả 451 và
+  đóng kết nối giữa chừng -> retry + kết nối lại)
+- người nhận bị từ chối (550) và kind không có template -> dead
+- kết nối SMTP được dùng lại (số kết nối << số email)
+- SMTP_FROM có tên hiển thị tiếng Việt, người nhận có địa chỉ không phải ASCII (SMTPUTF8)
+
+Usage:
+    cd backend
+    python scripts/check_email_outbox.py
+    python scripts/check_email_outbox.py --emails 2000 --drop-after 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_stub import SMTPStub  # noqa: E402
+
+REJECT_DOMAIN = "rejected.example.com"
+UTF8_RECIPIENT = "khách@ví-dụ.vn"
+
+
+def booking_payload(i: int) -> dict:
+    return {
+        "booking_id": i,
+        "customer_name": f"Khách {i}",
+        "hotel_name": "Hotel Stub",
+        "room_type": "Deluxe",
+        "check_in_date": "01/06/2026",
+        "check_out_date": "03/06/2026",
+        "guests": 2,
+        "payment_method": "credit_card",
+        "payment_status": "Đã thanh toán",
+        "total_price": 1_500_000,
+    }
+
+
+def seed(emails: int) -> None:
+    from app.database import SessionLocal
+    from app.email_outbox import enqueue_email
+
+    db = SessionLocal()
+    for i in range(emails):
+        enqueue_email(db, "booking_confirmation", f"guest{i}@example.com", booking_payload(i))
+    enqueue_email(db, "booking_confirmation", UTF8_RECIPIENT, booking_payload(-2))
+    enqueue_email(db, "booking_confirmation", f"nobody@{REJECT_DOMAIN}", booking_payload(-1))
+    enqueue_email(db, "no_such_template", "guest@example.com", {})
+    db.commit()
+    db.close()
+
+
+def queue_counts() -> dict:
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.database import session_scope
+
+    outbox = models.EmailOutbox
+    with session_scope() as db:
+        return dict(db.execute(select(outbox.status, func.count(outbox.id)).group_by(outbox.status)).all())
+
+
+async def run(args) -> int:
+    stub = SMTPStub(fail_first=args.fail_first, drop_after=args.drop_after, reject_domain=REJECT_DOMAIN)
+    port = await stub.start()
+    os.environ.update(
+        SMTP_HOST="127.0.0.1",
+        SMTP_PORT=str(port),
+        SMTP_STARTTLS="false",
+        SMTP_USER="",
+        SMTP_FROM="Khách sạn BookingAI <noreply@bookingai.com>",
+    )
+
+    from app.email_outbox import EmailOutboxWorker
+
+    worker = EmailOutboxWorker(
+        batch_size=args.batch_size,
+        poll_interval=0.2,
+        max_attempts=5,
+        backoff_base=0.05,
+        backoff_max=0.5,
+        lease_seconds=60,
+        idle_timeout=5,
+        max_messages_per_connection=1000,
+        retention_days=0,
+    )
+
+    await asyncio.to_thread(seed, args.emails)
+    started = time.perf_counter()
+    worker.start()
+    deadline = started + args.timeout
+    counts = {}
+    while time.perf_counter() < deadline:
+        counts = await asyncio.to_thread(queue_counts)
+        if not counts.get("pending") and not counts.get("sending"):
+            break
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    await worker.stop()
+    await stub.stop()
+
+    print(f"queue: {counts}")
+    print(
+        f"stub received {len(stub.messages)} mails over {stub.connections} connections "
+        f"({stub.temp_failures} x 451, {stub.rejected} x 550) in {elapsed:.2f}s "
+        f"-> {len(stub.messages) / elapsed:.0f} mails/s"
+    )
+
+    failures = []
+    if counts.get("sent", 0) != args.emails + 1:
+        failures.append(f"expected {args.emails + 1} sent, got {counts.get('sent', 0)}")
+    if counts.get("dead", 0) != 2:
+        failures.append(f"expected 2 dead-lettered, got {counts.get('dead', 0)}")
+    recipients = [m["to"][0] for m in stub.messages]
+    if len(recipients) != len(set(recipients)):
+        failures.append("some emails were delivered more than once")
+    if UTF8_RECIPIENT not in recipients:
+        failures.append(f"{UTF8_RECIPIENT} was not delivered")
+    # Dùng lại kết nối: mỗi lần stub đóng + mỗi lỗi 451 tối đa một kết nối mới
+    max_connections = args.emails // max(args.drop_after, 1) + args.fail_first + 2
+    if stub.connections > max_connections:
+        failures.append(f"{stub.connections} SMTP connections, expected <= {max_connections}")
+
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    if not failures:
+        print("Email outbox OK")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end check of the email outbox worker")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--fail-first", type=int, default=3, help="Stub trả 451 cho N mail đầu")
+    parser.add_argument("--drop-after", type=int, default=40, help="Stub đóng kết nối sau N mail")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'outbox.db')}"
+    os.environ.pop("DATABASE_READ_URLS", None)
+
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Đo thời gian import app.main (python -X importtime) và fail nếu vượt budget
+
+- Chạy `python -X importtime -c "import app.main"` nhiều lần trong process mới,
+  lấy median thời gian import app.main
+- Exit code 1 nếu median > budget hoặc nếu module nặng đã chuyển sang lazy
+  (fastapi_mail, aiosmtplib, jose, passlib) bị import lại lúc khởi động
+- In các module tốn thời gian nhất để biết cần tối ưu chỗ nào
+
+Usage:
+    cd backend
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 1500 --runs 5 --top 25
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chỉ được import khi dùng lần đầu (gửi mail, JWT, hash password)
+DEFERRED_MODULES = ("fastapi_mail", "aiosmtplib", "jose", "passlib")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure() -> list:
+    """
+    Một lần import app.main trong process mới -> [(module, self_us, cumulative_us, depth)]
+    """
+    env = dict(os.environ)
+    # Không đụng DB thật khi đo
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import.db')}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(f"import app.main failed (exit {result.returncode})")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def direct_imports(rows: list) -> list:
+    """
+    Module import trực tiếp bởi app.main (importtime in con trước cha)
+    """
+    index = max((i for i, row in enumerate(rows) if row[0] == "app.main" and row[3] == 0), default=None)
+    if index is None:
+        return []
+    children = []
+    for row in reversed(rows[:index]):
+        if row[3] == 0:
+            break
+        if row[3] == 1:
+            children.append(row)
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time budget for app.main")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_BUDGET_MS", 2000)),
+        help="Median import time allowed for app.main (ms)",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Số module chậm nhất cần in")
+    args = parser.parse_args()
+
+    totals = []
+    last = []
+    for _ in range(args.runs):
+        last = measure()
+        app_main = [row for row in last if row[0] == "app.main"]
+        totals.append(app_main[-1][2] / 1000 if app_main else 0.0)
+
+    median = statistics.median(totals)
+    print(f"import app.main: median {median:.0f} ms over {args.runs} runs "
+          f"({', '.join(f'{t:.0f}' for t in totals)}), budget {args.budget_ms:.0f} ms")
+
+    print("\nSlowest direct imports of app.main (last run):")
+    for module, self_us, cumulative_us, _ in sorted(direct_imports(last), key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    imported = {row[0].split(".")[0] for row in last}
+    eager = [module for module in DEFERRED_MODULES if module in imported]
+    if eager:
+        print(f"\nFAIL: deferred modules imported at startup: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\nFAIL: import time {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("\nImport time within budget")
+
+
+if __name__ == "__main__":
+    main()
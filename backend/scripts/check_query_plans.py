@@ -0,0 +1,152 @@
+"""
+Kiểm tra query plan của các query nóng: fail nếu có full table scan
+
+Chạy EXPLAIN cho từng query (build bằng đúng helper của app) và exit code 1 nếu:
+- SQLite: plan có "SCAN <bảng>" không dùng index, hoặc "USE TEMP B-TREE FOR ORDER BY"
+- Postgres: plan có "Seq Scan" (chạy với enable_seqscan=off nên chỉ còn seq scan
+  khi thật sự không có index dùng được)
+
+Mặc định tạo SQLite DB tạm bằng migration (alembic upgrade head), tức kiểm tra
+index mà migration thật sự tạo. Đặt DATABASE_URL để kiểm tra DB thật.
+
+Usage:
+    cd backend
+    python scripts/check_query_plans.py
+    DATABASE_URL=postgresql://... python scripts/check_query_plans.py --use-env-db
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# SQLite: dòng plan đọc cả bảng mà không qua index
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (TABLE )?(\w+)( AS \w+)?$")
+SQLITE_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+def hot_queries():
+    """
+    (tên, statement) của các query chạy trên mỗi request đọc/ghi chính
+    """
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.availability_index import ACTIVE_BOOKING_STATUSES
+    from app.routers.bookings import _conflict_conditions
+    from app.routers.hotels import _room_is_free
+
+    booking, review, room = models.Booking, models.Review, models.Room
+    check_in = datetime(2026, 6, 1)
+    check_out = check_in + timedelta(days=3)
+
+    return [
+        ("availability: conflict check", select(booking.id).where(
+            *_conflict_conditions(1, check_in, check_out)
+        ).limit(1)),
+        ("availability: bulk booked rooms", select(booking.room_id).where(
+            booking.room_id.in_([1, 2, 3]),
+            booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            booking.check_in_date < check_out,
+            booking.check_out_date > check_in,
+        ).group_by(booking.room_id)),
+        ("availability index: load", select(booking.id, booking.room_id).where(
+            booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            booking.check_out_date > check_in,
+        )),
+        ("availability index: sync", select(booking.id).where(booking.updated_at >= check_in)),
+        ("bookings: user history", select(booking).where(
+            booking.user_id == 1
+        ).order_by(booking.created_at.desc())),
+        ("admin: bookings page", select(booking).order_by(
+            booking.created_at.desc(), booking.id.desc()
+        ).limit(51)),
+        ("admin: hotel booking stats", select(booking.hotel_id, func.count(booking.id)).where(
+            booking.hotel_id.in_([1, 2, 3]),
+            booking.status != "cancelled",
+        ).group_by(booking.hotel_id)),
+        ("payments: by booking", select(models.Payment).where(models.Payment.booking_id == 1)),
+        ("reviews: hotel page", select(review).where(review.hotel_id == 1).order_by(
+            review.created_at.desc(), review.id.desc()
+        ).limit(21)),
+        ("reviews: already reviewed", select(review.id).where(
+            review.hotel_id == 1, review.user_id == 1
+        ).limit(1)),
+        ("wishlists: user list", select(models.Wishlist).where(models.Wishlist.user_id == 1)),
+        ("wishlists: check", select(models.Wishlist.id).where(
+            models.Wishlist.user_id == 1, models.Wishlist.hotel_id == 1
+        )),
+        ("rooms: hotel rooms free for dates", select(room).where(
+            room.hotel_id == 1, _room_is_free(check_in, check_out)
+        )),
+        ("hotel summary: min room price", select(func.min(room.base_price)).where(room.hotel_id == 1)),
+        ("email outbox: due batch", select(models.EmailOutbox.id).where(
+            models.EmailOutbox.status.in_(("pending", "sending")),
+            models.EmailOutbox.next_attempt_at <= check_in,
+        ).limit(50)),
+    ]
+
+
+def explain(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+    return [row[0] for row in rows]
+
+
+def problems(dialect: str, plan: list) -> list:
+    found = []
+    for line in plan:
+        detail = line.strip()
+        if dialect == "sqlite":
+            if SQLITE_FULL_SCAN.match(detail) or detail.startswith(SQLITE_SORT):
+                found.append(detail)
+        elif "Seq Scan" in detail:
+            found.append(detail)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail on sequential scans in hot query plans")
+    parser.add_argument("--use-env-db", action="store_true", help="Dùng DATABASE_URL thay vì SQLite tạm")
+    parser.add_argument("--verbose", action="store_true", help="In toàn bộ plan")
+    args = parser.parse_args()
+
+    if not args.use_env_db:
+        db_path = os.path.join(tempfile.mkdtemp(), "plans.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from app.database import engine
+
+    if not args.use_env_db:
+        from alembic import command
+        from alembic.config import Config
+
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        command.upgrade(Config(os.path.join(backend_dir, "alembic.ini")), "head")
+
+    failures = 0
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, stmt in hot_queries():
+            plan = explain(conn, stmt)
+            bad = problems(conn.dialect.name, plan)
+            print(f"{'FAIL' if bad else 'ok  '}  {name}")
+            for line in plan if args.verbose else bad:
+                print(f"        {line}")
+            failures += bool(bad)
+
+    if failures:
+        print(f"\n{failures} query plan(s) use sequential scans")
+        sys.exit(1)
+    print("\nAll hot queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
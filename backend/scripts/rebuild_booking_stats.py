@@ -0,0 +1,33 @@
+"""
+Tính lại rollup booking_daily_stats / booking_user_stats từ bảng bookings
+
+Dùng khi booking được ghi ngoài ORM (SQL tay, import dữ liệu) hoặc nghi ngờ
+rollup lệch. Bình thường rollup tự cập nhật sau mỗi thay đổi booking.
+
+Usage:
+    cd backend
+    python scripts/rebuild_booking_stats.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.booking_stats import rebuild_booking_stats
+
+
+def main():
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows = rebuild_booking_stats(db)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt booking_daily_stats: {rows} rows in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+SMTP server giả lập (asyncio) để chạy worker email_outbox ở local
+
+Nhận mail và đếm (không gửi đi đâu). Có thể giả lập lỗi:
+- --reject-domain: RCPT tới domain này trả 550 (lỗi vĩnh viễn -> dead-letter)
+- --fail-first N:  N lệnh DATA đầu tiên trả 451 (lỗi tạm thời -> retry)
+- --drop-after N:  đóng kết nối sau mỗi N mail (worker phải kết nối lại)
+
+Usage:
+    cd backend
+    python scripts/smtp_stub.py --port 1025
+    # .env: SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_STARTTLS=false SMTP_USER=
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+
+
+class SMTPStub:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        reject_domain: Optional[str] = None,
+        fail_first: int = 0,
+        drop_after: int = 0,
+        verbose: bool = False,
+    ):
+        self.host = host
+        self.port = port
+        self.reject_domain = reject_domain
+        self.fail_first = fail_first
+        self.drop_after = drop_after
+        self.verbose = verbose
+        self.messages: List[dict] = []
+        self.connections = 0
+        self.temp_failures = 0
+        self.rejected = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        received_here = 0
+        sender, recipients = None, []
+
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 smtp-stub ready")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                command = line.split(" ", 1)[0].upper()
+
+                if command == "EHLO":
+                    await reply("250-smtp-stub")
+                    await reply("250-8BITMIME")
+                    await reply("250 SMTPUTF8")
+                elif command == "HELO":
+                    await reply("250 smtp-stub")
+                elif command == "MAIL":
+                    sender, recipients = line[10:].strip().split(" ", 1)[0].strip("<>"), []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    address = line[8:].strip().split(" ", 1)[0].strip("<>")
+                    if self.reject_domain and address.endswith(f"@{self.reject_domain}"):
+                        self.rejected += 1
+                        await reply("550 5.1.1 Mailbox does not exist")
+                    else:
+                        recipients.append(address)
+                        await reply("250 OK")
+                elif command == "DATA":
+                    if not recipients:
+                        await reply("503 No valid recipients")
+                        continue
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    body = []
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line in (b".\r\n", b".\n"):
+                            break
+                        body.append(data_line)
+                    if self.temp_failures < self.fail_first:
+                        self.temp_failures += 1
+                        await reply("451 4.3.0 Temporary failure, try again")
+                        continue
+                    self.messages.append({"from": sender, "to": recipients, "size": sum(map(len, body))})
+                    received_here += 1
+                    if self.verbose:
+                        print(f"[smtp-stub] #{len(self.messages)} {sender} -> {', '.join(recipients)}")
+                    await reply("250 OK queued")
+                    sender, recipients = None, []
+                    if self.drop_after and received_here >= self.drop_after:
+                        break  # giả lập server đóng kết nối
+                elif command == "RSET":
+                    sender, recipients = None, []
+                    await reply("250 OK")
+                elif command == "NOOP":
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(args) -> None:
+    stub = SMTPStub(
+        host=args.host,
+        port=args.port,
+        reject_domain=args.reject_domain,
+        fail_first=args.fail_first,
+        drop_after=args.drop_after,
+        verbose=True,
+    )
+    port = await stub.start()
+    print(f"SMTP stub listening on {args.host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stub for the email outbox worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--reject-domain", default=None, help="RCPT tới domain này trả 550")
+    parser.add_argument("--fail-first", type=int, default=0, help="Số DATA đầu tiên trả 451")
+    parser.add_argument("--drop-after", type=int, default=0, help="Đóng kết nối sau mỗi N mail")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
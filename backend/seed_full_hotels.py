@@ -10,9 +10,10 @@ from pathlib import Path
 # Add backend directory to path
 sys.path.append(str(Path(__file__).parent))
 
-from app.database import SessionLocal, engine, Base
+from app.database import SessionLocal
 from app.models import User, Hotel, Room, Booking
 from app.utils import hash_password
+from start import run_migrations
 from datetime import datetime
 
 
@@ -23,8 +24,8 @@ def seed_full_hotels():
     - 4 hạng phòng mỗi khách sạn (Standard, Superior, Deluxe, Suite)
     """
 
-    # Create tables
-    Base.metadata.create_all(bind=engine)
+    # Schema do Alembic quản lý (bảng, FTS search, backfill) - giống start.py
+    run_migrations()
 
     db = SessionLocal()
 
@@ -7,24 +7,38 @@ import os
 import uvicorn
 
 
-# Auto-create tables on startup (safe for PostgreSQL)
-def init_db():
-    """Initialize database tables if they don't exist"""
-    try:
-        from app.database import engine, Base
-        from app import models  # Import models to register them
+# Revision đầu tiên: schema của DB tạo bằng create_all trước khi có migration
+BASELINE_REVISION = "0001_initial_schema"
 
-        print("🔄 Checking database tables...")
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables ready!")
-    except Exception as e:
-        print(f"⚠️  Database initialization warning: {e}")
-        # Don't crash the app, just log the warning
+
+def run_migrations():
+    """
+    Nâng schema DB lên revision mới nhất (alembic upgrade head) trước khi chạy server.
+    Chỉ chạy một lần ở đây, app/worker không tạo bảng lúc khởi động.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+
+    from app.database import engine
+
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+
+    tables = set(inspect(engine).get_table_names())
+    if "hotels" in tables and "alembic_version" not in tables:
+        # DB cũ (create_all): đánh dấu baseline, các migration sau bỏ qua cột/index đã có
+        print(f"🔖 Existing database without migration history, stamping {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+
+    print("🔄 Running database migrations...")
+    command.upgrade(config, "head")
+    print("✅ Database schema up to date!")
 
 
 if __name__ == "__main__":
-    # Initialize database first
-    init_db()
+    # Migration là bước deploy: tắt bằng RUN_MIGRATIONS=false nếu đã chạy `alembic upgrade head` riêng
+    if os.environ.get("RUN_MIGRATIONS", "true").lower() not in ("0", "false", "no"):
+        run_migrations()
 
     # Get PORT from environment variable, default to 8000 for local development
     port = int(os.environ.get("PORT", 8000))
@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react';
 import { AdminLayout } from '@/components/admin/AdminLayout';
 import { Trash2, Search, RefreshCw, CheckCircle, Clock } from 'lucide-react';
+import { apiFetch } from '@/lib/api';
 
 interface AdminBooking {
   id: number;
@@ -53,7 +54,7 @@ export default function AdminBookingsPage() {
     setError('');
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/bookings?limit=200`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/bookings?limit=200`, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) throw new Error('Không thể tải danh sách booking');
@@ -92,7 +93,7 @@ export default function AdminBookingsPage() {
     setDeletingId(bookingId);
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/bookings/${bookingId}`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/bookings/${bookingId}`, {
         method: 'DELETE',
         headers: { Authorization: `Bearer ${token}` },
       });
@@ -113,7 +114,7 @@ export default function AdminBookingsPage() {
     setConfirmingId(bookingId);
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/bookings/${bookingId}/confirm-payment`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/bookings/${bookingId}/confirm-payment`, {
         method: 'PATCH',
         headers: { Authorization: `Bearer ${token}` },
       });
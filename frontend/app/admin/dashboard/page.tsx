@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react';
 import { AdminLayout } from '@/components/admin/AdminLayout';
 import { Users, CalendarCheck, Hotel, TrendingUp, Clock, CheckCircle } from 'lucide-react';
+import { apiFetch } from '@/lib/api';
 
 interface Stats {
   total_users: number;
@@ -50,7 +51,7 @@ export default function AdminDashboard() {
       try {
         const token = localStorage.getItem('token');
         const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
-        const res = await fetch(`${apiUrl}/api/admin/dashboard`, {
+        const res = await apiFetch(`${apiUrl}/api/admin/dashboard`, {
           headers: { Authorization: `Bearer ${token}` },
         });
         if (!res.ok) throw new Error('Không thể tải dữ liệu');
@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react';
 import { AdminLayout } from '@/components/admin/AdminLayout';
 import { Hotel, BedDouble, Calendar, TrendingUp, Search, RefreshCw, ChevronDown, ChevronUp } from 'lucide-react';
+import { apiFetch } from '@/lib/api';
 
 interface AdminHotel {
   id: number;
@@ -43,7 +44,7 @@ export default function AdminHotelsPage() {
     setError('');
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/hotels?limit=200`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/hotels?limit=200`, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) throw new Error('Không thể tải danh sách khách sạn');
@@ -78,7 +79,7 @@ export default function AdminHotelsPage() {
       setLoadingRooms(hotelId);
       try {
         const token = localStorage.getItem('token');
-        const res = await fetch(`${apiUrl}/api/admin/rooms?hotel_id=${hotelId}`, {
+        const res = await apiFetch(`${apiUrl}/api/admin/rooms?hotel_id=${hotelId}`, {
           headers: { Authorization: `Bearer ${token}` },
         });
         if (res.ok) {
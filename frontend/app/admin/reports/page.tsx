@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react';
 import { AdminLayout } from '@/components/admin/AdminLayout';
 import { TrendingUp, BedDouble, Users, BarChart2, RefreshCw } from 'lucide-react';
+import { apiFetch } from '@/lib/api';
 
 interface MonthlyRevenue {
   month: number;
@@ -54,9 +55,9 @@ export default function AdminReportsPage() {
     const headers = { Authorization: `Bearer ${token}` };
     try {
       const [revRes, roomsRes, custRes] = await Promise.all([
-        fetch(`${apiUrl}/api/admin/reports/revenue?year=${year}`, { headers }),
-        fetch(`${apiUrl}/api/admin/reports/top-rooms?limit=5`, { headers }),
-        fetch(`${apiUrl}/api/admin/reports/top-customers?limit=5`, { headers }),
+        apiFetch(`${apiUrl}/api/admin/reports/revenue?year=${year}`, { headers }),
+        apiFetch(`${apiUrl}/api/admin/reports/top-rooms?limit=5`, { headers }),
+        apiFetch(`${apiUrl}/api/admin/reports/top-customers?limit=5`, { headers }),
       ]);
       if (!revRes.ok || !roomsRes.ok || !custRes.ok) throw new Error('Không thể tải báo cáo');
       const [revData, roomsData, custData] = await Promise.all([
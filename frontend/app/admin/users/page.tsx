@@ -3,6 +3,7 @@
 import { useEffect, useState } from 'react';
 import { AdminLayout } from '@/components/admin/AdminLayout';
 import { Trash2, Search, Shield, User as UserIcon, RefreshCw } from 'lucide-react';
+import { apiFetch } from '@/lib/api';
 
 interface AdminUser {
   id: number;
@@ -29,7 +30,7 @@ export default function AdminUsersPage() {
     setError('');
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/users?limit=200`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/users?limit=200`, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) throw new Error('Không thể tải danh sách users');
@@ -63,7 +64,7 @@ export default function AdminUsersPage() {
     setDeletingId(userId);
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch(`${apiUrl}/api/admin/users/${userId}`, {
+      const res = await apiFetch(`${apiUrl}/api/admin/users/${userId}`, {
         method: 'DELETE',
         headers: { Authorization: `Bearer ${token}` },
       });
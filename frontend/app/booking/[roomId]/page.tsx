@@ -4,7 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import { CreditCard, Banknote, CheckCircle, Calendar, Users, Hotel, ArrowLeft } from 'lucide-react';
 import Navbar from '@/components/Navbar';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 import { getRoomImageUrl, getRoomLocalFallback } from '@/lib/imageUtils';
 
 interface Room {
@@ -88,7 +88,7 @@ export default function BookingPaymentPage() {
   useEffect(() => {
     const fetchRoom = async () => {
       try {
-        const res = await fetch(`${API_URL}/api/rooms/${roomId}`);
+        const res = await apiFetch(`${API_URL}/api/rooms/${roomId}`);
         if (!res.ok) {
           if (res.status === 404) {
             setRoomNotFound(true);
@@ -119,7 +119,7 @@ export default function BookingPaymentPage() {
         const checkIn = new Date(formData.checkIn).toISOString();
         const checkOut = new Date(formData.checkOut).toISOString();
         
-        const res = await fetch(
+        const res = await apiFetch(
           `${API_URL}/api/bookings/availability?room_id=${roomId}&check_in_date=${checkIn}&check_out_date=${checkOut}`
         );
         
@@ -162,7 +162,7 @@ export default function BookingPaymentPage() {
     const refresh_token = localStorage.getItem('refresh_token');
     if (!refresh_token) return null;
     try {
-      const res = await fetch(`${API_URL}/api/auth/refresh`, {
+      const res = await apiFetch(`${API_URL}/api/auth/refresh`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ refresh_token })
@@ -232,7 +232,7 @@ export default function BookingPaymentPage() {
         'Authorization': `Bearer ${accessToken}`
       };
 
-      let bookingRes = await fetch(`${API_URL}/api/bookings/`, {
+      let bookingRes = await apiFetch(`${API_URL}/api/bookings/`, {
         method: 'POST',
         headers,
         body: JSON.stringify(bookingPayload)
@@ -244,7 +244,7 @@ export default function BookingPaymentPage() {
         if (newToken) {
           accessToken = newToken;
           headers['Authorization'] = `Bearer ${accessToken}`;
-          bookingRes = await fetch(`${API_URL}/api/bookings/`, {
+          bookingRes = await apiFetch(`${API_URL}/api/bookings/`, {
             method: 'POST',
             headers,
             body: JSON.stringify(bookingPayload)
@@ -279,7 +279,7 @@ export default function BookingPaymentPage() {
           }
         };
 
-        let paymentRes = await fetch(`${API_URL}/api/bookings/payment`, {
+        let paymentRes = await apiFetch(`${API_URL}/api/bookings/payment`, {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
@@ -292,7 +292,7 @@ export default function BookingPaymentPage() {
           const newToken = await refreshToken();
           if (newToken) {
             accessToken = newToken;
-            paymentRes = await fetch(`${API_URL}/api/bookings/payment`, {
+            paymentRes = await apiFetch(`${API_URL}/api/bookings/payment`, {
               method: 'POST',
               headers: {
                 'Content-Type': 'application/json',
@@ -14,7 +14,7 @@ import {
   AlertTriangle,
 } from "lucide-react";
 import { toast } from "@/components/ui/Toast";
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 
 interface Room {
   id: number;
@@ -69,7 +69,7 @@ export default function BookingHistoryPage() {
     }
 
     try {
-      const res = await fetch(`${API_URL}/api/bookings/`, {
+      const res = await apiFetch(`${API_URL}/api/bookings/`, {
         headers: {
           Authorization: `Bearer ${token}`,
         },
@@ -127,7 +127,7 @@ export default function BookingHistoryPage() {
     setCancellingId(selectedBooking.id);
 
     try {
-      const res = await fetch(`${API_URL}/api/bookings/${selectedBooking.id}/cancel`, {
+      const res = await apiFetch(`${API_URL}/api/bookings/${selectedBooking.id}/cancel`, {
         method: "PATCH",
         headers: {
           Authorization: `Bearer ${token}`,
@@ -4,7 +4,7 @@ import { useEffect, useState, Suspense } from 'react';
 import { useParams, useSearchParams } from 'next/navigation';
 import Navbar from '@/components/Navbar';
 import Link from 'next/link';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 import {
   getHotelImageUrl,
   getFirstImage,
@@ -147,7 +147,7 @@ function AISummaryCard({ hotelId, hasReviews }: { hotelId: string; hasReviews: b
       return;
     }
 
-    fetch(`${API_URL}/api/ai/hotels/${hotelId}/summary`)
+    apiFetch(`${API_URL}/api/ai/hotels/${hotelId}/summary`)
       .then((r) => r.json())
       .then((data) => setSummary(data))
       .catch(() => {})
@@ -252,7 +252,7 @@ function HotelContent() {
   };
 
   const fetchReviews = async () => {
-    const r = await fetch(`${API_URL}/api/hotels/${hotelId}/reviews?limit=50`);
+    const r = await apiFetch(`${API_URL}/api/hotels/${hotelId}/reviews?limit=50`);
     if (r.ok) setReviews(await r.json());
   };
 
@@ -262,8 +262,8 @@ function HotelContent() {
       setLoading(true);
       try {
         const [hotelRes, roomRes] = await Promise.all([
-          fetch(`${API_URL}/api/hotels/${hotelId}`),
-          fetch(`${API_URL}/api/rooms/?hotel_id=${hotelId}`),
+          apiFetch(`${API_URL}/api/hotels/${hotelId}`),
+          apiFetch(`${API_URL}/api/rooms/?hotel_id=${hotelId}`),
         ]);
 
         if (!hotelRes.ok) throw new Error('Failed to fetch hotel');
@@ -291,12 +291,12 @@ function HotelContent() {
         // Auto-seed reviews nếu chưa có dữ liệu
         // (gọi silent – không block UI, không cần auth)
         try {
-          const countRes = await fetch(`${API_URL}/api/hotels/${hotelId}/reviews?limit=1`);
+          const countRes = await apiFetch(`${API_URL}/api/hotels/${hotelId}/reviews?limit=1`);
           if (countRes.ok) {
             const countData = await countRes.json();
             if (Array.isArray(countData) && countData.length === 0) {
               // Trigger seed silently, then reload reviews
-              await fetch(`${API_URL}/api/seed/reviews`, { method: 'POST' });
+              await apiFetch(`${API_URL}/api/seed/reviews`, { method: 'POST' });
               await fetchReviews();
             }
           }
@@ -305,7 +305,7 @@ function HotelContent() {
         // Check wishlist status
         const token = getAuthToken();
         if (token) {
-          const wRes = await fetch(`${API_URL}/api/wishlists/check/${hotelId}`, {
+          const wRes = await apiFetch(`${API_URL}/api/wishlists/check/${hotelId}`, {
             headers: { Authorization: `Bearer ${token}` },
           });
           if (wRes.ok) {
@@ -333,13 +333,13 @@ function HotelContent() {
     setWishlistLoading(true);
     try {
       if (isWishlisted) {
-        await fetch(`${API_URL}/api/wishlists/${hotelId}`, {
+        await apiFetch(`${API_URL}/api/wishlists/${hotelId}`, {
           method: 'DELETE',
           headers: { Authorization: `Bearer ${token}` },
         });
         setIsWishlisted(false);
       } else {
-        await fetch(`${API_URL}/api/wishlists/`, {
+        await apiFetch(`${API_URL}/api/wishlists/`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
           body: JSON.stringify({ hotel_id: Number(hotelId) }),
@@ -370,7 +370,7 @@ function HotelContent() {
     }
     setReviewSubmitting(true);
     try {
-      const res = await fetch(`${API_URL}/api/hotels/${hotelId}/reviews`, {
+      const res = await apiFetch(`${API_URL}/api/hotels/${hotelId}/reviews`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
         body: JSON.stringify({
@@ -5,7 +5,7 @@ import { useEffect, useState } from 'react';
 import Navbar from '@/components/Navbar';
 import SearchBar from '@/components/SearchBar';
 import Link from 'next/link';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 import { getRoomImageUrl, getRoomLocalFallback } from '@/lib/imageUtils';
 
 interface Room {
@@ -112,7 +112,7 @@ export default function Home() {
   useEffect(() => {
     const fetchRooms = async () => {
       try {
-        const res = await fetch(`${API_URL}/api/rooms/?limit=8`);
+        const res = await apiFetch(`${API_URL}/api/rooms/?limit=8`);
         if (!res.ok) throw new Error('Failed');
         setRooms(await res.json());
       } catch {
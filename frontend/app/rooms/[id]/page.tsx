@@ -3,7 +3,7 @@
 import { useEffect, useState } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import Navbar from '@/components/Navbar';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 import { getRoomImageUrl, getRoomLocalFallback } from '@/lib/imageUtils';
 
 interface Room {
@@ -44,7 +44,7 @@ export default function RoomDetail() {
 
     const fetchRoom = async () => {
       try {
-                const res = await fetch(`${API_URL}/api/rooms/${id}`);
+                const res = await apiFetch(`${API_URL}/api/rooms/${id}`);
         if (!res.ok) throw new Error('Failed to fetch room');
         
         const data = await res.json();
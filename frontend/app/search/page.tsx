@@ -4,7 +4,7 @@ import { useEffect, useState, Suspense } from 'react';
 import { useSearchParams } from 'next/navigation';
 import Link from 'next/link';
 import Navbar from '@/components/Navbar';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 import { getFirstImage, getHotelLocalFallback } from '@/lib/imageUtils';
 
 interface Hotel {
@@ -38,7 +38,7 @@ function SearchContent() {
             params.append('city', locationQuery);
         }
         
-        const res = await fetch(`${API_URL}/api/hotels/?${params.toString()}`);
+        const res = await apiFetch(`${API_URL}/api/hotels/?${params.toString()}`);
         if (!res.ok) throw new Error('API Error');
         
         const data = await res.json();
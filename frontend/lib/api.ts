@@ -1,8 +1,45 @@
 // Centralized API URL configuration
 export const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// Read-your-writes: after a booking/payment write the backend returns X-DB-Primary-Until.
+// Sending it back makes the following reads go to the primary DB instead of a lagging
+// read replica (the backend's db_primary_until cookie is not sent cross-site).
+const PRIMARY_READ_HEADER = 'X-DB-Primary-Until';
+const PRIMARY_READ_KEY = 'db_primary_until';
+// The backend checks the value itself; this only stops sending it forever (and avoids clock skew)
+const PRIMARY_READ_MAX_AGE_MS = 5 * 60 * 1000;
+
+const readPrimaryPin = (): string | null => {
+  if (typeof window === 'undefined') return null;
+  const raw = window.sessionStorage.getItem(PRIMARY_READ_KEY);
+  if (!raw) return null;
+  const [value, storedAt] = raw.split('|');
+  if (Date.now() - Number(storedAt) > PRIMARY_READ_MAX_AGE_MS) {
+    window.sessionStorage.removeItem(PRIMARY_READ_KEY);
+    return null;
+  }
+  return value;
+};
+
+// Drop-in replacement for fetch() for backend calls: echoes the read-your-writes header
+export const apiFetch = async (input: string, init: RequestInit = {}) => {
+  const pin = readPrimaryPin();
+  let options = init;
+  if (pin) {
+    const headers = new Headers(init.headers);
+    headers.set(PRIMARY_READ_HEADER, pin);
+    options = { ...init, headers };
+  }
+  const res = await fetch(input, options);
+  const until = res.headers.get(PRIMARY_READ_HEADER);
+  if (until && typeof window !== 'undefined') {
+    window.sessionStorage.setItem(PRIMARY_READ_KEY, `${until}|${Date.now()}`);
+  }
+  return res;
+};
+
 // Helper function for API calls
 export const fetchAPI = async (endpoint: string, options?: RequestInit) => {
   const url = `${API_URL}${endpoint}`;
-  return fetch(url, options);
+  return apiFetch(url, options);
 };
@@ -2,7 +2,7 @@
 'use client';
 
 import { useState, useCallback, useRef } from 'react';
-import { API_URL } from '@/lib/api';
+import { API_URL, apiFetch } from '@/lib/api';
 
 export interface ChatMessage {
   role: 'user' | 'assistant';
@@ -74,7 +74,7 @@ export function useAIChat() {
       const currentMessages = messagesRef.current;
       const historyToSend = [...currentMessages, userMsg];
 
-      const res = await fetch(`${API_URL}/api/ai/chat`, {
+      const res = await apiFetch(`${API_URL}/api/ai/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({